@@ -1,7 +1,69 @@
-from flask import Flask, jsonify, render_template, request, redirect
+from flask import Flask, g, jsonify, render_template, request, redirect, Response, stream_with_context
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, ReadTimeoutError
+from http.cookiejar import DefaultCookiePolicy
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+import statistics
+import click
+import csv
+import gzip
+import hashlib
+import io
+import json
 import logging
 import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip
+    brotli = None
+
+from cache import (
+    CACHE_BACKEND,
+    CACHE_STALE_TTL,
+    ResponseCache,
+    create_cache_backend,
+)
+from indexes import LeaderboardIndex, PlayerSearchIndex
+from instrumentation import (
+    METRICS_DIR,
+    METRICS_FLUSH_INTERVAL,
+    PROFILER_ENABLED,
+    load_metrics_snapshots,
+    metrics,
+    profiler,
+    render_metrics,
+    write_metrics_snapshot,
+)
+from live import LIVE_POLL_INTERVAL, get_live_feed, live_event_stream
+from store import (
+    STORE_MAX_AGE,
+    store_completed_match_count,
+    store_head_to_head,
+    store_is_fresh,
+    store_iter_completed_matches,
+    store_known_match_ids,
+    store_load_matches,
+    store_player_payloads,
+    store_rating_at,
+    store_save_matches,
+    store_save_player,
+    store_save_rankings,
+    store_save_ratings,
+    store_user_details,
+    store_user_matches_page,
+    store_user_rankings,
+    store_user_ratings,
+)
+from util import as_float, as_int
 
 app = Flask(__name__)
 
@@ -18,339 +80,728 @@ USSQUASH_HEADERS = {
     "User-Agent": "Mozilla/5.0"
 }
 
+USSQUASH_API_BASE = os.environ.get("USSQUASH_API_BASE", "https://api.ussquash.com").rstrip("/")
+
+# ASYNC_MODE=1 runs gunicorn with gevent workers (see gunicorn.conf.py), where
+# upstream I/O yields instead of blocking, so one process can hold hundreds of
+# in-flight upstream calls. The pool defaults below scale up to match.
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "").lower() in ("1", "true", "yes")
+
+# Upstream connection settings. Every proxy route shares one pooled session per
+# worker process so repeat calls reuse keep-alive connections instead of paying
+# a fresh TCP+TLS handshake each time.
+UPSTREAM_POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", 200 if ASYNC_MODE else 20))
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", 2))
+UPSTREAM_BACKOFF = float(os.environ.get("UPSTREAM_BACKOFF", 0.3))
+UPSTREAM_RETRY_STATUSES = (429, 500, 502, 503, 504)
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.05))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10))
+LIVE_SCORE_READ_TIMEOUT = float(os.environ.get("LIVE_SCORE_READ_TIMEOUT", 60))
+
+# Per-route caps on concurrent upstream calls, keyed by cache policy, as
+# "policy=limit,..." pairs. A request that can't get a slot within
+# UPSTREAM_QUEUE_TIMEOUT seconds is answered with 503 rather than piling on.
+UPSTREAM_ROUTE_LIMITS = {
+    policy: int(limit)
+    for policy, _, limit in (
+        item.strip().partition("=")
+        for item in os.environ.get("UPSTREAM_ROUTE_LIMITS", "live=32,search=16,live_completed=16").split(",")
+        if item.strip()
+    )
+}
+UPSTREAM_QUEUE_TIMEOUT = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", 5))
+
+# Upstream protection. UPSTREAM_RATE_LIMIT caps outbound calls per second for
+# the whole server, each of the WEB_CONCURRENCY workers taking an equal share
+# (0 turns it off); a call that can't get a token within UPSTREAM_QUEUE_TIMEOUT
+# is shed. An endpoint failing CIRCUIT_FAILURES times in a row (timeouts,
+# connection errors, 429 and 5xx) is not called for CIRCUIT_COOLDOWN seconds,
+# after which a single trial call decides whether it recovers.
+UPSTREAM_RATE_LIMIT = float(os.environ.get("UPSTREAM_RATE_LIMIT", 100))
+UPSTREAM_RATE_BURST = float(os.environ.get("UPSTREAM_RATE_BURST", 50))
+CIRCUIT_FAILURES = int(os.environ.get("CIRCUIT_FAILURES", 5))
+CIRCUIT_COOLDOWN = float(os.environ.get("CIRCUIT_COOLDOWN", 30))
+
+# Expired entries are kept CACHE_STALE_TTL (cache.py) more seconds. Within
+# that window a proxied request gets the stale body at once (X-Cache: STALE,
+# with X-Cache-Stale in seconds past expiry) while one background refresh
+# replaces it, so an upstream outage keeps serving the last good payload.
+# Internal readers (fetch_json) always wait for a fresh body. Policies listed
+# in CACHE_STALE_TTLS use their own, shorter window; live scores are never
+# served stale.
+CACHE_STALE_TTLS = {
+    "live": 0,
+    "live_completed": 0,
+}
+# Server-side response cache (see cache.py). Each proxy route names a policy
+# below; the TTL is in seconds and 0 means "coalesce concurrent requests but
+# never store".
+CACHE_TTLS = {
+    "user": 600,
+    "ratings": 600,
+    "rankings": 900,
+    "leaderboard": 900,
+    "matches": 300,
+    "record": 300,
+    "league": 3600,
+    "division": 300,
+    "standings": 300,
+    "team": 300,
+    "schedule": 120,
+    "search": 60,
+    "tracker": 30,
+    "live": 5,
+    "match_history": 6 * 3600,
+    "live_completed": 24 * 3600,
+    "scorecard": 60,
+    "scorecard_final": 24 * 3600,
+    "college": 300,
+    "analytics": 6 * 3600,
+    "analytics_partial": 3,
+}
+
+
+def stale_ttl(cache_policy):
+    return min(CACHE_STALE_TTLS.get(cache_policy, CACHE_STALE_TTL), CACHE_STALE_TTL)
+
+# Server-side fan-out. Aggregating endpoints fetch upstream pages on a shared
+# thread pool; MATCH_PAGE_CONCURRENCY caps how many pages one request keeps in
+# flight so a single long history can't monopolise the pool.
+UPSTREAM_FANOUT_WORKERS = int(os.environ.get("UPSTREAM_FANOUT_WORKERS", 128 if ASYNC_MODE else 16))
+MATCH_PAGE_CONCURRENCY = int(os.environ.get("MATCH_PAGE_CONCURRENCY", 6))
+MATCH_PAGE_SIZE = 5  # upstream returns 5 matches per page
+BATCH_MAX_IDS = int(os.environ.get("BATCH_MAX_IDS", 100))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+LEADERBOARD_PAGE_SIZE = 50  # upstream returns 50 ranking rows per page
+LEADERBOARD_PAGE_CONCURRENCY = int(os.environ.get("LEADERBOARD_PAGE_CONCURRENCY", 8))
+LEADERBOARD_REFRESH = float(os.environ.get("LEADERBOARD_REFRESH", 900))
+LEADERBOARD_MAX_BOARDS = int(os.environ.get("LEADERBOARD_MAX_BOARDS", 64))
+# Full-board builds in flight at once; requests for other boards get a 503
+# until one finishes rather than queueing more upstream fan-out.
+LEADERBOARD_MAX_BUILDS = int(os.environ.get("LEADERBOARD_MAX_BUILDS", 2))
+# Boards kept warm in the background, as "group:divisions" pairs.
+LEADERBOARD_SNAPSHOTS = os.environ.get("LEADERBOARD_SNAPSHOTS", "208:0")
+# Live score push channel (see live.py). Each open stream pins a worker
+# thread, so it is only on with gevent workers unless LIVE_SSE says otherwise;
+# when off, the stream routes answer 503 and browsers poll the cached proxy.
+LIVE_SSE = os.environ.get("LIVE_SSE", "1" if ASYNC_MODE else "").lower() in ("1", "true", "yes")
+ANALYTICS_LIVE_CONCURRENCY = int(os.environ.get("ANALYTICS_LIVE_CONCURRENCY", 5))
+ANALYTICS_MAX_TIMED_MATCHES = int(os.environ.get("ANALYTICS_MAX_TIMED_MATCHES", 200))
+# At most this many uncached liveScoreDetails fetches per analytics build. A
+# summary that had to skip some is marked complete: false and cached for
+# CACHE_TTLS["analytics_partial"], which is shorter than the page's 5s re-poll
+# so each re-poll builds on the details fetched so far instead of getting the
+# same partial summary back.
+ANALYTICS_COLD_FETCHES = int(os.environ.get("ANALYTICS_COLD_FETCHES", 25))
+# Local player typeahead. A search is answered from the index when it finds at
+# least SEARCH_MIN_LOCAL_RESULTS players; otherwise (no hits, or the index
+# could not be seeded) it goes upstream.
+SEARCH_MIN_LOCAL_RESULTS = int(os.environ.get("SEARCH_MIN_LOCAL_RESULTS", 1))
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", 20))
+# College matchup odds use the same rating-only model as collegeteams.js: a
+# TEAM_RATING_SCALE rating edge makes a 10:1 favourite on that court.
+TEAM_LINEUP_SIZE = 9
+TEAM_RATING_SCALE = float(os.environ.get("TEAM_RATING_SCALE", 1.0))
+# Background warm-up of the hot set: the tracker list and its players, plus
+# the college divisions' standings, rosters and schedules. Each cycle refreshes
+# whatever would expire before the next one. Match days (a team match on
+# today's schedule, or a weekday in WARMUP_MATCH_DAYS, Monday=0) use the
+# shorter interval. On a shared cache backend one worker per cycle is elected
+# through a cache lease; with the per-worker memory cache every worker would
+# warm its own copy, so it is off unless WARMUP_INTERVAL is set.
+# WARMUP_INTERVAL=0 turns it off.
+WARMUP_INTERVAL = float(os.environ.get("WARMUP_INTERVAL", 0 if CACHE_BACKEND == "memory" else 240))
+WARMUP_MATCHDAY_INTERVAL = float(os.environ.get("WARMUP_MATCHDAY_INTERVAL", 60))
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", 4))
+WARMUP_DIVISIONS = [
+    int(item) for item in os.environ.get("WARMUP_DIVISIONS", "5733,5736,5735,5734").split(",") if item.strip()
+]
+WARMUP_MATCH_DAYS = {
+    int(item) for item in os.environ.get("WARMUP_MATCH_DAYS", "5,6").split(",") if item.strip()
+}
+
+# Response compression for bodies of at least COMPRESS_MIN_BYTES. Brotli is
+# used when the package is installed and the browser accepts it.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+COMPRESS_MEMO_ENTRIES = int(os.environ.get("COMPRESS_MEMO_ENTRIES", 256))
+# Total size of the memoised compressed bodies; a body bigger than
+# COMPRESS_MEMO_MAX_BODY is compressed on every request instead.
+COMPRESS_MEMO_BYTES = int(os.environ.get("COMPRESS_MEMO_BYTES", 16 * 1024 * 1024))
+COMPRESS_MEMO_MAX_BODY = int(os.environ.get("COMPRESS_MEMO_MAX_BODY", 1024 * 1024))
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+_upstream_session = None
+_upstream_session_pid = None
+_upstream_session_lock = threading.Lock()
+
+
+def build_upstream_session():
+    session = requests.Session()
+    # The adapter never retries: upstream_request does that itself so every
+    # attempt passes through the rate limiter and circuit breaker.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=UPSTREAM_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Cookies are passed per request; don't let upstream Set-Cookie headers
+    # leak the session cookie into the cookieless routes.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_upstream_session():
+    # Gunicorn forks workers after importing the app when --preload is used, so
+    # rebuild the session in each new process rather than sharing sockets.
+    global _upstream_session, _upstream_session_pid
+    pid = os.getpid()
+    if _upstream_session is None or _upstream_session_pid != pid:
+        with _upstream_session_lock:
+            if _upstream_session is None or _upstream_session_pid != pid:
+                _upstream_session = build_upstream_session()
+                _upstream_session_pid = pid
+    return _upstream_session
+
+
+def upstream_template(path):
+    # Collapses ids and search text so metrics group by endpoint, e.g.
+    # /resources/res/user/{id}/matches/page/{id}.
+    path = path.split("?", 1)[0]
+    path = re.sub(r"(/res/search/)[^/]+", r"\1{query}", path)
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+class UpstreamBusy(requests.exceptions.RequestException):
+    pass
+
+
+class CircuitOpen(UpstreamBusy):
+    pass
+
+
+class TokenBucket:
+    # Allows `rate` calls per second on average and bursts of up to `burst`.
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    # Closed until CIRCUIT_FAILURES consecutive failures, then open (calls
+    # refused) for CIRCUIT_COOLDOWN seconds, then half-open: one trial call
+    # closes it again or restarts the cooldown.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or time.monotonic() - self.opened_at < CIRCUIT_COOLDOWN:
+                return False
+            self.trial = True
+            return True
+
+    def record(self, ok):
+        # ok=None releases a trial call that never reached upstream.
+        with self._lock:
+            self.trial = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            elif ok is not None:
+                self.failures += 1
+                if self.opened_at is not None or self.failures >= CIRCUIT_FAILURES:
+                    self.opened_at = time.monotonic()
+
+
+WORKER_COUNT = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+upstream_rate_limiter = (
+    TokenBucket(UPSTREAM_RATE_LIMIT / WORKER_COUNT, UPSTREAM_RATE_BURST / WORKER_COUNT)
+    if UPSTREAM_RATE_LIMIT > 0 else None
+)
+circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(endpoint):
+    with _circuit_breakers_lock:
+        breaker = circuit_breakers.get(endpoint)
+        if breaker is None:
+            breaker = circuit_breakers[endpoint] = CircuitBreaker()
+        return breaker
+
+
+def upstream_failed(status):
+    return status in ("timeout", "connection_error", "error", "429") or status.startswith("5")
+
+
+def is_upstream_timeout(exc):
+    # A timeout that exhausts the retry budget surfaces as a ConnectionError
+    # wrapping urllib3's MaxRetryError; treat it as the timeout it is.
+    reason = getattr(exc.args[0] if exc.args else None, "reason", None)
+    return isinstance(reason, (ReadTimeoutError, ConnectTimeoutError))
+
+
+def upstream_attempt(method, path, use_cookies, headers, timeout, **kwargs):
+    labels = {"endpoint": upstream_template(path), "method": method}
+    breaker = circuit_breaker(labels["endpoint"])
+    if not breaker.allow():
+        metrics.inc("ussquash_upstream_rejected_total", dict(labels, reason="circuit_open"))
+        raise CircuitOpen(f"Upstream {labels['endpoint']} is failing; retrying in {CIRCUIT_COOLDOWN:g}s")
+    if upstream_rate_limiter is not None and not upstream_rate_limiter.acquire(UPSTREAM_QUEUE_TIMEOUT):
+        breaker.record(None)
+        metrics.inc("ussquash_upstream_rejected_total", dict(labels, reason="rate_limited"))
+        raise UpstreamBusy("Upstream rate limit reached")
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = get_upstream_session().request(
+            method,
+            f"{USSQUASH_API_BASE}{path}",
+            cookies=COOKIES if use_cookies else None,
+            headers=headers,
+            timeout=timeout,
+            **kwargs,
+        )
+        status = str(response.status_code)
+        metrics.inc("ussquash_upstream_response_bytes_total", labels, len(response.content))
+    except requests.exceptions.Timeout:
+        status = "timeout"
+        raise
+    except requests.exceptions.ConnectionError as exc:
+        if is_upstream_timeout(exc):
+            status = "timeout"
+            raise requests.exceptions.Timeout(*exc.args, request=exc.request) from exc
+        status = "connection_error"
+        raise
+    finally:
+        breaker.record(not upstream_failed(status))
+        metrics.observe("ussquash_upstream_request_duration_seconds", labels, time.perf_counter() - started)
+        metrics.inc("ussquash_upstream_requests_total", dict(labels, status=status))
+    return response
+
+
+def upstream_request(method, path, use_cookies=True, headers=None, read_timeout=None, retries=None, **kwargs):
+    # Only GETs are retried; the tracker add/delete calls must never be
+    # replayed. liveScoreDetails long-polls with its own read_timeout and is
+    # never retried either, so one slow match can't hold a worker for several
+    # timeouts. Read timeouts are not retried for the same reason.
+    if retries is None:
+        retries = UPSTREAM_RETRIES if method in ("GET", "HEAD") and read_timeout is None else 0
+    timeout = (UPSTREAM_CONNECT_TIMEOUT, read_timeout or UPSTREAM_READ_TIMEOUT)
+    attempt = 0
+    while True:
+        try:
+            response = upstream_attempt(method, path, use_cookies, headers, timeout, **kwargs)
+        except requests.exceptions.ConnectionError:
+            if attempt >= retries:
+                raise
+        else:
+            # An upstream that names its own Retry-After is asking us to back
+            # off; hand the failure to the caller rather than sleeping on it.
+            retryable = response.status_code in UPSTREAM_RETRY_STATUSES and "Retry-After" not in response.headers
+            if attempt >= retries or not retryable:
+                break
+        time.sleep(UPSTREAM_BACKOFF * (2 ** attempt))
+        attempt += 1
+    response.raise_for_status()
+    return response
+
+
+def fetch_upstream(path, **kwargs):
+    return upstream_request("GET", path, **kwargs)
+
+
+upstream_route_slots = {
+    policy: threading.BoundedSemaphore(limit) for policy, limit in UPSTREAM_ROUTE_LIMITS.items()
+}
+
+
+def fetch_upstream_limited(path, cache_policy, **kwargs):
+    slots = upstream_route_slots.get(cache_policy)
+    if slots is None:
+        return fetch_upstream(path, **kwargs)
+    if not slots.acquire(timeout=UPSTREAM_QUEUE_TIMEOUT):
+        raise UpstreamBusy(f"Too many concurrent {cache_policy} requests")
+    try:
+        return fetch_upstream(path, **kwargs)
+    finally:
+        slots.release()
+
+
+response_cache = ResponseCache(create_cache_backend())
+
+
+def cache_key(path, use_cookies=True):
+    return f"{'auth' if use_cookies else 'anon'}:{path}"
+
+
+def fetch_cached(path, cache_policy, use_cookies=True, label="upstream data", allow_stale=False, **kwargs):
+    def fetch():
+        logger.info(f"Fetching {label} from: {USSQUASH_API_BASE}{path}")
+        response = fetch_upstream_limited(path, cache_policy, use_cookies=use_cookies, **kwargs)
+        index_upstream_payload(cache_policy, path, response.content)
+        return response.content, response.headers.get("Content-Type", "application/json")
+
+    ttl = CACHE_TTLS.get(cache_policy, 0)
+    stale = stale_ttl(cache_policy) if allow_stale else 0
+    return response_cache.get_or_fetch(cache_key(path, use_cookies), ttl, fetch, stale)
+
+
+def fetch_json(path, cache_policy, **kwargs):
+    entry, _ = fetch_cached(path, cache_policy, **kwargs)
+    return json.loads(entry.body)
+
+
+upstream_pool = ThreadPoolExecutor(max_workers=UPSTREAM_FANOUT_WORKERS, thread_name_prefix="upstream")
+
+
+def iter_fanout(fn, items, limit, pool=None):
+    # Runs fn over items on the shared upstream pool (or `pool`) with at most
+    # `limit` calls in flight for this request, yielding (item, result, error)
+    # in item order. Closing the generator early (a streaming client went
+    # away) or unwinding through it cancels every call not yet started.
+    pool = pool or upstream_pool
+    pending = deque()
+    items = list(items)
+    index = 0
+    try:
+        while index < len(items) or pending:
+            while index < len(items) and len(pending) < limit:
+                pending.append((items[index], pool.submit(fn, items[index])))
+                index += 1
+            item, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                yield item, None, e
+            else:
+                yield item, result, None
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def fanout(fn, items, limit, pool=None):
+    # iter_fanout collected into {item: (result, error)}.
+    return {item: (result, error) for item, result, error in iter_fanout(fn, items, limit, pool)}
+
+
+def requested_fields():
+    fields = {name.strip() for name in request.args.get("fields", "").split(",") if name.strip()}
+    return frozenset(fields) or None
+
+
+def project_fields(data, fields):
+    # Keeps only the named keys of every record, wherever the records sit:
+    # a bare list, a single object, or a wrapper like {"matches": [...]}.
+    if isinstance(data, list):
+        return [project_fields(item, fields) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: value if key in fields else project_fields(value, fields)
+            for key, value in data.items()
+            if key in fields or isinstance(value, (list, dict))
+        }
+    return data
+
+
+def cached_json_response(entry, cache_status, fields=None):
+    # Unprojected bodies go out exactly as upstream sent them, with no
+    # parse/re-encode round trip.
+    body = entry.body
+    if fields:
+        body = json.dumps(project_fields(json.loads(body), fields), separators=(",", ":"))
+    response = Response(body, mimetype="application/json")
+    response.headers["X-Cache"] = cache_status
+    response.headers["X-Cache-Age"] = str(int(time.time() - entry.stored_at))
+    if cache_status == "STALE":
+        response.headers["X-Cache-Stale"] = str(int(time.time() - entry.expires_at))
+    return response
+
+
+def upstream_error_response(label, error, error_message="Error fetching API data.", error_status=500):
+    # The response every route gives for a failed upstream call: upstream's own
+    # status, 504 on a timeout, and 503 with Retry-After when shedding load.
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code
+        logger.error(f"HTTP error for {label}: {error}")
+        return jsonify({"error": str(error), "status": status}), status
+    if isinstance(error, requests.exceptions.Timeout):
+        logger.error(f"Request for {label} timed out")
+        return jsonify({"error": f"{label} API timed out"}), 504
+    if isinstance(error, CircuitOpen):
+        logger.warning(f"Shedding {label} request: {error}")
+        return jsonify({"error": str(error)}), 503, {"Retry-After": f"{CIRCUIT_COOLDOWN:.0f}"}
+    if isinstance(error, UpstreamBusy):
+        logger.warning(f"Shedding {label} request: {error}")
+        return jsonify({"error": str(error)}), 503, {"Retry-After": "1"}
+    logger.error(f"Request error for {label}: {error}")
+    return jsonify({"error": error_message}), error_status
+
+
+def proxy_upstream(
+    path,
+    label,
+    error_message="Error fetching API data.",
+    cache_policy=None,
+    store_lookup=None,
+    local_source="STORE",
+    **kwargs,
+):
+    # store_lookup lets a route answer from local data (the SQLite store or the
+    # leaderboard index) before falling back to the cache and upstream.
+    fields = requested_fields()
+    if store_lookup is not None:
+        try:
+            data = store_lookup()
+            if data is not None:
+                response = jsonify(project_fields(data, fields) if fields else data)
+                response.headers["X-Cache"] = local_source
+                return response
+        except sqlite3.Error as e:
+            logger.error(f"Store lookup for {label} failed: {e}")
+    try:
+        entry, cache_status = fetch_cached(path, cache_policy, label=label, allow_stale=True, **kwargs)
+        return cached_json_response(entry, cache_status, fields)
+    except requests.exceptions.RequestException as e:
+        return upstream_error_response(label, e, error_message)
+    except Exception:
+        logger.exception(f"Unexpected error for {label}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
 @app.route("/")
 def index():
     return redirect("/dashboard")
 
 @app.route("/proxy/user/<int:user_id>/rankings")
 def proxy_user_rankings(user_id):
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}/rankings?history=yes"
-    logger.info(f"Fetching user rankings from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {e}")
-        return jsonify({"error": "Error fetching API data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}/rankings?history=yes",
+        "user rankings",
+        cache_policy="rankings",
+        store_lookup=lambda: store_user_rankings(user_id),
+    )
 
 
 @app.route("/proxy/user/<int:user_id>/rankings-current")
 def proxy_user_rankings_current(user_id):
     # Cookieless proxy: current ranking entries (no history), e.g.
     # https://api.ussquash.com/resources/res/user/{user_id}/rankings
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}/rankings"
-    logger.info(f"Fetching current user rankings from: {api_url}")
-    try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {e}")
-        return jsonify({"error": "Error fetching API data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}/rankings",
+        "current user rankings",
+        use_cookies=False,
+        cache_policy="rankings",
+    )
 
 
 @app.route("/proxy/rankings/<int:group_id>/current")
 def proxy_rankings_group_current(group_id):
     # Cookieless proxy for a single page of the rankings leaderboard, e.g.
     # https://api.ussquash.com/resources/rankings/208/current?divisions=0&pageNumber=87
-    divisions = request.args.get("divisions", "0")
+    # Every other filter (stateId, ...) is passed through to upstream.
+    params = ranking_filters(request.args)
     page_number = request.args.get("pageNumber", "1")
-    api_url = f"https://api.ussquash.com/resources/rankings/{group_id}/current?divisions={divisions}&pageNumber={page_number}"
-    logger.info(f"Fetching rankings group {group_id} page {page_number} from: {api_url}")
-    try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {e}")
-        return jsonify({"error": "Error fetching rankings data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
-    
+    query = urlencode({"divisions": params["divisions"], "pageNumber": page_number, **params})
+    return proxy_upstream(
+        f"/resources/rankings/{group_id}/current?{query}",
+        f"rankings group {group_id} page {page_number}",
+        "Error fetching rankings data.",
+        use_cookies=False,
+        cache_policy="leaderboard",
+        store_lookup=lambda: leaderboard_page(group_id, params, page_number),
+        local_source="INDEX",
+    )
+
+# Hardcode the user ID as requested
+TRACKER_USER_ID = 170053
+TRACKER_LIST_PATH = f"/resources/res/player_tracker/list?userId={TRACKER_USER_ID}"
+
+
 @app.route("/proxy/player_tracker/list")
 def proxy_player_tracker_list_static():
-    # Hardcode the user ID as requested
-    user_id = 170053
-    
-    # Build the URL for the external API
-    api_url = f"https://api.ussquash.com/resources/res/player_tracker/list?userId={user_id}"
-    
-    logging.info(f"Fetching player tracker information from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logging.error(f"HTTP error: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request error: {e}")
-        return jsonify({"error": "Error fetching API data."}), 500
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        TRACKER_LIST_PATH,
+        "player tracker information",
+        cache_policy="tracker",
+    )
 
 @app.route("/proxy/user/<int:user_id>/matches/page/<int:page>")
 def proxy_user_matches(user_id, page):
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}/matches/page/{page}"
-    logger.info(f"Fetching user matches from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {e}")
-        return jsonify({"error": "Error fetching API data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}/matches/page/{page}",
+        "user matches",
+        cache_policy="matches",
+        store_lookup=lambda: store_user_matches_page(user_id, page, MATCH_PAGE_SIZE),
+    )
 
 @app.route("/proxy/user/<int:user_id>/ratings")
 def proxy_user_ratings(user_id):
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}/ratings"
-    logger.info(f"Fetching user ratings from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {e}")
-        return jsonify({"error": "Error fetching API data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}/ratings",
+        "user ratings",
+        cache_policy="ratings",
+        store_lookup=lambda: store_user_ratings(user_id),
+    )
 
 @app.route("/proxy/user/<int:user_id>/ratings-top")
 def proxy_user_ratings_top(user_id):
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}/ratings-top"
-    logger.info(f"Fetching user top rating from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for ratings-top: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for ratings-top: {e}")
-        return jsonify({"error": "Error fetching top rating API data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for ratings-top: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}/ratings-top",
+        "user top rating",
+        "Error fetching top rating API data.",
+        cache_policy="ratings",
+    )
 
 
 @app.route("/proxy/leagues/info/<int:league_id>")
 def proxy_league_info(league_id):
-    api_url = f"https://api.ussquash.com/resources/leagues/info/{league_id}"
-    logger.info(f"Fetching league info from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for league info: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for league info: {e}")
-        return jsonify({"error": "Error fetching league info data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for league info: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/leagues/info/{league_id}",
+        "league info",
+        "Error fetching league info data.",
+        cache_policy="league",
+    )
 
 
 @app.route("/proxy/divisions/<int:division_id>")
 def proxy_division_info(division_id):
-    api_url = f"https://api.ussquash.com/resources/divisions/{division_id}"
-    logger.info(f"Fetching division info from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for division info: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for division info: {e}")
-        return jsonify({"error": "Error fetching division info data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for division info: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/divisions/{division_id}",
+        "division info",
+        "Error fetching division info data.",
+        cache_policy="division",
+    )
 
 
 @app.route("/proxy/divisions/schedule/<int:division_id>")
 def proxy_division_schedule(division_id):
-    api_url = f"https://api.ussquash.com/resources/divisions/schedule/{division_id}"
-    logger.info(f"Fetching division schedule from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for division schedule: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for division schedule: {e}")
-        return jsonify({"error": "Error fetching division schedule data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for division schedule: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/divisions/schedule/{division_id}",
+        "division schedule",
+        "Error fetching division schedule data.",
+        cache_policy="schedule",
+    )
 
 
 @app.route("/proxy/divisions/playerStandings/<int:division_id>")
 def proxy_division_standings(division_id):
-    api_url = f"https://api.ussquash.com/resources/divisions/playerStandings/{division_id}"
-    logger.info(f"Fetching division standings from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for division standings: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for division standings: {e}")
-        return jsonify({"error": "Error fetching division standings data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for division standings: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/divisions/playerStandings/{division_id}",
+        "division standings",
+        "Error fetching division standings data.",
+        cache_policy="standings",
+    )
 
 
 @app.route("/proxy/divisions/standings/<int:division_id>")
 def proxy_division_standings_v2(division_id):
-    api_url = f"https://api.ussquash.com/resources/divisions/standings/{division_id}"
-    logger.info(f"Fetching division standings (v2) from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for division standings v2: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for division standings v2: {e}")
-        return jsonify({"error": "Error fetching division standings data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for division standings v2: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/divisions/standings/{division_id}",
+        "division standings v2",
+        "Error fetching division standings data.",
+        cache_policy="standings",
+    )
 
 
 @app.route("/proxy/teams/<int:team_id>/players")
 def proxy_team_players(team_id):
-    api_url = f"https://api.ussquash.com/resources/teams/{team_id}/players"
-    logger.info(f"Fetching team players from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for team players: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for team players: {e}")
-        return jsonify({"error": "Error fetching team players data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for team players: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/teams/{team_id}/players",
+        "team players",
+        "Error fetching team players data.",
+        cache_policy="team",
+    )
 
 
 @app.route("/proxy/teams/<int:team_id>/schedule")
 def proxy_team_schedule(team_id):
-    api_url = f"https://api.ussquash.com/resources/teams/{team_id}/schedule"
-    logger.info(f"Fetching team schedule from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for team schedule: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for team schedule: {e}")
-        return jsonify({"error": "Error fetching team schedule data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for team schedule: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/teams/{team_id}/schedule",
+        "team schedule",
+        "Error fetching team schedule data.",
+        cache_policy="schedule",
+    )
+
+
+@app.route("/proxy/leagues/scorecards/live")
+def proxy_team_scorecard():
+    scorecard_id = request.args.get("id", type=int)
+    if scorecard_id is None:
+        return jsonify({"error": "Missing scorecard id"}), 400
+    return proxy_upstream(
+        f"/resources/leagues/scorecards/live?id={scorecard_id}",
+        "team scorecard",
+        "Error fetching scorecard data.",
+        cache_policy="scorecard",
+    )
 
 @app.route("/proxy/user/<int:user_id>/record")
 def proxy_user_record(user_id):
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}/record"
-    logger.info(f"Fetching user record from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for record API: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for record API: {e}")
-        return jsonify({"error": "Error fetching user record data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for record API: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}/record",
+        "user record",
+        "Error fetching user record data.",
+        cache_policy="record",
+    )
 
 @app.route("/proxy/user/<int:user_id>")
 def proxy_user_details(user_id):
-    api_url = f"https://api.ussquash.com/resources/res/user/{user_id}"
-    logger.info(f"Fetching user details from: {api_url}")
-    try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for user details API: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for user details API: {e}")
-        return jsonify({"error": "Error fetching user details."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for user details API: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+    return proxy_upstream(
+        f"/resources/res/user/{user_id}",
+        "user details",
+        "Error fetching user details.",
+        cache_policy="user",
+        store_lookup=lambda: store_user_details(user_id),
+    )
 
 # NEW ROUTE: Proxy for search API
 @app.route("/proxy/resources/res/search/<query>")
 def proxy_search(query):
-    api_url = f"https://api.ussquash.com/resources/res/search/{query}"
-    logger.info(f"Fetching search results from: {api_url}")
+    # Typeahead is answered from the local player index whenever it has hits;
+    # only misses go upstream (and feed the index on the way).
     try:
-        response = requests.get(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for search API: {e}")
-        return jsonify({"error": str(e)}), response.status_code
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for search API: {e}")
-        return jsonify({"error": "Error fetching search data."}), 500
-    except Exception as e:
-        logger.error(f"Unexpected error for search API: {e}")
-        return jsonify({"error": "An unexpected error occurred."}), 500
+        results = search_players(query.replace("+", " "), SEARCH_MAX_RESULTS)
+    except sqlite3.Error as e:
+        logger.error(f"Player search index unavailable: {e}")
+        results = []
+    if len(results) >= SEARCH_MIN_LOCAL_RESULTS:
+        response = jsonify(results)
+        response.headers["X-Cache"] = "INDEX"
+        return response
+    return proxy_upstream(
+        f"/resources/res/search/{query}",
+        "search results",
+        "Error fetching search data.",
+        cache_policy="search",
+    )
 
 
 
@@ -361,46 +812,14 @@ def proxy_live_score_details():
     if not match_id:
         return jsonify({"error": "match_id is required"}), 400
 
-    api_url = f"https://api.ussquash.com/resources/res/matches/{match_id}/liveScoreDetails"
-
-    logger.info(f"Fetching live score details from: {api_url}")
-
-    try:
-        response = requests.get(
-            api_url,
-            headers=USSQUASH_HEADERS,
-            cookies=COOKIES,
-            timeout=60
-        )
-
-        response.raise_for_status()
-
-        return jsonify(response.json())
-
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error for liveScoreDetails API: {e}")
-        return jsonify({
-            "error": str(e),
-            "status": response.status_code
-        }), response.status_code
-
-    except requests.exceptions.Timeout:
-        logger.error("LiveScoreDetails timed out")
-        return jsonify({
-            "error": "LiveScoreDetails API timed out"
-        }), 504
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for liveScoreDetails API: {e}")
-        return jsonify({
-            "error": "Error fetching live score details data."
-        }), 500
-
-    except Exception as e:
-        logger.exception("Live score error")
-        return jsonify({
-            "error": str(e)
-        }), 500
+    return proxy_upstream(
+        f"/resources/res/matches/{match_id}/liveScoreDetails",
+        "live score details",
+        "Error fetching live score details data.",
+        cache_policy="live",
+        headers=USSQUASH_HEADERS,
+        read_timeout=LIVE_SCORE_READ_TIMEOUT,
+    )
 
 
 
@@ -417,17 +836,15 @@ def proxy_add_to_tracker():
         if not player_id:
             return jsonify({"error": "Missing playerId"}), 400
 
-        api_url = "https://api.ussquash.com/resources/res/player_tracker/add"
         payload = {"playerId": player_id}
 
-        response = requests.post(
-            api_url,
-            cookies=COOKIES,
+        response = upstream_request(
+            "POST",
+            "/resources/res/player_tracker/add",
             headers={"Content-Type": "application/json"},
             json=payload,
-            timeout=10,
         )
-        response.raise_for_status()
+        response_cache.invalidate(cache_key(TRACKER_LIST_PATH))
 
         if response.content:
             api_response = response.json()
@@ -439,15 +856,14 @@ def proxy_add_to_tracker():
     except Exception as e:
         app.logger.error(f"Exception in proxy_add_to_tracker: {e}", exc_info=True)
         return jsonify({"error": "Server error occurred"}), 500
-    
+
 
 
 @app.route("/proxy/player_tracker/<int:player_id>", methods=["DELETE"])
 def proxy_delete_player(player_id):
     try:
-        api_url = f"https://api.ussquash.com/resources/res/player_tracker/{player_id}"
-        response = requests.delete(api_url, cookies=COOKIES, timeout=10)
-        response.raise_for_status()
+        upstream_request("DELETE", f"/resources/res/player_tracker/{player_id}")
+        response_cache.invalidate(cache_key(TRACKER_LIST_PATH))
         return jsonify({"success": True})
     except Exception as e:
         app.logger.error(f"Error deleting player {player_id}: {e}", exc_info=True)
@@ -455,6 +871,1870 @@ def proxy_delete_player(player_id):
 
 
 
+def fetch_matches_page(user_id, page):
+    data = fetch_json(
+        f"/resources/res/user/{user_id}/matches/page/{page}", "matches", label="user matches"
+    )
+    matches = data.get("matches") if isinstance(data, dict) else None
+    return matches if isinstance(matches, list) else []
+
+
+def estimate_match_pages(user_id):
+    # The /record totals tell us roughly how many pages exist, which lets us
+    # fetch them all at once instead of probing in blind batches.
+    try:
+        record = fetch_json(f"/resources/res/user/{user_id}/record", "record", label="user record")
+    except requests.exceptions.RequestException:
+        return 1
+    total = 0
+    for entry in record if isinstance(record, list) else []:
+        if isinstance(entry, dict):
+            total += int(entry.get("matchesWon") or 0) + int(entry.get("matchesLost") or 0)
+    return max(1, -(-total // MATCH_PAGE_SIZE))
+
+
+def iter_match_pages(user_id):
+    # Yields match pages in order. Pages up to the estimate are fetched
+    # concurrently; past it we probe one page at a time so we stop exactly at
+    # the first short page.
+    estimate = estimate_match_pages(user_id)
+    pending = deque()
+    next_page = 1
+    try:
+        while True:
+            while len(pending) < MATCH_PAGE_CONCURRENCY and (next_page <= estimate or not pending):
+                pending.append(upstream_pool.submit(fetch_matches_page, user_id, next_page))
+                next_page += 1
+            matches = pending.popleft().result()
+            if matches:
+                yield matches
+            if len(matches) < MATCH_PAGE_SIZE:
+                return
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def match_history_key(user_id):
+    return cache_key(f"/api/user/{user_id}/matches")
+
+
+def fetch_match_updates(user_id, known):
+    # Matches that are new or differ from `known` (Matchid -> match). Every
+    # page walked is compared row by row, so scheduled and in-progress matches
+    # near the top pick up their new status and score; pages after the first
+    # are only walked while they still turn up unseen matches.
+    updates = []
+    page = 1
+    while True:
+        matches = fetch_matches_page(user_id, page)
+        updates.extend(m for m in matches if known.get(m.get("Matchid")) != m)
+        unseen = [m for m in matches if m.get("Matchid") not in known]
+        if len(unseen) < len(matches) or len(matches) < MATCH_PAGE_SIZE:
+            break
+        page += 1
+    return updates
+
+
+def refresh_match_history(user_id, history):
+    known = {m.get("Matchid"): m for m in history}
+    updates = fetch_match_updates(user_id, known)
+    changed = {m.get("Matchid"): m for m in updates if m.get("Matchid") in known}
+    new_matches = [m for m in updates if m.get("Matchid") not in known]
+    if updates:
+        logger.info(f"Match history for {user_id}: {len(new_matches)} new, {len(changed)} updated")
+    return new_matches + [changed.get(m.get("Matchid"), m) for m in history]
+
+
+def save_match_history(user_id, history, write_through=True):
+    body = json.dumps(history, separators=(",", ":")).encode()
+    response_cache.set(match_history_key(user_id), body, "application/json", CACHE_TTLS["match_history"])
+    if write_through:
+        try:
+            store_save_matches(user_id, history)
+        except sqlite3.Error as e:
+            logger.error(f"Could not write match history for {user_id} to store: {e}")
+
+
+def load_match_history(user_id):
+    # Returns (matches, cache_status) using the cached history when present,
+    # refreshing page 1 once the regular match TTL has lapsed.
+    entry = response_cache.get(match_history_key(user_id))
+    if entry is None and store_is_fresh(user_id, "matches"):
+        history = store_load_matches(user_id)
+        save_match_history(user_id, history, write_through=False)
+        return history, "STORE"
+    if entry is None:
+        history = []
+        seen = set()
+        for page in iter_match_pages(user_id):
+            for match in page:
+                if match.get("Matchid") not in seen:
+                    seen.add(match.get("Matchid"))
+                    history.append(match)
+        save_match_history(user_id, history)
+        return history, "MISS"
+
+    history = json.loads(entry.body)
+    if time.time() - entry.stored_at < CACHE_TTLS["matches"]:
+        return history, "HIT"
+    history = refresh_match_history(user_id, history)
+    save_match_history(user_id, history)
+    return history, "REFRESHED"
+
+
+@app.route("/api/user/<int:user_id>/matches")
+def api_user_matches(user_id):
+    # All of a user's matches in one response, newest first, de-duplicated by
+    # Matchid. Cold histories are streamed page by page as upstream answers.
+    try:
+        if response_cache.get(match_history_key(user_id)) is not None or store_is_fresh(user_id, "matches"):
+            history, cache_status = load_match_history(user_id)
+            response = jsonify({"userId": user_id, "matches": history, "complete": True})
+            response.headers["X-Cache"] = cache_status
+            return response
+
+        pages = iter_match_pages(user_id)
+        first_page = next(pages, [])
+    except requests.exceptions.RequestException as e:
+        return upstream_error_response(f"match history {user_id}", e, "Error fetching match history.")
+
+    def generate():
+        history = []
+        seen = set()
+        complete = True
+        yield f'{{"userId":{user_id},"matches":['
+        try:
+            current = first_page
+            while current:
+                chunk = []
+                for match in current:
+                    if match.get("Matchid") in seen:
+                        continue
+                    seen.add(match.get("Matchid"))
+                    history.append(match)
+                    chunk.append(json.dumps(match, separators=(",", ":")))
+                if chunk:
+                    yield ("," if len(history) > len(chunk) else "") + ",".join(chunk)
+                current = next(pages, None)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Match history for {user_id} stopped early: {e}")
+            complete = False
+        finally:
+            # Runs on client disconnect too (the server closes this generator),
+            # cancelling any page fetches still queued for this request.
+            pages.close()
+        yield f'],"complete":{"true" if complete else "false"}}}'
+        if complete:
+            save_match_history(user_id, history)
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    # generate() only closes `pages` once it has started; this covers a
+    # client that disconnects before the first chunk.
+    response.call_on_close(pages.close)
+    response.headers["X-Cache"] = "MISS"
+    return response
+
+
+def sync_player(user_id):
+    # Incrementally pulls one player into the store. Matches only walk pages
+    # until a known match turns up, but every row on the pages walked is
+    # upserted so scheduled and in-progress matches get their results;
+    # ratings and rankings are small enough to re-fetch whole.
+    details = fetch_json(f"/resources/res/user/{user_id}", "user", label="user details")
+    if isinstance(details, dict):
+        store_save_player(user_id, details)
+
+    known = store_known_match_ids(user_id)
+    if known:
+        # The store keeps no copy to compare against, so every walked row
+        # counts as changed.
+        updates = fetch_match_updates(user_id, dict.fromkeys(known))
+        new_matches = [m for m in updates if m.get("Matchid") not in known]
+    else:
+        updates = new_matches = [m for page in iter_match_pages(user_id) for m in page]
+    store_save_matches(user_id, updates)
+    response_cache.invalidate(match_history_key(user_id))
+
+    ratings = fetch_json(f"/resources/res/user/{user_id}/ratings", "ratings", label="user ratings")
+    if isinstance(ratings, list):
+        store_save_ratings(user_id, ratings)
+
+    rankings = fetch_json(
+        f"/resources/res/user/{user_id}/rankings?history=yes", "rankings", label="user rankings"
+    )
+    if isinstance(rankings, list):
+        store_save_rankings(user_id, rankings)
+    return len(new_matches)
+
+
+@app.cli.command("sync-store")
+@click.argument("user_ids", nargs=-1, type=int, required=True)
+@click.option("--interval", type=float, default=0, help="Repeat every N seconds instead of running once.")
+def sync_store_command(user_ids, interval):
+    """Sync players' matches, ratings and rankings into the local store."""
+    while True:
+        for user_id in user_ids:
+            try:
+                added = sync_player(user_id)
+                click.echo(f"Synced {user_id}: {added} new matches")
+            except requests.exceptions.RequestException as e:
+                click.echo(f"Sync failed for {user_id}: {e}", err=True)
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+PROFILE_PICTURE_KEYS = (
+    "profilePictureUrl",
+    "ProfilePictureUrl",
+    "profilePicture",
+    "ProfilePicture",
+    "ImageUrl",
+    "imageUrl",
+    "PhotoUrl",
+    "photoUrl",
+)
+
+
+def fetch_user_details(user_id):
+    try:
+        details = store_user_details(user_id)
+    except sqlite3.Error:
+        details = None
+    if details is None:
+        details = fetch_json(f"/resources/res/user/{user_id}", "user", label="user details")
+    return details
+
+
+def user_display_name(details):
+    if not isinstance(details, dict):
+        return None
+    return " ".join(part for part in (details.get("firstName"), details.get("lastName")) if part) or None
+
+
+def extract_profile_picture(details):
+    if not isinstance(details, dict):
+        return None
+    candidates = [details]
+    for nested in ("user", "profile", "player", "userInfo"):
+        if isinstance(details.get(nested), dict):
+            candidates.append(details[nested])
+    for item in candidates:
+        for key in PROFILE_PICTURE_KEYS:
+            if item.get(key):
+                return str(item[key]).strip()
+    return None
+
+
+def extract_top_rating(data):
+    entries = data if isinstance(data, list) else [data]
+    for entry in entries:
+        if isinstance(entry, dict):
+            rating = as_float(entry.get("rating"))
+            if rating is not None:
+                return rating
+    return None
+
+
+# Each batch field maps to a function of the user ID. Fields backed by the same
+# upstream call share its cache entry, so asking for both "picture" and "name"
+# costs one fetch.
+BATCH_FIELDS = {
+    "details": fetch_user_details,
+    "picture": lambda user_id: extract_profile_picture(fetch_user_details(user_id)),
+    "name": lambda user_id: user_display_name(fetch_user_details(user_id)),
+    "ratingTop": lambda user_id: extract_top_rating(
+        fetch_json(f"/resources/res/user/{user_id}/ratings-top", "ratings", label="user top rating")
+    ),
+    "ratings": lambda user_id: fetch_json(
+        f"/resources/res/user/{user_id}/ratings", "ratings", label="user ratings"
+    ),
+    "rankingsCurrent": lambda user_id: fetch_json(
+        f"/resources/res/user/{user_id}/rankings",
+        "rankings",
+        use_cookies=False,
+        label="current user rankings",
+    ),
+}
+
+
+@app.route("/api/users")
+def api_users_batch():
+    # Profile fields for many players in one request, e.g.
+    # /api/users?ids=1,2,3&fields=picture,ratingTop
+    ids = []
+    for raw_id in request.args.get("ids", "").split(","):
+        user_id = as_int(raw_id.strip())
+        if user_id is not None and user_id not in ids:
+            ids.append(user_id)
+    if not ids:
+        return jsonify({"error": "ids is required"}), 400
+    if len(ids) > BATCH_MAX_IDS:
+        return jsonify({"error": f"At most {BATCH_MAX_IDS} ids per request"}), 400
+
+    fields = [f for f in request.args.get("fields", "picture").split(",") if f]
+    unknown = [f for f in fields if f not in BATCH_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    def load(user_id):
+        return {field: BATCH_FIELDS[field](user_id) for field in fields}
+
+    results = iter_fanout(load, ids, BATCH_CONCURRENCY)
+
+    def generate():
+        # Users are streamed as they load, so a client that disconnects
+        # closes `results` and the lookups still queued are cancelled.
+        errors = {}
+        separator = ""
+        yield '{"users":{'
+        for user_id, result, error in results:
+            if error is not None:
+                logger.error(f"Batch profile fetch failed for {user_id}: {error}")
+                errors[str(user_id)] = str(error)
+            else:
+                yield f'{separator}"{user_id}":{json.dumps(result, separators=(",", ":"))}'
+                separator = ","
+        yield f'}},"errors":{json.dumps(errors, separators=(",", ":"))}}}'
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    # Also covers a disconnect before the first chunk, when the generator
+    # never started and so never reaches its own cleanup.
+    response.call_on_close(results.close)
+    return response
+
+
+MIN_POINT_DURATION_SEC = 4
+MAX_POINT_DURATION_SEC = 150
+MIN_MATCH_DURATION_SEC = 240
+COMEBACK_SEQUENCES = {"LWWW", "LLWWW", "WLLWW", "LWLWW"}
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def is_completed_match(match):
+    return str(match.get("Status") or "").upper() in ("C", "RE")
+
+
+def user_is_home(match, user_id):
+    if as_int(match.get("wid1")) == user_id:
+        return True
+    if as_int(match.get("oid1")) == user_id:
+        return False
+    return None
+
+
+def user_won_match(match, user_id):
+    # Same rules as didUserWinMatch in analytics.js: Winner H/V decides when we
+    # know the user's side, WhatKind W/L is only a fallback.
+    is_home = user_is_home(match, user_id)
+    winner = str(match.get("Winner") or "").strip().upper()
+    if winner in ("H", "V") and is_home is not None:
+        return (winner == "H") == is_home
+    return str(match.get("WhatKind") or "").strip().upper() == "W"
+
+
+def game_sequence(match, won):
+    # Per-game W/L from the user's perspective. Scores list the match winner's
+    # points first, so flip them for losses.
+    sequence = []
+    for game in str(match.get("Score") or "").split(","):
+        parts = game.strip().split("-")
+        if len(parts) != 2:
+            return None
+        first, second = as_int(parts[0]), as_int(parts[1])
+        if first is None or second is None or first == second:
+            return None
+        user_points, opponent_points = (first, second) if won else (second, first)
+        sequence.append("W" if user_points > opponent_points else "L")
+    return "".join(sequence) or None
+
+
+def trailing_flags(sequence):
+    # Whether the user was behind, and 0-2 down, before any game was played.
+    user_games = opponent_games = 0
+    trailed = two_down = False
+    for game in sequence:
+        trailed = trailed or opponent_games > user_games
+        two_down = two_down or opponent_games - user_games == 2
+        if game == "W":
+            user_games += 1
+        else:
+            opponent_games += 1
+    return trailed, two_down
+
+
+def summarize_durations(values, ids=None):
+    if not values:
+        return None
+    summary = {
+        "count": len(values),
+        "average": round(sum(values) / len(values), 1),
+        "median": round(statistics.median(values), 1),
+        "min": round(min(values), 1),
+        "max": round(max(values), 1),
+    }
+    if ids is not None:
+        summary["shortestMatchId"] = ids[values.index(min(values))]
+        summary["longestMatchId"] = ids[values.index(max(values))]
+    return summary
+
+
+def compute_match_analytics(user_id, matches):
+    # One pass over the history, oldest first, accumulating everything the
+    # analytics page shows.
+    completed = [m for m in matches if is_completed_match(m) and user_is_home(m, user_id) is not None]
+    completed.sort(key=lambda m: (str(m.get("MatchDate") or ""), as_int(m.get("Matchid")) or 0))
+
+    by_games = {"3": {"wins": 0, "losses": 0}, "4": {"wins": 0, "losses": 0}, "5": {"wins": 0, "losses": 0}}
+    by_weekday = {}
+    wins = losses = 0
+    run_win = run_loss = best_win = best_loss = 0
+    comeback_ids = []
+    trailed = reverse_sweeps = trailed_two_love = 0
+    losses_by_rating = []
+
+    for match in completed:
+        won = user_won_match(match, user_id)
+        wins += won
+        losses += not won
+        if won:
+            run_win, run_loss = run_win + 1, 0
+            best_win = max(best_win, run_win)
+        else:
+            run_win, run_loss = 0, run_loss + 1
+            best_loss = max(best_loss, run_loss)
+
+        sequence = game_sequence(match, won)
+        if sequence and str(len(sequence)) in by_games:
+            by_games[str(len(sequence))]["wins" if won else "losses"] += 1
+        if sequence:
+            was_trailing, was_two_down = trailing_flags(sequence)
+            trailed += was_trailing
+            trailed_two_love += was_two_down
+            if won and sequence in COMEBACK_SEQUENCES:
+                comeback_ids.append(match.get("Matchid"))
+                reverse_sweeps += sequence == "LLWWW"
+
+        played_at = parse_timestamp(match.get("MatchDate"))
+        if played_at is not None:
+            day = by_weekday.setdefault(played_at.strftime("%A"), {"wins": 0, "losses": 0})
+            day["wins" if won else "losses"] += 1
+
+        opponent = as_float(match.get("o1Rating") if user_is_home(match, user_id) else match.get("w1Rating"))
+        if not won and opponent is not None:
+            losses_by_rating.append((opponent, match))
+
+    opponent_ratings = []
+    for match in reversed(completed[-25:]):
+        rating = as_float(match.get("o1Rating") if user_is_home(match, user_id) else match.get("w1Rating"))
+        if rating is not None:
+            opponent_ratings.append(rating)
+
+    total = wins + losses
+    return {
+        "record": {
+            "wins": wins,
+            "losses": losses,
+            "winRate": round(wins / total, 4) if total else None,
+            "byGames": by_games,
+        },
+        "streaks": {
+            "currentType": "W" if run_win else ("L" if run_loss else None),
+            "currentCount": run_win or run_loss,
+            "highestWin": best_win,
+            "highestLoss": best_loss,
+        },
+        "comebacks": {
+            "comebackWins": len(comeback_ids),
+            "trailedMatches": trailed,
+            "reverseSweeps": reverse_sweeps,
+            "trailedTwoLove": trailed_two_love,
+            "matchIds": list(reversed(comeback_ids)),
+        },
+        "opponentRating": {
+            "average": round(sum(opponent_ratings) / len(opponent_ratings), 2) if opponent_ratings else None,
+            "sampleSize": len(opponent_ratings),
+        },
+        "byWeekday": by_weekday,
+        "lastMatch": completed[-1] if completed else None,
+        "topLosses": [
+            {"rating": rating, "match": match}
+            for rating, match in sorted(losses_by_rating, key=lambda item: item[0], reverse=True)[:5]
+        ],
+    }
+
+
+TIME_OF_DAY_BUCKETS = (("Morning", 5, 12), ("Afternoon", 12, 17), ("Evening", 17, 21))
+
+
+def compute_time_of_day_analytics(user_id, matches, start_times):
+    # Record by the wall-clock hour the match started: the first live-scored
+    # point when there is one, else MatchDate if it carries a time.
+    by_time = {}
+    for match in matches:
+        if not is_completed_match(match) or user_is_home(match, user_id) is None:
+            continue
+        started = parse_timestamp(start_times.get(str(match.get("Matchid"))))
+        if started is None:
+            played_at = parse_timestamp(match.get("MatchDate"))
+            if played_at is not None and (played_at.hour, played_at.minute, played_at.second) != (0, 0, 0):
+                started = played_at
+        if started is None:
+            continue
+        name = next((name for name, start, end in TIME_OF_DAY_BUCKETS if start <= started.hour < end), "Night")
+        bucket = by_time.setdefault(name, {"wins": 0, "losses": 0})
+        bucket["wins" if user_won_match(match, user_id) else "losses"] += 1
+    return by_time
+
+
+def compute_ranking_analytics(rankings):
+    periods = {}
+    for entry in rankings if isinstance(rankings, list) else []:
+        period = str(entry.get("RankingPeriod") or "")[:10]
+        if period:
+            periods.setdefault(period, []).append(entry)
+    if not periods:
+        return None
+
+    ordered = sorted(periods)
+    latest = periods[ordered[-1]]
+    previous = {}
+    if len(ordered) > 1:
+        previous = {
+            (e.get("DivisionName"), e.get("RatingGroupDescr")): as_int(e.get("Ranking")) for e in periods[ordered[-2]]
+        }
+
+    divisions = []
+    for entry in latest:
+        ranking = as_int(entry.get("Ranking"))
+        before = previous.get((entry.get("DivisionName"), entry.get("RatingGroupDescr")))
+        divisions.append({
+            "division": entry.get("DivisionName"),
+            "group": entry.get("RatingGroupDescr"),
+            "ranking": ranking,
+            "previousRanking": before,
+            # Positive means the player moved up the table.
+            "change": before - ranking if ranking is not None and before is not None else None,
+        })
+
+    all_division = sorted(
+        (
+            (str(e.get("RankingPeriod"))[:10], as_float(e.get("Rating")))
+            for e in rankings
+            if e.get("DivisionName") == "All" and as_float(e.get("Rating")) is not None
+        ),
+    )
+    highest = max(all_division, key=lambda item: item[1], default=None)
+    # Calendar year to date, as analytics.js always showed it; a player with
+    # no rating periods yet this year has no change.
+    this_year = [item for item in all_division if item[0][:4] == str(datetime.now().year)]
+    by_month = {}
+    for period, rating in all_division:
+        by_month.setdefault(period[:7], []).append(rating)
+    return {
+        "asOf": ordered[-1],
+        "divisions": divisions,
+        "highestRating": {"rating": highest[1], "date": highest[0]} if highest else None,
+        "ytdChange": round(this_year[-1][1] - this_year[0][1], 4) if len(this_year) > 1 else None,
+        "monthlyChanges": {month: round(ratings[-1] - ratings[0], 4) for month, ratings in by_month.items()},
+    }
+
+
+def completed_live_details_path(match_id):
+    return f"/resources/res/matches/{match_id}/liveScoreDetails"
+
+
+def fetch_completed_live_details(match_id):
+    # Point-by-point data for finished matches never changes, so it is cached
+    # far longer than the live proxy's few seconds.
+    data = fetch_json(
+        completed_live_details_path(match_id),
+        "live_completed",
+        headers=USSQUASH_HEADERS,
+        read_timeout=LIVE_SCORE_READ_TIMEOUT,
+        label="live score details",
+    )
+    return data if isinstance(data, list) else []
+
+
+def compute_duration_analytics(matches):
+    has_flag = any(m.get("HasLiveScore") is not None for m in matches)
+    candidates = [
+        m for m in matches
+        if is_completed_match(m) and m.get("Matchid")
+        and (not has_flag or str(m.get("HasLiveScore")).lower() in ("true", "1"))
+    ][:ANALYTICS_MAX_TIMED_MATCHES]
+
+    # Cached details are free; only ANALYTICS_COLD_FETCHES of the rest go
+    # upstream on this pass.
+    match_ids = [m["Matchid"] for m in candidates]
+    cached, cold = [], []
+    for match_id in match_ids:
+        warm = response_cache.get(cache_key(completed_live_details_path(match_id))) is not None
+        (cached if warm else cold).append(match_id)
+    details = fanout(
+        fetch_completed_live_details, cached + cold[:ANALYTICS_COLD_FETCHES], ANALYTICS_LIVE_CONCURRENCY
+    )
+    match_durations = []
+    timed_ids = []
+    point_durations = []
+    start_times = {}
+    for match_id, (events, error) in details.items():
+        if error is not None or not events:
+            continue
+        stamps = sorted(
+            stamp for stamp in (
+                parse_timestamp(e.get("StartDate"))
+                for e in events
+                if str(e.get("Decision") or "").lower() == "point"
+            )
+            if stamp is not None
+        )
+        if stamps:
+            start_times[str(match_id)] = stamps[0].isoformat()
+        if len(stamps) < 2:
+            continue
+        duration = (stamps[-1] - stamps[0]).total_seconds()
+        if duration >= MIN_MATCH_DURATION_SEC:
+            match_durations.append(duration)
+            timed_ids.append(match_id)
+        for before, after in zip(stamps, stamps[1:]):
+            gap = (after - before).total_seconds()
+            if MIN_POINT_DURATION_SEC <= gap <= MAX_POINT_DURATION_SEC:
+                point_durations.append(gap)
+
+    match_summary = summarize_durations(match_durations, timed_ids)
+    if match_summary:
+        match_summary["samples"] = [round(d) for d in match_durations]
+    return {
+        "candidates": len(candidates),
+        "pending": max(len(cold) - ANALYTICS_COLD_FETCHES, 0),
+        "match": match_summary,
+        "point": summarize_durations(point_durations),
+        "startTimes": start_times,
+    }
+
+
+def match_fingerprint(matches):
+    # Changes when a match is added, or when one already in the history gets
+    # a new status or score (a scheduled match being played, a correction).
+    latest = max((as_int(m.get("Matchid")) or 0 for m in matches), default=0)
+    digest = hashlib.sha1()
+    for m in matches:
+        digest.update(f"{m.get('Matchid')}|{m.get('Status')}|{m.get('Score')}\n".encode())
+    return f"{len(matches)}:{latest}:{digest.hexdigest()[:12]}"
+
+
+def build_user_analytics(user_id, matches, fingerprint):
+    rankings = fetch_json(
+        f"/resources/res/user/{user_id}/rankings?history=yes", "rankings", label="user rankings"
+    )
+    durations = compute_duration_analytics(matches)
+    summary = {
+        "userId": user_id,
+        "fingerprint": fingerprint,
+        "matchCount": len(matches),
+        "complete": durations["pending"] == 0,
+        **compute_match_analytics(user_id, matches),
+        "byTimeOfDay": compute_time_of_day_analytics(user_id, matches, durations["startTimes"]),
+        "rankings": compute_ranking_analytics(rankings),
+        "durations": durations,
+    }
+    ttl = CACHE_TTLS["analytics" if summary["complete"] else "analytics_partial"]
+    return json.dumps(summary, separators=(",", ":")).encode(), "application/json", ttl
+
+
+@app.route("/api/user/<int:user_id>/analytics")
+def api_user_analytics(user_id):
+    # Summary of everything analytics.js used to crunch client-side. Keyed by
+    # the match history fingerprint, so it is rebuilt only when that changes,
+    # and concurrent cold requests share one build.
+    try:
+        matches, _ = load_match_history(user_id)
+        fingerprint = match_fingerprint(matches)
+        entry, cache_status = response_cache.get_or_fetch(
+            cache_key(f"/api/user/{user_id}/analytics?v={fingerprint}"),
+            CACHE_TTLS["analytics"],
+            lambda: build_user_analytics(user_id, matches, fingerprint),
+        )
+        return cached_json_response(entry, cache_status)
+    except requests.exceptions.RequestException as e:
+        return upstream_error_response(f"analytics {user_id}", e, "Error fetching analytics data.")
+
+
+PLAYER_TERM_KEYS = ("club", "clubName", "ClubName", "college", "College", "school", "School", "teamName", "TeamName")
+
+
+player_search = PlayerSearchIndex()
+_player_search_seed_lock = threading.Lock()
+
+
+def index_user_payload(user_id, details):
+    if not isinstance(details, dict):
+        return
+    location = ", ".join(str(details[key]) for key in ("city", "state") if details.get(key))
+    player_search.add(
+        user_id,
+        name=user_display_name(details),
+        location=location,
+        picture=extract_profile_picture(details),
+        terms=[str(details[key]) for key in PLAYER_TERM_KEYS if details.get(key)],
+    )
+
+
+def index_leaderboard_rows(rows):
+    for row in rows:
+        if isinstance(row, dict):
+            location = ", ".join(str(row[key]) for key in ("city", "state") if row.get(key))
+            player_search.add(
+                row.get("playerId"),
+                name=user_display_name(row),
+                location=location,
+                terms=[str(row[key]) for key in PLAYER_TERM_KEYS if row.get(key)],
+                rating=as_float(row.get("rating")),
+            )
+
+
+def index_upstream_payload(cache_policy, path, body):
+    # Called for every upstream fetch that goes through the cache; user
+    # details and search results are folded into the player index.
+    if cache_policy not in ("user", "search"):
+        return
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return
+    if cache_policy == "user":
+        match = re.search(r"/res/user/(\d+)$", path)
+        if match:
+            index_user_payload(int(match.group(1)), data)
+        return
+    for row in data if isinstance(data, list) else []:
+        if isinstance(row, dict) and row.get("ObjectType") == "Player":
+            player_search.add(
+                row.get("ObjectId"),
+                name=row.get("ObjectName"),
+                location=row.get("ObjectLocation"),
+                picture=row.get("LogoImageUrl"),
+            )
+
+
+def search_players(query, limit):
+    # The first search in each worker seeds the index from the store's
+    # players, so restarts don't begin cold.
+    if not player_search.seeded:
+        with _player_search_seed_lock:
+            if not player_search.seeded:
+                for player_id, details in store_player_payloads():
+                    index_user_payload(player_id, details)
+                player_search.seeded = True
+    return player_search.search(query, limit)
+
+
+def ensure_match_index(user_id):
+    # Makes sure the store holds the player's full match history, pulling it
+    # through the match-history cache (incrementally when possible).
+    if store_is_fresh(user_id, "matches"):
+        return "STORE"
+    history, cache_status = load_match_history(user_id)
+    if cache_status == "HIT":
+        # Cache hits skip the write-through; the index needs the rows.
+        store_save_matches(user_id, history)
+    return cache_status
+
+
+def format_score_for_player(score, won):
+    # Scores list the match winner's points first; flip them for losses.
+    if not score or str(score).strip().lower() == "unknown":
+        return "No score"
+    games = []
+    for game in str(score).split(","):
+        parts = game.strip().split("-")
+        games.append(f"{parts[1]}-{parts[0]}" if len(parts) == 2 and won is False else game.strip())
+    return ", ".join(games)
+
+
+def match_perspective(match, user_id):
+    # Mirrors getMatchPerspective in playertracker.js.
+    is_home = user_is_home(match, user_id)
+    if is_home is None:
+        return None
+    winner = str(match.get("Winner") or "").strip().upper()
+    won = (winner == "H") == is_home if winner in ("H", "V") else None
+    return {
+        "match": match,
+        "side": "home" if is_home else "visiting",
+        "didWin": won,
+        "opponentId": as_int(match.get("oid1" if is_home else "wid1")),
+        "opponentName": str(match.get("vplayer1" if is_home else "hplayer1") or "").strip() or "Opponent",
+        "userRating": as_float(match.get("w1Rating" if is_home else "o1Rating")),
+        "opponentRating": as_float(match.get("o1Rating" if is_home else "w1Rating")),
+        "date": match.get("MatchDate"),
+        "event": match.get("Descr") or match.get("DivisionDescr") or "Match",
+        "score": format_score_for_player(match.get("Score"), won),
+        "status": match.get("Status"),
+    }
+
+
+@app.route("/api/h2h/<int:player_a>/<int:player_b>")
+def api_head_to_head(player_a, player_b):
+    # Every stored meeting between two players, from player A's side, in the
+    # shape findHeadToHeadMatches in playertracker.js produces. Either
+    # player's full history contains all their meetings, so only one of them
+    # needs to be in the store.
+    if player_a == player_b:
+        return jsonify({"error": "Pick two different players."}), 400
+    try:
+        indexed = player_b if store_is_fresh(player_b, "matches") else player_a
+        cache_status = ensure_match_index(indexed)
+        meetings = [
+            perspective
+            for perspective in (match_perspective(m, player_a) for m in store_head_to_head(player_a, player_b))
+            if perspective is not None and is_completed_match(perspective["match"])
+        ]
+        scanned = store_completed_match_count(indexed)
+    except requests.exceptions.RequestException as e:
+        return upstream_error_response(f"head-to-head {player_a}/{player_b}", e, "Error fetching match history.")
+    except sqlite3.Error as e:
+        logger.error(f"Store error for head-to-head {player_a}/{player_b}: {e}")
+        return jsonify({"error": "Match index unavailable."}), 503
+
+    response = jsonify({
+        "playerA": player_a,
+        "playerB": player_b,
+        "matches": meetings,
+        "playerAWins": sum(1 for m in meetings if m["didWin"] is True),
+        "playerBWins": sum(1 for m in meetings if m["didWin"] is False),
+        "completedScanned": scanned,
+        "exhausted": True,
+        "truncated": False,
+    })
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+@app.route("/api/user/<int:user_id>/opponent-ratings")
+def api_opponent_ratings(user_id):
+    # Opponent ratings over the player's last N completed matches (default
+    # 15, as on the dashboard). A rating missing from a match row is looked up
+    # in the index as of that match's date; only opponents the store knows
+    # nothing about fall back to their current upstream rating.
+    last = min(max(request.args.get("last", default=15, type=int), 1), ANALYTICS_MAX_TIMED_MATCHES)
+    try:
+        cache_status = ensure_match_index(user_id)
+        entries = []
+        for match in store_iter_completed_matches(user_id):
+            if len(entries) >= last:
+                break
+            perspective = match_perspective(match, user_id)
+            if perspective is None:
+                continue
+            rating, source = perspective["opponentRating"], "match"
+            if rating is None and perspective["opponentId"]:
+                rating, source = store_rating_at(perspective["opponentId"], perspective["date"] or "")
+            if rating is None and not perspective["opponentId"]:
+                continue
+            entries.append({
+                "matchId": as_int(match.get("Matchid")),
+                "date": perspective["date"],
+                "opponentId": perspective["opponentId"],
+                "opponentName": perspective["opponentName"],
+                "opponentRating": rating,
+                "userRating": perspective["userRating"],
+                "didWin": perspective["didWin"],
+                "ratingSource": source if rating is not None else None,
+            })
+    except requests.exceptions.RequestException as e:
+        return upstream_error_response(f"opponent ratings {user_id}", e, "Error fetching match history.")
+    except sqlite3.Error as e:
+        logger.error(f"Store error for opponent ratings {user_id}: {e}")
+        return jsonify({"error": "Match index unavailable."}), 503
+
+    missing = {entry["opponentId"] for entry in entries if entry["opponentRating"] is None}
+    current = fanout(
+        lambda player_id: extract_top_rating(
+            fetch_json(f"/resources/res/user/{player_id}/ratings-top", "ratings", label="user top rating")
+        ),
+        missing,
+        BATCH_CONCURRENCY,
+    )
+    for entry in entries:
+        if entry["opponentRating"] is None:
+            entry["opponentRating"], _ = current.get(entry["opponentId"], (None, None))
+            entry["ratingSource"] = "current" if entry["opponentRating"] is not None else None
+    entries = [entry for entry in entries if entry["opponentRating"] is not None]
+
+    ratings = [entry["opponentRating"] for entry in entries]
+    response = jsonify({
+        "userId": user_id,
+        "last": last,
+        "count": len(entries),
+        "averageOpponentRating": round(statistics.mean(ratings), 4) if ratings else None,
+        "matches": entries,
+    })
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+def ranking_filters(args):
+    # Upstream ranking filters from a query string: divisions (default 0),
+    # stateId and anything else, minus paging and our own parameters.
+    filters = {key: value for key, value in args.items() if key not in ("pageNumber", "fields", "format")}
+    filters.setdefault("divisions", "0")
+    return filters
+
+
+def fetch_ranking_page(group_id, params, page):
+    query = urlencode({**params, "pageNumber": page})
+    response = fetch_upstream(f"/resources/rankings/{group_id}/current?{query}", use_cookies=False)
+    data = response.json()
+    if isinstance(data, dict):
+        data = data.get("rankings")
+    return data if isinstance(data, list) else []
+
+
+def iter_ranking_pages(group_id, params, concurrency=LEADERBOARD_PAGE_CONCURRENCY):
+    # Yields (page_number, rows) in page order, keeping `concurrency` pages in
+    # flight and stopping after the first short page.
+    pending = deque()
+    next_page = 1
+    finished = False
+    try:
+        while not finished or pending:
+            while not finished and len(pending) < concurrency:
+                pending.append((next_page, upstream_pool.submit(fetch_ranking_page, group_id, params, next_page)))
+                next_page += 1
+            page, future = pending.popleft()
+            rows = future.result()
+            if rows:
+                yield page, rows
+            if len(rows) < LEADERBOARD_PAGE_SIZE:
+                finished = True
+                for _, extra in pending:
+                    extra.cancel()
+                pending.clear()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+leaderboards = OrderedDict()
+_leaderboard_building = set()
+_leaderboard_lock = threading.Lock()
+# Builds get their own pool because they fan out onto upstream_pool
+# themselves; running them inside it could starve it.
+leaderboard_build_pool = ThreadPoolExecutor(max_workers=LEADERBOARD_MAX_BUILDS, thread_name_prefix="leaderboard-build")
+
+
+def leaderboard_key(group_id, divisions, state_id=None):
+    return (int(group_id), str(divisions), str(state_id) if state_id else None)
+
+
+def build_leaderboard(key):
+    group_id, divisions, state_id = key
+    params = {"divisions": divisions}
+    if state_id:
+        params["stateId"] = state_id
+    started = time.monotonic()
+    try:
+        rows = [row for _, page in iter_ranking_pages(group_id, params) for row in page]
+        index = LeaderboardIndex(rows)
+        index_leaderboard_rows(rows)
+        with _leaderboard_lock:
+            leaderboards[key] = index
+            leaderboards.move_to_end(key)
+            while len(leaderboards) > LEADERBOARD_MAX_BOARDS:
+                leaderboards.popitem(last=False)
+        logger.info(f"Leaderboard {key}: indexed {len(rows)} rows in {time.monotonic() - started:.1f}s")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Leaderboard {key} snapshot failed: {e}")
+    finally:
+        with _leaderboard_lock:
+            _leaderboard_building.discard(key)
+
+
+def request_leaderboard_build(key):
+    # Schedules a build unless one is already running for this key. At most
+    # LEADERBOARD_MAX_BUILDS run at once and none are queued behind them:
+    # when all slots are taken the request is dropped and the caller serves
+    # whatever snapshot it has (or a 503), so arbitrary filter combinations
+    # can't pile up full-board fan-outs.
+    with _leaderboard_lock:
+        if key in _leaderboard_building:
+            return
+        if len(_leaderboard_building) >= LEADERBOARD_MAX_BUILDS:
+            logger.info(f"Leaderboard {key}: {len(_leaderboard_building)} builds in flight, not scheduling another")
+            return
+        _leaderboard_building.add(key)
+    leaderboard_build_pool.submit(build_leaderboard, key)
+
+
+def get_leaderboard(group_id, divisions, state_id=None):
+    # Returns the current snapshot (possibly stale) and schedules a rebuild
+    # when it is missing or older than LEADERBOARD_REFRESH.
+    key = leaderboard_key(group_id, divisions, state_id)
+    with _leaderboard_lock:
+        index = leaderboards.get(key)
+    if index is None or index.age > LEADERBOARD_REFRESH:
+        request_leaderboard_build(key)
+    return index
+
+
+def snapshot_for_filters(group_id, filters):
+    # The board snapshot matching these filters, if one is built and fresh.
+    # Snapshots only exist per division and state.
+    if set(filters) - {"divisions", "stateId"}:
+        return None
+    key = leaderboard_key(group_id, filters.get("divisions", "0"), filters.get("stateId"))
+    with _leaderboard_lock:
+        index = leaderboards.get(key)
+    return index if index is not None and index.age <= LEADERBOARD_REFRESH else None
+
+
+def leaderboard_page(group_id, filters, page_number):
+    # Serves a /proxy/rankings page straight from the snapshot when one exists.
+    index = snapshot_for_filters(group_id, filters)
+    page = as_int(page_number)
+    if index is None or page is None or page < 1:
+        return None
+    start = (page - 1) * LEADERBOARD_PAGE_SIZE
+    return index.rows[start:start + LEADERBOARD_PAGE_SIZE]
+
+
+def leaderboard_unavailable():
+    response = jsonify({"error": "Leaderboard snapshot is still being built."})
+    response.status_code = 503
+    response.headers["Retry-After"] = "30"
+    return response
+
+
+def leaderboard_response(index, payload):
+    response = jsonify(payload)
+    response.headers["X-Leaderboard-Age"] = str(int(index.age))
+    return response
+
+
+def leaderboard_from_request(group_id):
+    return get_leaderboard(group_id, request.args.get("divisions", "0"), request.args.get("stateId"))
+
+
+@app.route("/api/rankings/<int:group_id>")
+def api_leaderboard(group_id):
+    # Arbitrary slices of a board, e.g. ?divisions=0&offset=100&limit=250, or
+    # a name prefix search with ?q=smi.
+    index = leaderboard_from_request(group_id)
+    if index is None:
+        return leaderboard_unavailable()
+    limit = min(max(as_int(request.args.get("limit")) or LEADERBOARD_PAGE_SIZE, 1), 1000)
+    query = request.args.get("q", "").strip()
+    if query:
+        rows = index.search(query, limit)
+        return leaderboard_response(index, {"total": len(index.rows), "rows": rows})
+    offset = max(as_int(request.args.get("offset")) or 0, 0)
+    return leaderboard_response(index, {"total": len(index.rows), "offset": offset, "rows": index.rows[offset:offset + limit]})
+
+
+@app.route("/api/rankings/<int:group_id>/player/<int:player_id>")
+def api_leaderboard_player(group_id, player_id):
+    index = leaderboard_from_request(group_id)
+    if index is None:
+        return leaderboard_unavailable()
+    row = index.player(player_id)
+    if row is None:
+        return jsonify({"error": f"Player {player_id} is not on this leaderboard"}), 404
+    return leaderboard_response(index, row)
+
+
+@app.route("/api/rankings/<int:group_id>/around/<int:rank>")
+def api_leaderboard_around(group_id, rank):
+    index = leaderboard_from_request(group_id)
+    if index is None:
+        return leaderboard_unavailable()
+    radius = min(max(as_int(request.args.get("radius")) or 5, 0), 100)
+    return leaderboard_response(index, {"total": len(index.rows), "rows": index.around(rank, radius)})
+
+
+@app.route("/api/rankings/<int:group_id>/export")
+def api_leaderboard_export(group_id):
+    # A whole board as NDJSON (default) or ?format=csv, with every filter
+    # passed through, e.g. ?divisions=7&stateId=1&format=csv. Pages are
+    # fetched LEADERBOARD_PAGE_CONCURRENCY at a time and each one is streamed
+    # as soon as it and the pages before it have arrived, so rows stay in
+    # ranking order. A fresh snapshot of the board is used when there is one.
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    filters = ranking_filters(request.args)
+    index = snapshot_for_filters(group_id, filters)
+    if index is not None:
+        pages = iter([(1, index.rows)])
+        cache_status = "INDEX"
+    else:
+        pages = iter_ranking_pages(group_id, filters)
+        cache_status = "MISS"
+    try:
+        first_page = next(pages, None)
+    except requests.exceptions.RequestException as e:
+        return upstream_error_response(f"rankings export {group_id}", e, "Error fetching rankings data.", 502)
+
+    def generate():
+        writer = None
+        buffer = io.StringIO()
+        try:
+            current = first_page
+            while current is not None:
+                rows = [row for row in current[1] if isinstance(row, dict)]
+                if export_format == "ndjson":
+                    yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+                elif rows:
+                    if writer is None:
+                        # Columns come from the first row; upstream rows share a shape.
+                        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), extrasaction="ignore")
+                        writer.writeheader()
+                    writer.writerows(rows)
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                current = next(pages, None)
+        except requests.exceptions.RequestException as e:
+            # Headers are already sent; a truncated export is all we can signal.
+            logger.error(f"Rankings export {group_id} stopped early: {e}")
+        finally:
+            if hasattr(pages, "close"):
+                pages.close()
+
+    mimetype = "application/x-ndjson" if export_format == "ndjson" else "text/csv"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    if hasattr(pages, "close"):
+        # Cancels queued page fetches even if the client left before the
+        # first chunk, when generate()'s own finally never runs.
+        response.call_on_close(pages.close)
+    response.headers["X-Cache"] = cache_status
+    if export_format == "csv":
+        name = "-".join(["rankings", str(group_id)] + [f"{key}{value}" for key, value in sorted(filters.items())])
+        response.headers["Content-Disposition"] = f'attachment; filename="{re.sub(r"[^A-Za-z0-9_.-]", "_", name)}.csv"'
+    return response
+
+
+# College teams. Each division is precomputed into one payload: standings,
+# every team's roster and lineup, and the pairwise matchup odds
+# collegeteams.js used to work out in the browser. Building a division also
+# caches a per-team payload (roster, schedule, completed scorecards) for the
+# team modal. Both go through response_cache, so they are coalesced, shared
+# between workers and served stale while they rebuild.
+TEAM_STANDINGS_KEYS = ("standings", "Standings", "playerStandings", "teams")
+TEAM_ROSTER_KEYS = ("players", "PlayerList", "teamPlayers")
+TEAM_SCHEDULE_KEYS = ("matches", "Schedule", "schedule")
+SCORECARD_ROW_KEYS = ("matches", "scorecard", "results")
+COMPLETED_MATCH_STATUSES = {"c", "re", "completed", "complete", "final", "finished", "entered"}
+
+
+def first_value(row, keys, default=None):
+    for key in keys:
+        value = row.get(key)
+        if value is not None and value != "":
+            return value
+    return default
+
+
+def rows_from(data, keys):
+    if isinstance(data, dict):
+        data = next((data[key] for key in keys if isinstance(data.get(key), list)), [])
+    return [row for row in data if isinstance(row, dict)] if isinstance(data, list) else []
+
+
+def normalize_college_team(row, index, division_id):
+    # Same fields and fallbacks as normalizeTeamRow in collegeteams.js.
+    team_wins = as_int(first_value(row, ("TotalTeamwins", "TotalTeamWins", "TeamWins", "Wins", "W")))
+    team_losses = as_int(first_value(row, ("TotalTeamloses", "TotalTeamLoses", "TotalTeamLosses", "TeamLosses", "Losses", "L")))
+    win_pct = None
+    if team_wins is not None and team_losses is not None and team_wins + team_losses > 0:
+        win_pct = team_wins / (team_wins + team_losses) * 100
+    else:
+        raw_pct = as_float(str(first_value(row, ("WinPct", "WinPercentage", "WinningPct", "WinPercent", "Pct"), "")).replace("%", ""))
+        if raw_pct is not None:
+            win_pct = raw_pct * 100 if raw_pct <= 1 else raw_pct
+    rank = as_int(first_value(row, ("hGroup", "Rank", "rank", "Position")))
+    return {
+        "id": as_int(first_value(row, (
+            "TeamId", "TeamID", "teamid", "teamId", "TeamIdRef", "TeamIdentifier", "ClubId", "clubId", "ID", "Id", "id",
+        ))),
+        "name": str(first_value(row, ("Teamname", "TeamName", "TeamDescr", "PlayerDescr", "Name", "ClubDescr", "ClubName"), "Unknown Team")).strip(),
+        "logo": first_value(row, ("LogoImageUrl", "logoImageUrl", "LogoUrl", "logoUrl", "logo"), ""),
+        "divisionId": division_id,
+        "rank": rank if rank is not None else index + 1,
+        "teamWins": team_wins,
+        "teamLosses": team_losses,
+        "individualWins": as_int(first_value(row, (
+            "TotalMatchesWon", "TotalMatchesWonValue", "TotalMatchesWonCount", "IndividualsWon", "IndividualMatchesWon",
+        ))),
+        "individualLosses": as_int(first_value(row, (
+            "TotalMatchesLost", "TotalMatchesLostValue", "TotalMatchesLostCount", "IndividualsLost", "IndividualMatchesLost",
+        ))),
+        "winPct": round(win_pct, 2) if win_pct is not None else None,
+    }
+
+
+def normalize_roster_player(player, index):
+    # Same shape as normalizeRoster in collegeteams.js.
+    position_text = str(first_value(player, ("TeamPosition", "TeamPos", "Position", "TeamPositionName", "position"), ""))
+    position = re.search(r"\d+", position_text)
+    return {
+        "id": as_int(first_value(player, ("playerid", "PlayerId", "PlayerID", "id"))),
+        "name": str(first_value(player, ("player", "PlayerName", "Name", "name"), f"Player {index + 1}")),
+        "rating": as_float(first_value(player, ("CurrentRating", "Rating", "RatingValue", "RatingOther", "rating"))),
+        "position": int(position.group()) if position else None,
+        "positionText": position_text,
+        "wins": as_int(first_value(player, ("wins", "Wins", "W"))),
+        "losses": as_int(first_value(player, ("losses", "Losses", "L"))),
+        "picture": first_value(player, ("profilePictureUrl", "profilePicture", "ProfilePictureUrl"), ""),
+    }
+
+
+def order_lineup(roster):
+    # Rated players by team position (0 = unassigned, last), then rating.
+    rated = [player for player in roster if player["rating"] is not None]
+    rated.sort(key=lambda player: (player["position"] if player["position"] else 999, -player["rating"]))
+    return rated[:TEAM_LINEUP_SIZE]
+
+
+def court_win_probability(rating_a, rating_b):
+    return 1 / (1 + 10 ** (-(rating_a - rating_b) / TEAM_RATING_SCALE))
+
+
+def team_win_probability(probabilities):
+    # Chance of winning a majority of the courts, courts independent.
+    if not probabilities:
+        return 0.5
+    distribution = [1.0] + [0.0] * len(probabilities)
+    for probability in probabilities:
+        shifted = [0.0] * len(distribution)
+        for wins, chance in enumerate(distribution):
+            if chance:
+                shifted[wins] += chance * (1 - probability)
+                shifted[wins + 1] += chance * probability
+        distribution = shifted
+    return sum(distribution[len(probabilities) // 2 + 1:])
+
+
+def lineup_player(player):
+    return {key: player[key] for key in ("id", "name", "rating", "position")}
+
+
+def lineup_matchup(lineup_a, lineup_b):
+    courts = [court_win_probability(a["rating"], b["rating"]) for a, b in zip(lineup_a, lineup_b)]
+    return team_win_probability(courts), courts
+
+
+def team_match_scorecard_id(match):
+    return as_int(first_value(match, ("scorecardid", "ScoreCardId", "ScorecardId", "scoreCardId", "ScorecardID", "scorecardId")))
+
+
+def team_match_completed(match):
+    # Mirrors isCompletedTeamMatch in collegeteams.js.
+    entered = str(first_value(match, ("Score_Entered", "ScoreEntered"), "")).strip().lower()
+    if entered == "scheduled":
+        return False
+    home_wins = as_int(first_value(match, ("Home_Matches_Won", "HomeMatchesWon")))
+    visitor_wins = as_int(first_value(match, ("Visitor_Matches_Won", "VisitorMatchesWon")))
+    if home_wins is not None and visitor_wins is not None and (home_wins > 0 or visitor_wins > 0):
+        return True
+    if entered in COMPLETED_MATCH_STATUSES:
+        return True
+    score = first_value(match, ("matchResult", "MatchResult", "Score", "score", "MatchScore", "TeamScore", "Result", "result"), "")
+    return str(score).strip() != ""
+
+
+def fetch_team_rows(team_id):
+    roster = fetch_json(f"/resources/teams/{team_id}/players", "team", label="team players")
+    schedule = fetch_json(f"/resources/teams/{team_id}/schedule", "schedule", label="team schedule")
+    players = [normalize_roster_player(player, index) for index, player in enumerate(rows_from(roster, TEAM_ROSTER_KEYS))]
+    return players, rows_from(schedule, TEAM_SCHEDULE_KEYS)
+
+
+def fetch_scorecard(scorecard_id):
+    # Completed scorecards don't change; they are cached for a day under the
+    # same key the scorecard proxy reads.
+    data = fetch_json(
+        f"/resources/leagues/scorecards/live?id={scorecard_id}", "scorecard_final", label="team scorecard"
+    )
+    rows = rows_from(data, SCORECARD_ROW_KEYS)
+    return sorted(rows, key=lambda row: as_int(first_value(row, ("positionNumber", "PositionNumber"))) or 999)
+
+
+def build_team_payloads(team_ids):
+    # Rosters and schedules first, then every completed scorecard they list,
+    # each stage one flat fanout so no pool task waits on another. Team
+    # payloads are cached as they're built; returns {team_id: payload}.
+    teams = fanout(fetch_team_rows, team_ids, BATCH_CONCURRENCY)
+    failed = [error for _, error in teams.values() if error is not None]
+    if failed and len(failed) == len(teams):
+        raise failed[0]
+    completed = {}
+    for rows, _ in teams.values():
+        for match in rows[1] if rows else []:
+            scorecard_id = team_match_scorecard_id(match)
+            if scorecard_id and team_match_completed(match):
+                completed[scorecard_id] = True
+    scorecards = fanout(fetch_scorecard, completed, BATCH_CONCURRENCY)
+    payloads = {}
+    for team_id, (rows, error) in teams.items():
+        if error is not None:
+            logger.warning(f"College team {team_id} skipped: {error}")
+            continue
+        roster, schedule = rows
+        lineup = order_lineup(roster)
+        team_scorecards = {}
+        for match in schedule:
+            scorecard_id = team_match_scorecard_id(match)
+            if scorecard_id in scorecards and scorecards[scorecard_id][1] is None and team_match_completed(match):
+                team_scorecards[str(scorecard_id)] = scorecards[scorecard_id][0]
+        payloads[team_id] = {
+            "teamId": team_id,
+            "roster": roster,
+            "lineup": [player["id"] for player in lineup],
+            "averageRating": round(statistics.mean(p["rating"] for p in lineup), 4) if lineup else None,
+            "schedule": schedule,
+            "scorecards": team_scorecards,
+        }
+        response_cache.set(
+            cache_key(f"/api/teams/{team_id}"),
+            json.dumps(payloads[team_id], separators=(",", ":")).encode(),
+            "application/json",
+            CACHE_TTLS["college"],
+        )
+    return payloads
+
+
+def build_college_division(division_id):
+    standings = fetch_json(f"/resources/divisions/standings/{division_id}", "standings", label="division standings v2")
+    teams = [
+        team for team in (
+            normalize_college_team(row, index, division_id)
+            for index, row in enumerate(rows_from(standings, TEAM_STANDINGS_KEYS))
+        )
+        if team["name"] and team["name"] != "Unknown Team"
+    ]
+    teams.sort(key=lambda team: team["rank"])
+    payloads = build_team_payloads([team["id"] for team in teams if team["id"]])
+    lineups = {}
+    for team in teams:
+        payload = payloads.get(team["id"])
+        team["roster"] = payload["roster"] if payload else []
+        team["lineup"] = payload["lineup"] if payload else []
+        team["averageRating"] = payload["averageRating"] if payload else None
+        if team["lineup"]:
+            lineups[team["id"]] = order_lineup(team["roster"])
+    # matchups[a][b] is team a's chance of beating team b.
+    matchups = {
+        str(a): {str(b): round(lineup_matchup(lineups[a], lineups[b])[0], 4) for b in lineups if b != a}
+        for a in lineups
+    }
+    return {"divisionId": division_id, "builtAt": time.time(), "teams": teams, "matchups": matchups}
+
+
+def college_payload(path, build):
+    # (entry, cache_status) for a precomputed college payload.
+    return response_cache.get_or_fetch(
+        cache_key(path),
+        CACHE_TTLS["college"],
+        lambda: (json.dumps(build(), separators=(",", ":")).encode(), "application/json"),
+        stale_ttl("college"),
+    )
+
+
+def college_team_payload(team_id):
+    return college_payload(f"/api/teams/{team_id}", lambda: build_team_payloads([team_id])[team_id])
+
+
+def college_error(label, error):
+    if isinstance(error, KeyError):
+        return jsonify({"error": f"No data for {label}"}), 404
+    return upstream_error_response(label, error, f"Error fetching {label} data.", 502)
+
+
+@app.route("/api/teams/divisions/<int:division_id>")
+def api_college_division(division_id):
+    # Standings, rosters, lineups and the pairwise matchup matrix for one
+    # division in a single response.
+    try:
+        entry, cache_status = college_payload(
+            f"/api/teams/divisions/{division_id}", lambda: build_college_division(division_id)
+        )
+    except requests.exceptions.RequestException as e:
+        return college_error(f"college division {division_id}", e)
+    return cached_json_response(entry, cache_status, requested_fields())
+
+
+@app.route("/api/teams/<int:team_id>")
+def api_college_team(team_id):
+    # Roster, lineup, schedule and completed scorecards for the team modal.
+    try:
+        entry, cache_status = college_team_payload(team_id)
+    except (requests.exceptions.RequestException, KeyError) as e:
+        return college_error(f"college team {team_id}", e)
+    return cached_json_response(entry, cache_status, requested_fields())
+
+
+@app.route("/api/teams/matchup/<int:team_a>/<int:team_b>")
+def api_college_matchup(team_a, team_b):
+    # Court-by-court prediction for any two teams, across divisions too.
+    try:
+        lineups = {}
+        for team_id in (team_a, team_b):
+            entry, _ = college_team_payload(team_id)
+            lineups[team_id] = order_lineup(json.loads(entry.body)["roster"])
+    except (requests.exceptions.RequestException, KeyError) as e:
+        return college_error(f"college matchup {team_a} vs {team_b}", e)
+    if not lineups[team_a] or not lineups[team_b]:
+        return jsonify({"error": "One or both teams do not have rated players."}), 404
+    probability, courts = lineup_matchup(lineups[team_a], lineups[team_b])
+    return jsonify({
+        "teamA": team_a,
+        "teamB": team_b,
+        "probabilityA": round(probability, 4),
+        "projectedScore": [sum(p >= 0.5 for p in courts), sum(p < 0.5 for p in courts)],
+        "averageRatingA": round(statistics.mean(p["rating"] for p in lineups[team_a][:len(courts)]), 4),
+        "averageRatingB": round(statistics.mean(p["rating"] for p in lineups[team_b][:len(courts)]), 4),
+        "courts": [
+            {"position": index + 1, "playerA": lineup_player(a), "playerB": lineup_player(b), "probabilityA": round(p, 4)}
+            for index, (a, b, p) in enumerate(zip(lineups[team_a], lineups[team_b], courts))
+        ],
+    })
+
+
+_background_started_pid = None
+_background_lock = threading.Lock()
+
+
+def leaderboard_refresher():
+    boards = []
+    for item in LEADERBOARD_SNAPSHOTS.split(","):
+        group_id, _, divisions = item.strip().partition(":")
+        if as_int(group_id) is not None:
+            boards.append(leaderboard_key(group_id, divisions or "0"))
+    while True:
+        for key in boards:
+            get_leaderboard(*key)
+        time.sleep(max(LEADERBOARD_REFRESH / 4, 5))
+
+
+def warm_cached(path, cache_policy, horizon, use_cookies=True, **kwargs):
+    # Refreshes one cache entry if it is missing or would expire within
+    # `horizon` seconds, and returns the body either way. Paths and cookie
+    # flags must match the proxy route's so the entry is the one it reads.
+    key = cache_key(path, use_cookies)
+    entry = response_cache.get(key)
+    if entry is not None and entry.expires_at - time.time() > horizon:
+        return entry.body
+    response = fetch_upstream_limited(path, cache_policy, use_cookies=use_cookies, **kwargs)
+    response_cache.set(
+        key,
+        response.content,
+        response.headers.get("Content-Type", "application/json"),
+        CACHE_TTLS.get(cache_policy, 0),
+    )
+    return response.content
+
+
+def tracked_player_ids(data):
+    rows = data.get("trackedPlayers") if isinstance(data, dict) else data
+    ids = []
+    for row in rows if isinstance(rows, list) else []:
+        if isinstance(row, dict):
+            player_id = as_int(row.get("id") or row.get("playerId") or row.get("PlayerId"))
+            if player_id:
+                ids.append(player_id)
+    return ids
+
+
+def standings_team_ids(data):
+    # Same shapes and keys collegeteams.js accepts.
+    if isinstance(data, dict):
+        data = data.get("standings") or data.get("Standings") or data.get("teams") or []
+    ids = []
+    for row in data if isinstance(data, list) else []:
+        if isinstance(row, dict):
+            team_id = as_int(row.get("TeamId") or row.get("TeamID") or row.get("teamId") or row.get("teamid"))
+            if team_id:
+                ids.append(team_id)
+    return ids
+
+
+def schedule_has_match_today(data):
+    if isinstance(data, dict):
+        data = data.get("matches") or data.get("Schedule") or data.get("schedule") or []
+    today = datetime.now().date().isoformat()
+    for row in data if isinstance(data, list) else []:
+        if isinstance(row, dict) and str(row.get("matchdate") or row.get("MatchDate") or "").startswith(today):
+            return True
+    return False
+
+
+def warm_player(user_id, horizon):
+    # The store answers details, match pages, ratings and ranking history for
+    # every worker, so one worker resyncing shortly before it goes stale is
+    # enough; the rest only warm their own cache for the remaining routes.
+    if not store_is_fresh(user_id, "matches", max_age=max(STORE_MAX_AGE - horizon, 1)):
+        sync_player(user_id)
+    warm_cached(f"/resources/res/user/{user_id}/ratings-top", "ratings", horizon)
+    warm_cached(f"/resources/res/user/{user_id}/rankings", "rankings", horizon, use_cookies=False)
+    warm_cached(f"/resources/res/user/{user_id}/record", "record", horizon)
+
+
+def warm_division(division_id, horizon):
+    return standings_team_ids(json.loads(warm_cached(f"/resources/divisions/standings/{division_id}", "standings", horizon)))
+
+
+def warm_team(team_id, horizon):
+    warm_cached(f"/resources/teams/{team_id}/players", "team", horizon)
+    return schedule_has_match_today(json.loads(warm_cached(f"/resources/teams/{team_id}/schedule", "schedule", horizon)))
+
+
+def warm_college_division(division_id, horizon):
+    # Runs after warm_team, so the rebuild reads rosters and schedules from
+    # the cache.
+    path = f"/api/teams/divisions/{division_id}"
+    entry = response_cache.get(cache_key(path))
+    if entry is None or entry.expires_at - time.time() <= horizon:
+        body = json.dumps(build_college_division(division_id), separators=(",", ":")).encode()
+        response_cache.set(cache_key(path), body, "application/json", CACHE_TTLS["college"])
+
+
+class WarmupLeaseLost(Exception):
+    pass
+
+
+def run_warmup(horizon, pool, between_batches=None):
+    # One warm-up cycle. Returns True if any college team plays today.
+    # between_batches, if given, is called after each batch of fetches.
+    def batch_done():
+        if between_batches is not None:
+            between_batches()
+
+    started = time.monotonic()
+    failures = 0
+    try:
+        player_ids = tracked_player_ids(json.loads(warm_cached(TRACKER_LIST_PATH, "tracker", horizon)))
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"Warm-up: tracker list failed: {e}")
+        player_ids, failures = [], 1
+
+    players = fanout(lambda user_id: warm_player(user_id, horizon), player_ids, WARMUP_CONCURRENCY, pool)
+    batch_done()
+    divisions = fanout(lambda division_id: warm_division(division_id, horizon), WARMUP_DIVISIONS, WARMUP_CONCURRENCY, pool)
+    batch_done()
+    team_ids = list(dict.fromkeys(team_id for ids, _ in divisions.values() for team_id in ids or []))
+    teams = fanout(lambda team_id: warm_team(team_id, horizon), team_ids, WARMUP_CONCURRENCY, pool)
+    batch_done()
+    # Division payloads fan out onto upstream_pool themselves, so they are
+    # built one at a time on this thread rather than inside `pool`.
+    colleges = {}
+    for division_id in WARMUP_DIVISIONS:
+        try:
+            colleges[division_id] = (warm_college_division(division_id, horizon), None)
+        except requests.exceptions.RequestException as e:
+            colleges[division_id] = (None, e)
+        batch_done()
+
+    for results in (players, divisions, teams, colleges):
+        failures += sum(1 for _, error in results.values() if error is not None)
+    logger.info(
+        f"Warm-up: {len(players)} players, {len(divisions)} divisions, {len(teams)} teams"
+        f" in {time.monotonic() - started:.1f}s ({failures} failed)"
+    )
+    return any(result for result, _ in teams.values())
+
+
+def warmup_scheduler():
+    # Runs on its own small pool so warm-up never queues behind (or starves)
+    # user requests on upstream_pool. On a shared backend every worker runs
+    # this loop but only the one holding the "warmup" lease does cycles. The
+    # holder renews it for an interval after every batch and, once a cycle
+    # is done, for 1.25 intervals to cover the sleep; the others check back
+    # every quarter interval, so a worker that exits is replaced within the
+    # 1.5-interval horizon below.
+    pool = ThreadPoolExecutor(max_workers=WARMUP_CONCURRENCY, thread_name_prefix="warmup")
+    backend = response_cache.backend
+    owner = f"warmup:{os.getpid()}:{time.monotonic()}"
+    scheduled_today = False
+    holding = False
+
+    def keep_lease():
+        if not backend.renew_lease("warmup", owner, interval):
+            raise WarmupLeaseLost()
+
+    while True:
+        match_day = scheduled_today or datetime.now().weekday() in WARMUP_MATCH_DAYS
+        interval = WARMUP_MATCHDAY_INTERVAL if match_day else WARMUP_INTERVAL
+        if backend.shared:
+            holding = (holding and backend.renew_lease("warmup", owner, interval)) or backend.acquire_lease(
+                "warmup", owner, interval
+            )
+            if not holding:
+                time.sleep(interval / 4)
+                continue
+        try:
+            # Refresh anything that would expire within 1.5 intervals. That
+            # covers the gap to the next cycle plus the cycle's own run time
+            # or a handover to another worker; an entry can still lapse when
+            # a cycle overruns that margin or every worker is down.
+            scheduled_today = run_warmup(interval * 1.5, pool, keep_lease if backend.shared else None)
+        except WarmupLeaseLost:
+            logger.warning("Warm-up lease lapsed mid-cycle; leaving warm-up to its new holder")
+            holding = scheduled_today = False
+        except Exception:
+            logger.exception("Warm-up cycle failed")
+            scheduled_today = False
+        if holding:
+            holding = backend.renew_lease("warmup", owner, interval * 1.25)
+        time.sleep(interval)
+
+
+@app.before_request
+def start_background_threads():
+    # Started lazily from the first request so each gunicorn worker gets its
+    # own threads after the fork.
+    global _background_started_pid
+    pid = os.getpid()
+    if _background_started_pid == pid:
+        return
+    with _background_lock:
+        if _background_started_pid == pid:
+            return
+        _background_started_pid = pid
+    if LEADERBOARD_SNAPSHOTS:
+        threading.Thread(target=leaderboard_refresher, name="leaderboard-refresh", daemon=True).start()
+    if WARMUP_INTERVAL > 0:
+        threading.Thread(target=warmup_scheduler, name="warmup", daemon=True).start()
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        threading.Thread(target=metrics_flusher, name="metrics-flush", daemon=True).start()
+
+
+def live_poller(path, headers=None):
+    # Feed poll for one upstream live resource. It always goes upstream, then
+    # refreshes the cache entry so plain /proxy readers share the result.
+    def poll():
+        response = fetch_upstream_limited(path, "live", headers=headers, read_timeout=LIVE_SCORE_READ_TIMEOUT)
+        response_cache.set(
+            cache_key(path),
+            response.content,
+            response.headers.get("Content-Type", "application/json"),
+            CACHE_TTLS["live"],
+        )
+        return response.json()
+
+    return poll
+
+
+def live_feed_unavailable(poll_url):
+    return jsonify({"error": "Too many live feeds are active.", "poll": poll_url}), 503, {"Retry-After": "10"}
+
+
+def live_feed_disabled(poll_url):
+    # Polling hint for clients when streams are switched off.
+    response = jsonify({"error": "Live streams are disabled; poll instead.", "poll": poll_url})
+    response.headers["Retry-After"] = f"{LIVE_POLL_INTERVAL:.0f}"
+    return response, 503
+
+
+@app.route("/api/live/matches/<int:match_id>/events")
+def api_live_match_events(match_id):
+    # Server-Sent Events for one match's point-by-point feed. Every message is
+    # a "diff" event: replace (full payload), append (new points) or patch.
+    poll_url = f"/proxy/liveScoreDetails?match_id={match_id}"
+    if not LIVE_SSE:
+        return live_feed_disabled(poll_url)
+    feed = get_live_feed(
+        f"match-{match_id}", live_poller(f"/resources/res/matches/{match_id}/liveScoreDetails", USSQUASH_HEADERS)
+    )
+    if feed is None:
+        return live_feed_unavailable(poll_url)
+    return live_event_stream(feed)
+
+
+@app.route("/api/live/scorecards/<int:scorecard_id>/events")
+def api_live_scorecard_events(scorecard_id):
+    poll_url = f"/proxy/leagues/scorecards/live?id={scorecard_id}"
+    if not LIVE_SSE:
+        return live_feed_disabled(poll_url)
+    feed = get_live_feed(f"scorecard-{scorecard_id}", live_poller(f"/resources/leagues/scorecards/live?id={scorecard_id}"))
+    if feed is None:
+        return live_feed_unavailable(poll_url)
+    return live_event_stream(feed)
+
+
+# Instrumentation lives in instrumentation.py; this worker's snapshot adds the
+# response cache's own stats to the registry.
+def current_metrics_snapshot():
+    snapshot = metrics.snapshot()
+    cache = response_cache.stats()
+    snapshot["gauges"] = [
+        ["ussquash_response_cache_entries", [], cache["entries"]],
+        ["ussquash_response_cache_bytes", [], cache["bytes"]],
+    ]
+    for result in ("hits", "misses", "coalesced", "stale"):
+        snapshot["counters"].append(["ussquash_response_cache_lookups_total", [["result", result]], cache[result]])
+    return snapshot
+
+
+def metrics_flusher():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        snapshot = current_metrics_snapshot()
+        if response_cache.backend.shared:
+            # Every worker sees the same shared cache; only the scraping worker
+            # reports its size, or the merge would count it once per worker.
+            snapshot["gauges"] = [
+                gauge for gauge in snapshot["gauges"] if not gauge[0].startswith("ussquash_response_cache_")
+            ]
+        try:
+            write_metrics_snapshot(snapshot)
+        except OSError as e:
+            logger.error(f"Writing metrics snapshot failed: {e}")
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    # Streamed responses (match history, exports, live events) are timed to
+    # their first byte; their bodies are not counted.
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    labels = {"route": route, "method": request.method}
+    metrics.observe("ussquash_http_request_duration_seconds", labels, time.perf_counter() - started)
+    metrics.inc("ussquash_http_requests_total", dict(labels, status=str(response.status_code)))
+    if not response.is_streamed and response.content_length is not None:
+        metrics.inc("ussquash_http_response_bytes_total", {"route": route}, response.content_length)
+    cache_status = response.headers.get("X-Cache")
+    if cache_status:
+        metrics.inc("ussquash_cache_results_total", {"route": route, "result": cache_status})
+    return response
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(
+        render_metrics(load_metrics_snapshots(current_metrics_snapshot())),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.route("/debug/profiler", methods=["GET", "POST", "DELETE"])
+def debug_profiler():
+    # POST starts a fresh profile, DELETE stops it, GET returns the collapsed
+    # stacks so far (?limit=N for the top N). Each worker profiles itself, so
+    # run with WEB_CONCURRENCY=1 to see everything.
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is disabled."}), 404
+    if request.method == "POST":
+        # A profile that is already running keeps its samples.
+        return jsonify({"running": True, "started": profiler.start()})
+    if request.method == "DELETE":
+        profiler.stop()
+        return jsonify({"running": False})
+    limit = request.args.get("limit", type=int)
+    return Response(profiler.report(limit), mimetype="text/plain")
+
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "image/svg+xml")
+
+_compressed_bodies = OrderedDict()
+_compressed_bytes = 0
+_compressed_lock = threading.Lock()
+
+
+def compress_body(body, encoding, etag):
+    # Popular responses (standings, leaderboards, cached proxy bodies) are
+    # byte-identical across requests, so the compressed form is memoised by
+    # ETag instead of being recompressed every time. The memo is bounded by
+    # entry count and by total bytes.
+    global _compressed_bytes
+    key = (etag, encoding)
+    with _compressed_lock:
+        if key in _compressed_bodies:
+            _compressed_bodies.move_to_end(key)
+            return _compressed_bodies[key]
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+    if len(compressed) > COMPRESS_MEMO_MAX_BODY:
+        return compressed
+    with _compressed_lock:
+        previous = _compressed_bodies.pop(key, None)
+        if previous is not None:
+            _compressed_bytes -= len(previous)
+        _compressed_bodies[key] = compressed
+        _compressed_bytes += len(compressed)
+        while _compressed_bodies and (
+            len(_compressed_bodies) > COMPRESS_MEMO_ENTRIES or _compressed_bytes > COMPRESS_MEMO_BYTES
+        ):
+            _, evicted = _compressed_bodies.popitem(last=False)
+            _compressed_bytes -= len(evicted)
+    return compressed
+
+
+def preferred_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+@app.after_request
+def finalize_response(response):
+    # Weak ETag + If-None-Match, then compression. Registered after
+    # record_request_metrics, so it runs first and the metrics see the bytes
+    # actually sent. Streams and static files (which set their own
+    # validators) are left alone.
+    if (
+        request.method not in ("GET", "HEAD")
+        or response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+    ):
+        return response
+    if "ETag" not in response.headers:
+        response.add_etag(weak=True)
+    response.make_conditional(request)
+    if response.status_code != 200:
+        return response
+    mimetype = response.mimetype or ""
+    if (
+        "Content-Encoding" in response.headers
+        or (response.content_length or 0) < COMPRESS_MIN_BYTES
+        or not (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = preferred_encoding()
+    if encoding is None:
+        return response
+    etag, _ = response.get_etag()
+    response.set_data(compress_body(response.get_data(), encoding, etag))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
 @app.route("/trackertool")
 def trackertool():
     return render_template("trackertool.html")
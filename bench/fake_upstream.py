@@ -0,0 +1,521 @@
+# A stand-in for the US Squash API, used by bench/run.py (or on its own) to
+# load-test the proxy without touching the real service.
+#
+# Every route the app proxies is served from the recorded payload shapes in
+# bench/fixtures.json. Payloads are varied per id with a seeded RNG so the
+# same player always gets the same history, and the usual cross-links hold
+# (leaderboard player ids resolve to users, /record totals match the number of
+# match pages, team ids come from the division standings).
+#
+# Latency and failures are injected per request:
+#   --latency-ms / --jitter-ms   base delay and uniform jitter
+#   --route-latency name=ms      override the base delay for one route
+#   --error-rate 0.02            fraction of requests answered with a 503
+#   --timeout-rate 0.01          fraction of requests that hang past the
+#                                app's read timeout
+#
+# GET /_stats returns per-route call counts; POST /_reset clears them.
+#
+#   python bench/fake_upstream.py --port 8765 --latency-ms 120
+#   USSQUASH_API_BASE=http://127.0.0.1:8765 flask run
+
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import copy
+import json
+import os
+import random
+import re
+import threading
+import time
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures.json")
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Casey", "Riley", "Morgan", "Jamie", "Avery", "Quinn"]
+LAST_NAMES = ["Morgan", "Rivera", "Chen", "Patel", "Khan", "Nguyen", "Smith", "Garcia", "Walker", "Shah"]
+GAME_SCORES = ["11-7", "11-9", "12-10", "11-5", "11-3", "13-11", "11-8"]
+
+PLAYER_ID_BASE = 100000
+PAGE_SIZE = 5
+LEADERBOARD_PAGE_SIZE = 50
+TEAMS_PER_DIVISION = 12
+ROSTER_SIZE = 12
+
+
+class FakeUpstream:
+    def __init__(self, latency_ms=80, jitter_ms=40, error_rate=0.0, timeout_rate=0.0,
+                 timeout_sleep=15.0, route_latency=None, players=2000, matches=40,
+                 leaderboard_size=1000, seed=1):
+        with open(FIXTURES_PATH) as fh:
+            self.fixtures = json.load(fh)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_sleep = timeout_sleep
+        self.route_latency = dict(route_latency or {})
+        self.players = players
+        self.matches = matches
+        self.leaderboard_size = leaderboard_size
+        self.seed = seed
+        self.calls = Counter()
+        self.errors = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.server = None
+        self.thread = None
+        self.routes = [
+            ("user_matches", re.compile(r"^/resources/res/user/(\d+)/matches/page/(\d+)$"), self.user_matches),
+            ("user_ratings_top", re.compile(r"^/resources/res/user/(\d+)/ratings-top$"), self.user_ratings_top),
+            ("user_ratings", re.compile(r"^/resources/res/user/(\d+)/ratings$"), self.user_ratings),
+            ("user_rankings", re.compile(r"^/resources/res/user/(\d+)/rankings$"), self.user_rankings),
+            ("user_record", re.compile(r"^/resources/res/user/(\d+)/record$"), self.user_record),
+            ("user", re.compile(r"^/resources/res/user/(\d+)$"), self.user),
+            ("rankings_current", re.compile(r"^/resources/rankings/(\d+)/current$"), self.rankings_current),
+            ("tracker_list", re.compile(r"^/resources/res/player_tracker/list$"), self.tracker_list),
+            ("tracker_add", re.compile(r"^/resources/res/player_tracker/add$"), self.tracker_change),
+            ("tracker_delete", re.compile(r"^/resources/res/player_tracker/(\d+)$"), self.tracker_change),
+            ("search", re.compile(r"^/resources/res/search/([^/]+)$"), self.search),
+            ("league_info", re.compile(r"^/resources/leagues/info/(\d+)$"), self.league_info),
+            ("scorecard_live", re.compile(r"^/resources/leagues/scorecards/live$"), self.scorecard_live),
+            ("division_schedule", re.compile(r"^/resources/divisions/schedule/(\d+)$"), self.division_schedule),
+            ("division_player_standings", re.compile(r"^/resources/divisions/playerStandings/(\d+)$"),
+             self.division_player_standings),
+            ("division_standings", re.compile(r"^/resources/divisions/standings/(\d+)$"), self.division_standings),
+            ("division", re.compile(r"^/resources/divisions/(\d+)$"), self.division),
+            ("team_players", re.compile(r"^/resources/teams/(\d+)/players$"), self.team_players),
+            ("team_schedule", re.compile(r"^/resources/teams/(\d+)/schedule$"), self.team_schedule),
+            ("live_score_details", re.compile(r"^/resources/res/matches/(\d+)/liveScoreDetails$"),
+             self.live_score_details),
+        ]
+
+    # -- payload builders ---------------------------------------------------
+
+    def fixture(self, name):
+        return copy.deepcopy(self.fixtures[name])
+
+    def player_rng(self, *parts):
+        return random.Random("-".join(str(part) for part in (self.seed,) + parts))
+
+    def player_name(self, player_id):
+        rng = self.player_rng("name", player_id)
+        return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    def player_rating(self, player_id):
+        return round(self.player_rng("rating", player_id).uniform(2.5, 6.5), 2)
+
+    def match_count(self, player_id):
+        rng = self.player_rng("matches", player_id)
+        return rng.randint(max(1, self.matches // 2), max(1, self.matches * 3 // 2))
+
+    def random_player(self, rng, exclude=None):
+        while True:
+            player_id = PLAYER_ID_BASE + rng.randint(1, self.players)
+            if player_id != exclude:
+                return player_id
+
+    def user(self, user_id, query):
+        user_id = int(user_id)
+        payload = self.fixture("user")
+        payload["id"] = user_id
+        payload["firstName"], payload["lastName"] = self.player_name(user_id)
+        payload["profilePictureUrl"] = f"https://assets.ussquash.com/profile/{user_id}.jpg"
+        return payload
+
+    def build_match(self, user_id, index):
+        rng = self.player_rng("match", user_id, index)
+        opponent = self.random_player(rng, exclude=user_id)
+        home = rng.random() < 0.5
+        user_won = rng.random() < 0.55
+        games = rng.choice([3, 3, 4, 4, 5])
+        winner_games = [rng.choice(GAME_SCORES) for _ in range(3)]
+        loser_games = ["-".join(reversed(rng.choice(GAME_SCORES).split("-"))) for _ in range(games - 3)]
+        # The match winner always takes the last game; the others are shuffled.
+        head = loser_games + winner_games[:-1]
+        rng.shuffle(head)
+        sequence = head + winner_games[-1:]
+        match = self.fixture("match")
+        match["Matchid"] = user_id * 1000 + index
+        match["MatchDate"] = (datetime(2025, 3, 1) - timedelta(days=index * 6)).strftime("%Y-%m-%dT%H:%M:%S")
+        match["Score"] = ",".join(sequence)
+        match["Winner"] = "H" if home == user_won else "V"
+        match["wid1"], match["oid1"] = (user_id, opponent) if home else (opponent, user_id)
+        match["hplayer1"] = " ".join(self.player_name(match["wid1"]))
+        match["vplayer1"] = " ".join(self.player_name(match["oid1"]))
+        match["w1Rating"] = self.player_rating(match["wid1"])
+        match["o1Rating"] = self.player_rating(match["oid1"])
+        match["HasLiveScore"] = 1 if rng.random() < 0.3 else 0
+        return match
+
+    def user_matches(self, user_id, page, query):
+        user_id, page = int(user_id), int(page)
+        total = self.match_count(user_id)
+        start = (page - 1) * PAGE_SIZE
+        return {"matches": [self.build_match(user_id, index) for index in range(start, min(total, start + PAGE_SIZE))]}
+
+    def user_record(self, user_id, query):
+        user_id = int(user_id)
+        total = self.match_count(user_id)
+        won = 0
+        for index in range(total):
+            match = self.build_match(user_id, index)
+            won += match["Winner"] == ("H" if match["wid1"] == user_id else "V")
+        record = self.fixture("record")
+        league = total // 3
+        record[0]["matchesWon"] = won - min(won, league // 2)
+        record[0]["matchesLost"] = total - league - record[0]["matchesWon"]
+        record[1]["matchesWon"] = min(won, league // 2)
+        record[1]["matchesLost"] = league - record[1]["matchesWon"]
+        return record
+
+    def user_ratings(self, user_id, query):
+        rating = self.player_rating(int(user_id))
+        rows = self.fixture("ratings")
+        for index, row in enumerate(rows):
+            row["Rating"] = round(rating - index * 0.05, 2)
+        return rows
+
+    def user_ratings_top(self, user_id, query):
+        rows = self.fixture("ratings_top")
+        rows[0]["rating"] = self.player_rating(int(user_id))
+        return rows
+
+    def user_rankings(self, user_id, query):
+        user_id = int(user_id)
+        rows = self.fixture("rankings")
+        rank = user_id - PLAYER_ID_BASE
+        for index, row in enumerate(rows):
+            row["Ranking"] = rank + index * 3
+            row["Rating"] = round(self.player_rating(user_id) - index * 0.05, 2)
+        if "history" not in query:
+            return rows[:1]
+        return rows
+
+    def rankings_current(self, group_id, query):
+        page = int((query.get("pageNumber") or ["1"])[0] or 1)
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE
+        rows = []
+        for rank in range(start + 1, min(self.leaderboard_size, start + LEADERBOARD_PAGE_SIZE) + 1):
+            row = self.fixture("leaderboard_row")
+            row["ranking"] = rank
+            row["playerId"] = PLAYER_ID_BASE + rank
+            row["firstName"], row["lastName"] = self.player_name(row["playerId"])
+            row["rating"] = round(7.0 - rank * (4.0 / max(1, self.leaderboard_size)), 3)
+            rows.append(row)
+        return rows
+
+    def tracker_list(self, query):
+        payload = self.fixture("tracker_list")
+        template = payload["trackedPlayers"][0]
+        payload["trackedPlayers"] = []
+        for offset in range(1, 11):
+            row = dict(template)
+            row["id"] = PLAYER_ID_BASE + offset
+            row["firstName"], row["lastName"] = self.player_name(row["id"])
+            payload["trackedPlayers"].append(row)
+        return payload
+
+    def tracker_change(self, *args):
+        return {"success": True}
+
+    def search(self, text, query):
+        rows = []
+        template = self.fixture("search")[0]
+        rng = self.player_rng("search", text.lower())
+        for _ in range(8):
+            row = dict(template)
+            row["ObjectId"] = self.random_player(rng)
+            row["ObjectName"] = " ".join(self.player_name(row["ObjectId"]))
+            rows.append(row)
+        return rows
+
+    def league_info(self, league_id, query):
+        payload = self.fixture("league_info")
+        payload["id"] = int(league_id)
+        return payload
+
+    def division(self, division_id, query):
+        payload = self.fixture("division")
+        payload["id"] = int(division_id)
+        return payload
+
+    def division_team_ids(self, division_id):
+        return [int(division_id) * 100 + index for index in range(1, TEAMS_PER_DIVISION + 1)]
+
+    def division_standings(self, division_id, query):
+        rows = []
+        for position, team_id in enumerate(self.division_team_ids(division_id), start=1):
+            row = self.fixture("standing")
+            row["TeamId"] = team_id
+            row["Teamname"] = f"Team {team_id}"
+            row["LogoImageUrl"] = f"https://assets.ussquash.com/logos/{team_id}.png"
+            row["Wins"] = TEAMS_PER_DIVISION - position
+            row["Losses"] = position - 1
+            row["Position"] = position
+            rows.append(row)
+        return rows
+
+    def division_player_standings(self, division_id, query):
+        rows = []
+        for team_id in self.division_team_ids(division_id):
+            for player in self.team_players(team_id, query)[:3]:
+                row = self.fixture("player_standing")
+                row["PlayerId"] = player["playerid"]
+                row["PlayerName"] = player["player"]
+                row["TeamName"] = f"Team {team_id}"
+                rows.append(row)
+        return rows
+
+    def team_players(self, team_id, query):
+        team_id = int(team_id)
+        rng = self.player_rng("roster", team_id)
+        rows = []
+        for position in range(1, ROSTER_SIZE + 1):
+            row = self.fixture("roster_player")
+            row["playerid"] = self.random_player(rng)
+            row["player"] = " ".join(self.player_name(row["playerid"]))
+            row["CurrentRating"] = self.player_rating(row["playerid"])
+            row["TeamPosition"] = str(position if position <= 9 else 0)
+            row["profilePictureUrl"] = f"https://assets.ussquash.com/profile/{row['playerid']}.jpg"
+            rows.append(row)
+        return rows
+
+    def build_team_match(self, home_id, visitor_id, index, played):
+        row = self.fixture("team_match")
+        row["matchdate"] = (datetime(2025, 2, 1) + timedelta(days=(index - 6) * 7)).strftime("%Y-%m-%dT%H:%M:%S")
+        row["hteamid"], row["vteamid"] = home_id, visitor_id
+        row["wTeamName"], row["oTeamName"] = f"Team {home_id}", f"Team {visitor_id}"
+        row["scorecardId"] = home_id * 1000 + visitor_id % 1000
+        if played:
+            home_wins = self.player_rng("team-match", home_id, visitor_id).randint(0, 9)
+            row["matchResult"] = f"{home_wins}-{9 - home_wins}"
+            row["Status"] = "Completed"
+        else:
+            row["matchResult"] = ""
+            row["Status"] = "Scheduled"
+        return row
+
+    def team_schedule(self, team_id, query):
+        team_id = int(team_id)
+        division_id = team_id // 100
+        rows = []
+        for index, other in enumerate(team for team in self.division_team_ids(division_id) if team != team_id):
+            home, visitor = (team_id, other) if index % 2 else (other, team_id)
+            rows.append(self.build_team_match(home, visitor, index, played=index < 7))
+        return rows
+
+    def division_schedule(self, division_id, query):
+        teams = self.division_team_ids(division_id)
+        return [
+            self.build_team_match(home, visitor, index, played=index < 7)
+            for index, (home, visitor) in enumerate(zip(teams[::2], teams[1::2]))
+        ]
+
+    def live_score_details(self, match_id, query):
+        rng = self.player_rng("live", match_id)
+        started = datetime(2025, 1, 18, 10, 0, 0)
+        events = []
+        for game in range(1, rng.choice([3, 4, 5]) + 1):
+            home = visitor = 0
+            while max(home, visitor) < 11 or abs(home - visitor) < 2:
+                started += timedelta(seconds=rng.randint(12, 45))
+                if rng.random() < 0.5:
+                    home += 1
+                else:
+                    visitor += 1
+                event = self.fixture("live_point")
+                event.update({
+                    "StartDate": started.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "Game_Number": game,
+                    "HomeScore": home,
+                    "VisitorScore": visitor,
+                })
+                events.append(event)
+            started += timedelta(seconds=90)
+        return events
+
+    def scorecard_live(self, query):
+        scorecard_id = int((query.get("id") or ["0"])[0] or 0)
+        rng = self.player_rng("scorecard", scorecard_id)
+        rows = []
+        for position in range(1, 10):
+            row = self.fixture("scorecard_row")
+            row["positionNumber"] = position
+            row["homePlayer"] = " ".join(self.player_name(self.random_player(rng)))
+            row["visitorPlayer"] = " ".join(self.player_name(self.random_player(rng)))
+            row["winner"] = rng.choice(["H", "V"])
+            rows.append(row)
+        return rows
+
+    # -- serving -------------------------------------------------------------
+
+    def match(self, path):
+        for name, pattern, handler in self.routes:
+            found = pattern.match(path)
+            if found:
+                return name, handler, found.groups()
+        return None, None, ()
+
+    def delay(self, name):
+        base = self.route_latency.get(name, self.latency_ms)
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, base + jitter) / 1000.0)
+
+    def roll(self):
+        with self.lock:
+            return self.rng.random()
+
+    def handle(self, method, raw_path):
+        parts = urlsplit(raw_path)
+        query = parse_qs(parts.query, keep_blank_values=True)
+        name, handler, args = self.match(parts.path)
+        if handler is None:
+            return 404, {"error": f"No fixture for {parts.path}"}
+        with self.lock:
+            self.calls[name] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self.delay(name)
+            roll = self.roll()
+            if roll < self.timeout_rate:
+                with self.lock:
+                    self.errors[f"{name}:timeout"] += 1
+                time.sleep(self.timeout_sleep)
+                return 504, {"error": "Injected timeout"}
+            if roll < self.timeout_rate + self.error_rate:
+                with self.lock:
+                    self.errors[f"{name}:503"] += 1
+                return 503, {"error": "Injected failure"}
+            return 200, handler(*args, query)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "total": sum(self.calls.values()),
+                "errors": dict(self.errors),
+                "maxInFlight": self.max_in_flight,
+            }
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.errors.clear()
+            self.max_in_flight = 0
+
+    def make_handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                if self.path == "/_stats":
+                    return self.send_json(200, upstream.stats())
+                if self.path == "/_reset":
+                    upstream.reset()
+                    return self.send_json(200, {"success": True})
+                status, payload = upstream.handle(self.command, self.path)
+                try:
+                    self.send_json(status, payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            do_GET = do_POST = do_DELETE = dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-upstream", daemon=True)
+        self.thread.start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def parse_route_latency(values):
+    overrides = {}
+    for value in values or []:
+        name, _, ms = value.partition("=")
+        overrides[name.strip()] = float(ms)
+    return overrides
+
+
+def add_fake_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=80, help="base upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=40, help="uniform jitter around the base latency")
+    parser.add_argument("--route-latency", action="append", metavar="NAME=MS",
+                        help="per-route latency override, e.g. user_matches=250")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--timeout-sleep", type=float, default=15.0, help="seconds a hung request sleeps")
+    parser.add_argument("--players", type=int, default=2000, help="size of the fake player population")
+    parser.add_argument("--matches", type=int, default=40, help="average match history length")
+    parser.add_argument("--leaderboard-size", type=int, default=1000, help="rows per ranking group")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def fake_from_args(args):
+    return FakeUpstream(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_sleep=args.timeout_sleep,
+        route_latency=parse_route_latency(args.route_latency),
+        players=args.players,
+        matches=args.matches,
+        leaderboard_size=args.leaderboard_size,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake US Squash API for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    upstream = fake_from_args(args)
+    url = upstream.start(args.host, args.port)
+    print(f"Fake US Squash API listening on {url}", flush=True)
+    try:
+        upstream.thread.join()
+    except KeyboardInterrupt:
+        upstream.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+# Load-test and latency benchmark for the proxy.
+#
+# Starts the fake US Squash API (bench/fake_upstream.py) in-process, boots the
+# app under gunicorn with USSQUASH_API_BASE pointed at it, then replays the
+# page-load traces in bench/traces.json. A trace is a list of steps; the URLs
+# in a step are fetched in parallel (like a browser), steps run in order.
+#
+# Reported per trace: page-load and per-request p50/p95/p99, errors and
+# X-Cache outcomes; overall requests/sec and upstream calls by route.
+#
+#   python bench/run.py
+#   python bench/run.py --traces dashboard,analytics --sessions 200 --concurrency 20
+#   ASYNC_MODE=1 python bench/run.py --workers 1 --latency-ms 500
+#   python bench/run.py --target http://127.0.0.1:5000 --fake http://127.0.0.1:8765
+#   python bench/run.py --json bench_output.json
+#
+# Every fresh run starts with a cold cache and an empty SQLite store, so the
+# first page loads of each player measure the cold path; --warmup excludes
+# that many page loads per trace from the statistics.
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from fake_upstream import PLAYER_ID_BASE, TEAMS_PER_DIVISION, add_fake_arguments, fake_from_args
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+TRACES_PATH = os.path.join(BENCH_DIR, "traces.json")
+
+COLLEGE_DIVISIONS = [5733, 5736, 5735, 5734]
+TRACKED_PLAYERS = 10
+BROWSER_CONNECTIONS = 6
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def placeholders(rng, args):
+    # Ids follow the fake upstream's scheme so every URL resolves to data.
+    user = PLAYER_ID_BASE + rng.randint(1, args.users)
+    return {
+        "user": user,
+        "tracked": PLAYER_ID_BASE + rng.randint(1, TRACKED_PLAYERS),
+        "match": user * 1000 + rng.randint(0, 9),
+        "team": rng.choice(COLLEGE_DIVISIONS) * 100 + rng.randint(1, TEAMS_PER_DIVISION),
+        "roster": ",".join(str(PLAYER_ID_BASE + rng.randint(1, args.players)) for _ in range(12)),
+        "offset": 50 * rng.randint(0, 9),
+        "page": rng.randint(1, 10),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.page_loads = {}
+        self.requests = {}
+        self.errors = Counter()
+        self.cache = Counter()
+        self.total_requests = 0
+
+    def page(self, trace, seconds):
+        with self.lock:
+            self.page_loads.setdefault(trace, []).append(seconds)
+
+    def request(self, trace, seconds, status, cache_status):
+        with self.lock:
+            self.requests.setdefault(trace, []).append(seconds)
+            self.total_requests += 1
+            if status >= 400:
+                self.errors[f"{trace}:{status}"] += 1
+            self.cache[cache_status or "-"] += 1
+
+
+class Replayer:
+    def __init__(self, base_url, traces, args):
+        self.base_url = base_url.rstrip("/")
+        self.traces = traces
+        self.args = args
+        self.local = threading.local()
+        self.fetch_pool = ThreadPoolExecutor(max_workers=args.concurrency * BROWSER_CONNECTIONS)
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def fetch(self, trace, path, recorder):
+        started = time.perf_counter()
+        try:
+            response = self.session().get(self.base_url + path, timeout=self.args.timeout)
+            response.content
+            status, cache_status = response.status_code, response.headers.get("X-Cache")
+        except requests.exceptions.RequestException:
+            status, cache_status = 599, None
+        if recorder is not None:
+            recorder.request(trace, time.perf_counter() - started, status, cache_status)
+
+    def page_load(self, trace, rng, recorder):
+        values = placeholders(rng, self.args)
+        started = time.perf_counter()
+        for step in self.traces[trace]:
+            futures = [
+                self.fetch_pool.submit(self.fetch, trace, path.format(**values), recorder)
+                for path in step
+            ]
+            for future in futures:
+                future.result()
+        if recorder is not None:
+            recorder.page(trace, time.perf_counter() - started)
+
+    def run(self, trace_names, sessions, recorder, seed):
+        jobs = [(name, random.Random(f"{seed}-{name}-{index}")) for name in trace_names for index in range(sessions)]
+        random.Random(seed).shuffle(jobs)
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            list(pool.map(lambda job: self.page_load(job[0], job[1], recorder), jobs))
+
+    def close(self):
+        self.fetch_pool.shutdown(wait=True)
+
+
+def start_app(upstream_url, args, store_dir):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "USSQUASH_API_BASE": upstream_url,
+        "WEB_CONCURRENCY": str(args.workers),
+        "MATCH_STORE_PATH": os.path.join(store_dir, "bench.sqlite3"),
+        "CACHE_SHARED_PATH": os.path.join(store_dir, "cache.sqlite3"),
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "app:app"],
+        cwd=REPO_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode}")
+        try:
+            requests.get(base_url + "/", timeout=1)
+            return process, base_url
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("gunicorn did not start within 30s")
+
+
+def upstream_stats(fake, fake_url):
+    if fake is not None:
+        return fake.stats()
+    if fake_url:
+        try:
+            return requests.get(fake_url.rstrip("/") + "/_stats", timeout=5).json()
+        except requests.exceptions.RequestException:
+            pass
+    return None
+
+
+def reset_upstream(fake, fake_url):
+    if fake is not None:
+        fake.reset()
+    elif fake_url:
+        try:
+            requests.post(fake_url.rstrip("/") + "/_reset", timeout=5)
+        except requests.exceptions.RequestException:
+            pass
+
+
+def summarize(recorder, trace_names, elapsed, upstream):
+    report = {"elapsedSeconds": round(elapsed, 3), "requests": recorder.total_requests,
+              "requestsPerSecond": round(recorder.total_requests / elapsed, 1) if elapsed else 0.0,
+              "traces": {}, "xCache": dict(recorder.cache), "errors": dict(recorder.errors)}
+    for name in trace_names:
+        pages = recorder.page_loads.get(name, [])
+        calls = recorder.requests.get(name, [])
+        report["traces"][name] = {
+            "pageLoads": len(pages),
+            "pageP50Ms": round(percentile(pages, 50) * 1000, 1),
+            "pageP95Ms": round(percentile(pages, 95) * 1000, 1),
+            "pageP99Ms": round(percentile(pages, 99) * 1000, 1),
+            "requests": len(calls),
+            "requestP50Ms": round(percentile(calls, 50) * 1000, 1),
+            "requestP95Ms": round(percentile(calls, 95) * 1000, 1),
+            "requestP99Ms": round(percentile(calls, 99) * 1000, 1),
+        }
+    if upstream is not None:
+        page_loads = sum(len(recorder.page_loads.get(name, [])) for name in trace_names)
+        report["upstream"] = upstream
+        report["upstreamCallsPerPageLoad"] = round(upstream["total"] / page_loads, 2) if page_loads else 0.0
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['elapsedSeconds']}s "
+          f"({report['requestsPerSecond']} req/s)\n")
+    header = f"{'trace':<14}{'loads':>7}{'page p50':>10}{'p95':>9}{'p99':>9}{'reqs':>8}{'req p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report["traces"].items():
+        print(f"{name:<14}{row['pageLoads']:>7}{row['pageP50Ms']:>10}{row['pageP95Ms']:>9}{row['pageP99Ms']:>9}"
+              f"{row['requests']:>8}{row['requestP50Ms']:>9}{row['requestP95Ms']:>9}{row['requestP99Ms']:>9}")
+    print("\n(times in ms)")
+    print("X-Cache:", ", ".join(f"{key}={count}" for key, count in sorted(report["xCache"].items())) or "-")
+    if report["errors"]:
+        print("Errors:", ", ".join(f"{key}={count}" for key, count in sorted(report["errors"].items())))
+    upstream = report.get("upstream")
+    if upstream is not None:
+        print(f"\nUpstream calls: {upstream['total']} ({report['upstreamCallsPerPageLoad']} per page load, "
+              f"max {upstream['maxInFlight']} in flight)")
+        for route, count in sorted(upstream["calls"].items(), key=lambda item: -item[1]):
+            print(f"  {route:<28}{count:>7}")
+        if upstream["errors"]:
+            print("Injected upstream failures:", ", ".join(f"{key}={count}" for key, count in sorted(upstream["errors"].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay page-load traces against the proxy.")
+    parser.add_argument("--traces", default="dashboard,analytics,collegeteams,playertracker,rankings",
+                        help="comma-separated trace names from bench/traces.json")
+    parser.add_argument("--sessions", type=int, default=50, help="measured page loads per trace")
+    parser.add_argument("--warmup", type=int, default=0, help="unmeasured page loads per trace before measuring")
+    parser.add_argument("--concurrency", type=int, default=10, help="page loads in flight at once")
+    parser.add_argument("--users", type=int, default=50, help="distinct players the traces visit")
+    parser.add_argument("--timeout", type=float, default=90.0, help="client timeout per request")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers (WEB_CONCURRENCY)")
+    parser.add_argument("--target", help="benchmark an already running app instead of starting one")
+    parser.add_argument("--fake", help="use an already running fake upstream (for --target runs)")
+    parser.add_argument("--json", dest="json_path", help="also write the report as JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="show the app's log output")
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    with open(TRACES_PATH) as fh:
+        traces = json.load(fh)
+    trace_names = [name.strip() for name in args.traces.split(",") if name.strip()]
+    unknown = [name for name in trace_names if name not in traces]
+    if unknown:
+        raise SystemExit(f"Unknown trace(s): {', '.join(unknown)}")
+
+    fake = None
+    process = None
+    store_dir = tempfile.mkdtemp(prefix="ussquash-bench-")
+    try:
+        if args.target:
+            base_url = args.target
+        else:
+            fake = fake_from_args(args)
+            upstream_url = fake.start()
+            process, base_url = start_app(upstream_url, args, store_dir)
+        print(f"Benchmarking {base_url} ({', '.join(trace_names)})", flush=True)
+
+        replayer = Replayer(base_url, traces, args)
+        if args.warmup:
+            replayer.run(trace_names, args.warmup, None, seed=f"warmup-{args.seed}")
+        reset_upstream(fake, args.fake)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        replayer.run(trace_names, args.sessions, recorder, seed=args.seed)
+        elapsed = time.perf_counter() - started
+        replayer.close()
+
+        report = summarize(recorder, trace_names, elapsed, upstream_stats(fake, args.fake))
+        print_report(report)
+        if args.json_path:
+            with open(args.json_path, "w") as fh:
+                json.dump(report, fh, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=35)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if fake is not None:
+            fake.stop()
+
+
+if __name__ == "__main__":
+    main()
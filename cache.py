@@ -0,0 +1,504 @@
+# Response cache storage: an in-process LRU, a SQLite file shared by the
+# workers on one host, or a Redis-compatible server shared by every host, all
+# behind ResponseCache, which adds coalescing, cross-worker leases and stale
+# serving. app.py creates the one instance the routes use.
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import redis
+except ImportError:  # optional; only needed for CACHE_BACKEND=redis
+    redis = None
+# Bound once so the backend's except clauses still evaluate when redis-py is
+# missing and a compatible client is passed in.
+RedisError = redis.RedisError if redis else Exception
+
+logger = logging.getLogger(__name__)
+
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance")
+
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 5000))
+# Where cached bodies live: "memory" is private to each worker, "sqlite" is a
+# file shared by the workers on one host and "redis" a Redis-compatible server
+# shared by every host. On a shared backend a miss holds a lease on its key for
+# up to CACHE_LEASE_TIMEOUT seconds so other workers wait instead of fetching.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").lower()
+CACHE_SHARED_PATH = os.environ.get("CACHE_SHARED_PATH", os.path.join(INSTANCE_PATH, "response-cache.sqlite3"))
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+CACHE_LEASE_TIMEOUT = float(os.environ.get("CACHE_LEASE_TIMEOUT", 30))
+CACHE_LEASE_POLL = float(os.environ.get("CACHE_LEASE_POLL", 0.05))
+CACHE_PRUNE_EVERY = int(os.environ.get("CACHE_PRUNE_EVERY", 64))
+# Backends keep an entry CACHE_STALE_TTL seconds past its expiry so
+# ResponseCache can serve it stale while it is refreshed.
+CACHE_STALE_TTL = float(os.environ.get("CACHE_STALE_TTL", 3600))
+CACHE_REFRESH_WORKERS = int(os.environ.get("CACHE_REFRESH_WORKERS", 4))
+# Idle SQLite connections each worker keeps per database file. Connections are
+# checked out per operation, so this is not a cap on concurrent queries.
+SQLITE_POOL_IDLE = int(os.environ.get("SQLITE_POOL_IDLE", 8))
+
+
+CachedResponse = namedtuple("CachedResponse", "body content_type stored_at expires_at")
+cache_refresh_pool = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+
+class MemoryCacheBackend:
+    # LRU of upstream bodies bounded by entry count and total bytes, private
+    # to one worker process. Like the other backends it returns entries until
+    # CACHE_STALE_TTL past expiry; ResponseCache decides what is fresh.
+    shared = False
+
+    def __init__(self, max_bytes, max_entries):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at + CACHE_STALE_TTL <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while self._entries and (
+                self._bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    content_type TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_response_cache_stored ON response_cache (stored_at);
+CREATE TABLE IF NOT EXISTS cache_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLitePool:
+    # Reusable connections to one SQLite file, shared by this worker's threads
+    # (or greenlets). Each operation checks one out and hands it back, so a
+    # gevent worker keeps a few open instead of one per greenlet, each paying
+    # the PRAGMA setup. `connect` opens and prepares a new connection.
+
+    def __init__(self, connect, max_idle=SQLITE_POOL_IDLE):
+        self.connect = connect
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def _checkout(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Connections opened before a fork belong to the parent.
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return self.connect()
+
+    def _checkin(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+class SQLiteCacheBackend:
+    # Cache shared by every worker on the host through one SQLite file. Reads
+    # don't touch the row, so eviction is oldest-stored-first rather than
+    # strict LRU; it runs every CACHE_PRUNE_EVERY writes per worker.
+    shared = True
+
+    def __init__(self, path, max_bytes, max_entries):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._pool = SQLitePool(self._connect)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(CACHE_SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    def get(self, key):
+        try:
+            with self._pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT body, content_type, stored_at, expires_at FROM response_cache"
+                    " WHERE key = ? AND expires_at > ?",
+                    (key, time.time() - CACHE_STALE_TTL),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed for {key}: {e}")
+            return None
+        return CachedResponse(bytes(row[0]), *row[1:]) if row else None
+
+    def set(self, key, entry):
+        try:
+            with self._pool.connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, entry.body, entry.content_type, entry.stored_at, entry.expires_at, len(entry.body)),
+                )
+                with self._writes_lock:
+                    self._writes += 1
+                    prune = self._writes % CACHE_PRUNE_EVERY == 0
+                if prune:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+
+    def _prune(self, conn):
+        conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time() - CACHE_STALE_TTL,))
+        conn.execute(
+            """
+            DELETE FROM response_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key,
+                           ROW_NUMBER() OVER newest AS position,
+                           SUM(size) OVER newest AS running_bytes
+                    FROM response_cache
+                    WINDOW newest AS (ORDER BY stored_at DESC)
+                ) WHERE position > ? OR running_bytes > ?
+            )
+            """,
+            (self.max_entries, self.max_bytes),
+        )
+
+    def delete(self, key):
+        try:
+            with self._pool.connection() as conn:
+                conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache delete failed for {key}: {e}")
+
+    def acquire_lease(self, key, owner, timeout):
+        now = time.time()
+        try:
+            with self._pool.connection() as conn:
+                conn.execute("DELETE FROM cache_leases WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO cache_leases VALUES (?, ?, ?)", (key, owner, now + timeout)
+                )
+        except sqlite3.Error as e:
+            # Without the lease table this worker just fetches on its own.
+            logger.warning(f"Shared cache lease failed for {key}: {e}")
+            return True
+        return cursor.rowcount == 1
+
+    def renew_lease(self, key, owner, timeout):
+        # Extends a lease this owner still holds; False once it has lapsed.
+        now = time.time()
+        try:
+            with self._pool.connection() as conn:
+                cursor = conn.execute(
+                    "UPDATE cache_leases SET expires_at = ? WHERE key = ? AND owner = ? AND expires_at > ?",
+                    (now + timeout, key, owner, now),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache lease renewal failed for {key}: {e}")
+            return True
+        return cursor.rowcount == 1
+
+    def release_lease(self, key, owner):
+        try:
+            with self._pool.connection() as conn:
+                conn.execute("DELETE FROM cache_leases WHERE key = ? AND owner = ?", (key, owner))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache lease release failed for {key}: {e}")
+
+    def stats(self):
+        try:
+            with self._pool.connection() as conn:
+                entries, size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+                ).fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+        return {"entries": entries, "bytes": size}
+
+
+REDIS_RELEASE_LEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+REDIS_RENEW_LEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisCacheBackend:
+    # Cache shared through a Redis-compatible server, so it also spans hosts.
+    # Entries expire server-side and the size bound is the server's maxmemory
+    # policy. `client` can be any object with the redis-py interface.
+    shared = True
+
+    def __init__(self, client, prefix="ussquash:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            body, content_type, stored_at, expires_at = self.client.hmget(
+                self.prefix + "cache:" + key, "body", "content_type", "stored_at", "expires_at"
+            )
+        except RedisError as e:
+            logger.warning(f"Shared cache read failed for {key}: {e}")
+            return None
+        if body is None or float(expires_at) + CACHE_STALE_TTL <= time.time():
+            return None
+        return CachedResponse(body, content_type.decode(), float(stored_at), float(expires_at))
+
+    def set(self, key, entry):
+        name = self.prefix + "cache:" + key
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(name, mapping={
+                "body": entry.body,
+                "content_type": entry.content_type,
+                "stored_at": entry.stored_at,
+                "expires_at": entry.expires_at,
+            })
+            pipe.pexpireat(name, int((entry.expires_at + CACHE_STALE_TTL) * 1000))
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + "cache:" + key)
+        except RedisError as e:
+            logger.warning(f"Shared cache delete failed for {key}: {e}")
+
+    def acquire_lease(self, key, owner, timeout):
+        try:
+            return bool(self.client.set(self.prefix + "lease:" + key, owner, nx=True, px=int(timeout * 1000)))
+        except RedisError as e:
+            logger.warning(f"Shared cache lease failed for {key}: {e}")
+            return True
+
+    def renew_lease(self, key, owner, timeout):
+        try:
+            return bool(
+                self.client.eval(REDIS_RENEW_LEASE, 1, self.prefix + "lease:" + key, owner, int(timeout * 1000))
+            )
+        except RedisError as e:
+            logger.warning(f"Shared cache lease renewal failed for {key}: {e}")
+            return True
+
+    def release_lease(self, key, owner):
+        try:
+            # A lease that timed out may already belong to someone else, so
+            # the owner check and delete run as one script on the server.
+            self.client.eval(REDIS_RELEASE_LEASE, 1, self.prefix + "lease:" + key, owner)
+        except RedisError as e:
+            logger.warning(f"Shared cache lease release failed for {key}: {e}")
+
+    def stats(self):
+        try:
+            return {"entries": self.client.dbsize(), "bytes": self.client.info("memory").get("used_memory", 0)}
+        except RedisError:
+            return {"entries": 0, "bytes": 0}
+
+
+class ResponseCache:
+    # Front of whichever cache backend is configured. Concurrent misses for
+    # the same key are coalesced: the first caller fetches and everyone else
+    # waits on its Future instead of hitting upstream again. On a shared
+    # backend the first caller also takes a lease on the key, so misses in
+    # other workers wait for its entry too. Callers that pass a stale_ttl get
+    # an entry expired less than that long ago as STALE while one background
+    # refresh replaces it; everyone else waits for a fresh one.
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is not None and entry.expires_at > time.time():
+            return entry
+        return None
+
+    def set(self, key, body, content_type, ttl):
+        if ttl <= 0 or len(body) > RESPONSE_CACHE_MAX_BYTES:
+            return None
+        now = time.time()
+        entry = CachedResponse(body, content_type, now, now + ttl)
+        self.backend.set(key, entry)
+        return entry
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def _wait_for_lease(self, key, owner):
+        # Returns another worker's fresh entry, or None once this worker holds
+        # the lease (or gave up waiting) and should fetch itself.
+        deadline = time.monotonic() + CACHE_LEASE_TIMEOUT
+        while not self.backend.acquire_lease(key, owner, CACHE_LEASE_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(CACHE_LEASE_POLL)
+            entry = self.get(key)
+            if entry is not None:
+                return entry
+        return self.get(key)
+
+    def get_or_fetch(self, key, ttl, fetch, stale_ttl=0):
+        entry = self.backend.get(key)
+        now = time.time()
+        fresh = entry is not None and entry.expires_at > now
+        if not fresh and entry is not None and entry.expires_at + stale_ttl <= now:
+            entry = None
+        with self._lock:
+            if fresh:
+                self.hits += 1
+                return entry, "HIT"
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            if entry is not None:
+                self.stale += 1
+            elif not leader:
+                self.coalesced += 1
+
+        if entry is not None:
+            if leader:
+                cache_refresh_pool.submit(self._fetch, key, ttl, fetch, future, entry)
+            return entry, "STALE"
+        if not leader:
+            return future.result(), "COALESCED"
+        return self._fetch(key, ttl, fetch, future)
+
+    def _fetch(self, key, ttl, fetch, future, stale=None):
+        # Runs in the request thread for a miss, or on cache_refresh_pool when
+        # a stale entry has already been served; failures of the latter only
+        # leave the stale entry in place.
+        owner = None
+        try:
+            entry = self.get(key)
+            if entry is None and self.backend.shared and ttl > 0:
+                owner = f"{os.getpid()}:{threading.get_ident()}:{time.monotonic()}"
+                entry = self._wait_for_lease(key, owner)
+            if entry is not None:
+                if stale is None:
+                    with self._lock:
+                        self.coalesced += 1
+                future.set_result(entry)
+                return entry, "COALESCED"
+            if stale is None:
+                with self._lock:
+                    self.misses += 1
+            # fetch may return a third item overriding ttl, for results it
+            # knows are partial.
+            result = fetch()
+            body, content_type = result[:2]
+            if len(result) > 2:
+                ttl = result[2]
+            now = time.time()
+            entry = self.set(key, body, content_type, ttl) or CachedResponse(body, content_type, now, now)
+            future.set_result(entry)
+            return entry, "MISS"
+        except BaseException as e:
+            future.set_exception(e)
+            if stale is None:
+                raise
+            logger.warning(f"Background refresh of {key} failed, still serving stale: {e}")
+        finally:
+            if owner is not None:
+                self.backend.release_lease(key, owner)
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            counts = {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "stale": self.stale}
+        return dict(self.backend.stats(), **counts)
+
+
+def create_cache_backend():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(CACHE_SHARED_PATH, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRIES)
+    if CACHE_BACKEND == "redis":
+        if redis is not None:
+            return RedisCacheBackend(redis.Redis.from_url(CACHE_REDIS_URL, socket_timeout=2))
+        logger.warning("CACHE_BACKEND=redis but the redis package is not installed; using the in-process cache")
+    elif CACHE_BACKEND != "memory":
+        logger.warning(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}; using the in-process cache")
+    return MemoryCacheBackend(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRIES)
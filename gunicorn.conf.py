@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+
+# Picked up automatically by `gunicorn app:app` from the project root.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+
+# With several workers the response cache defaults to the SQLite file shared
+# between them (CACHE_BACKEND in cache.py), so one worker's fetch serves all.
+if workers > 1:
+    os.environ.setdefault("CACHE_BACKEND", "sqlite")
+# app.py splits UPSTREAM_RATE_LIMIT evenly between the workers.
+os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+
+# ASYNC_MODE=1 switches to gevent workers. requests is monkey-patched so a slow
+# upstream call parks a greenlet instead of pinning the whole worker, and each
+# worker can hold up to worker_connections requests at once.
+if os.environ.get("ASYNC_MODE", "").lower() in ("1", "true", "yes"):
+    worker_class = "gevent"
+    worker_connections = int(os.environ.get("ASYNC_WORKER_CONNECTIONS", 500))
+    # Long-lived streams (live scores, exports) are normal here; the timeout
+    # only needs to catch a wedged event loop.
+    timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+else:
+    worker_class = "sync"
+    # liveScoreDetails may legitimately wait up to 60s upstream.
+    timeout = int(os.environ.get("GUNICORN_TIMEOUT", 75))
+
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # Worker metric snapshots from a previous server would otherwise be merged
+    # into this one's totals (see METRICS_DIR in instrumentation.py).
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.startswith("metrics-"):
+                os.remove(os.path.join(metrics_dir, name))
@@ -0,0 +1,184 @@
+# In-memory indexes: the player typeahead and the rankings board snapshots.
+import bisect
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from util import as_int
+
+# Trigram similarity a mistyped search token needs to match an indexed one.
+SEARCH_FUZZY_THRESHOLD = float(os.environ.get("SEARCH_FUZZY_THRESHOLD", 0.3))
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def search_tokens(text):
+    folded = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode().lower()
+    return SEARCH_TOKEN_RE.findall(folded)
+
+
+def token_trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerSearchIndex:
+    # Typeahead over every player the app has seen. Results use the upstream
+    # search shape (ObjectId, ObjectName, ...) so the pages render them as-is.
+    # Token prefixes are found by bisecting a sorted token list, as in
+    # LeaderboardIndex; a trigram map over the tokens catches typos. Names are
+    # normalised and tokenised once, when a player is added, so a search only
+    # does set lookups under the lock and ranks its candidates outside it.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.players = {}
+        self._ratings = {}
+        self._name_keys = {}
+        self._player_tokens = {}
+        self._token_players = {}
+        self._token_grams = {}
+        self._trigram_tokens = {}
+        self._sorted_tokens = []
+        self.seeded = False
+
+    def __len__(self):
+        return len(self.players)
+
+    def add(self, player_id, name=None, location=None, picture=None, terms=(), rating=None):
+        player_id = as_int(player_id)
+        if not player_id:
+            return
+        with self._lock:
+            doc = self.players.setdefault(player_id, {
+                "ObjectId": player_id,
+                "ObjectName": "",
+                "ObjectType": "Player",
+                "ObjectLocation": "",
+                "LogoImageUrl": "",
+            })
+            if name:
+                doc["ObjectName"] = name
+                self._name_keys[player_id] = " ".join(search_tokens(name))
+            if location:
+                doc["ObjectLocation"] = location
+            if picture:
+                doc["LogoImageUrl"] = picture
+            if rating is not None:
+                self._ratings[player_id] = rating
+            known = self._player_tokens.get(player_id, set())
+            tokens = known | set(search_tokens(" ".join([doc["ObjectName"], doc["ObjectLocation"], *terms])))
+            for token in tokens - known:
+                if token not in self._token_players:
+                    self._token_players[token] = set()
+                    grams = token_trigrams(token)
+                    self._token_grams[token] = len(grams)
+                    for gram in grams:
+                        self._trigram_tokens.setdefault(gram, set()).add(token)
+                    bisect.insort(self._sorted_tokens, token)
+                self._token_players[token].add(player_id)
+            self._player_tokens[player_id] = tokens
+
+    def _prefix_matches(self, prefix):
+        players = set()
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            players |= self._token_players[token]
+        return players
+
+    def _fuzzy_matches(self, token):
+        if len(token) < 3:
+            return set()
+        grams = token_trigrams(token)
+        shared = Counter(other for gram in grams for other in self._trigram_tokens.get(gram, ()))
+        players = set()
+        for other, count in shared.items():
+            if count / (len(grams) + self._token_grams[other] - count) >= SEARCH_FUZZY_THRESHOLD:
+                players |= self._token_players[other]
+        return players
+
+    def search(self, query, limit):
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        with self._lock:
+            if len(tokens) == 1 and tokens[0].isdigit() and int(tokens[0]) in self.players:
+                return [dict(self.players[int(tokens[0])])]
+            candidates = None
+            for token in tokens:
+                matches = self._prefix_matches(token) or self._fuzzy_matches(token)
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    return []
+            # Only the values ranking reads are copied; the documents' keys
+            # never change, so copying them below without the lock is safe.
+            ranked = [
+                (self._name_keys.get(player_id, ""), self._ratings.get(player_id) or 0, self.players[player_id])
+                for player_id in candidates
+            ]
+        # Exact full names first, then the highest-rated players.
+        wanted = " ".join(tokens)
+        best = heapq.nsmallest(limit, ranked, key=lambda item: (item[0] != wanted, -item[1], item[2]["ObjectName"]))
+        return [dict(doc) for _, _, doc in best]
+
+
+def leaderboard_name_keys(row):
+    first = str(row.get("firstName") or "").strip().lower()
+    last = str(row.get("lastName") or "").strip().lower()
+    return {f"{first} {last}".strip(), f"{last} {first}".strip()} - {""}
+
+
+class LeaderboardIndex:
+    # A full snapshot of one rankings board, indexed by position, ranking,
+    # player ID and name prefix.
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.built_at = time.time()
+        self.by_player = {}
+        # (ranking, position) for ranked rows only; unranked rows have no
+        # place in the ordering that around() bisects.
+        self.ranks = []
+        self.names = []
+        for position, row in enumerate(rows):
+            player_id = as_int(row.get("playerId"))
+            if player_id is not None:
+                self.by_player.setdefault(player_id, position)
+            ranking = as_int(row.get("ranking"))
+            if ranking:
+                self.ranks.append((ranking, position))
+            for key in leaderboard_name_keys(row):
+                self.names.append((key, position))
+        self.ranks.sort()
+        self.names.sort()
+
+    @property
+    def age(self):
+        return time.time() - self.built_at
+
+    def player(self, player_id):
+        position = self.by_player.get(player_id)
+        return None if position is None else self.rows[position]
+
+    def around(self, rank, radius):
+        if not self.ranks:
+            return []
+        index = bisect.bisect_left(self.ranks, (rank,))
+        position = self.ranks[index][1] if index < len(self.ranks) else self.ranks[-1][1] + 1
+        return self.rows[max(0, position - radius):position + radius + 1]
+
+    def search(self, prefix, limit):
+        prefix = prefix.strip().lower()
+        positions = []
+        start = bisect.bisect_left(self.names, (prefix,))
+        for key, position in self.names[start:]:
+            if not key.startswith(prefix) or len(positions) >= limit:
+                break
+            if position not in positions:
+                positions.append(position)
+        return [self.rows[position] for position in sorted(positions)]
@@ -0,0 +1,226 @@
+# Instrumentation: a Prometheus-style metrics registry, merged across gunicorn
+# workers through snapshot files, and an on-demand sampling profiler.
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Every worker keeps its own counters; with METRICS_DIR set, each one also
+# writes a snapshot there every METRICS_FLUSH_INTERVAL seconds and /metrics
+# merges them, so a scrape sees the whole gunicorn server.
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 15))
+# PROFILER_ENABLED=1 exposes /debug/profiler for on-demand stack sampling.
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL", 0.01))
+
+METRIC_TYPES = {
+    "ussquash_http_request_duration_seconds": ("histogram", "Time spent in each Flask route."),
+    "ussquash_http_requests_total": ("counter", "Requests served, by route and status."),
+    "ussquash_http_response_bytes_total": ("counter", "Body bytes sent, by route (streamed responses excluded)."),
+    "ussquash_cache_results_total": ("counter", "X-Cache outcome of each proxied response, by route."),
+    "ussquash_upstream_request_duration_seconds": ("histogram", "Upstream call latency, by endpoint template."),
+    "ussquash_upstream_requests_total": ("counter", "Upstream calls, by endpoint template and status or error."),
+    "ussquash_upstream_response_bytes_total": ("counter", "Upstream body bytes received, by endpoint template."),
+    "ussquash_upstream_rejected_total": ("counter", "Upstream calls refused locally, by endpoint template and reason."),
+    "ussquash_response_cache_entries": ("gauge", "Entries in the response cache."),
+    "ussquash_response_cache_bytes": ("gauge", "Bytes held by the response cache."),
+    "ussquash_response_cache_lookups_total": ("counter", "Response cache lookups, by result."),
+    "ussquash_response_cache_hit_ratio": ("gauge", "Share of response cache lookups served without an upstream call."),
+}
+
+
+class Metrics:
+    # A minimal Prometheus-style registry: histograms and counters keyed by
+    # (name, sorted label pairs).
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = Counter()
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "histograms": [[name, list(labels), list(series)] for (name, labels), series in self._histograms.items()],
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+            }
+
+
+metrics = Metrics(METRICS_BUCKETS)
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label_value(value)}"' for key, value in pairs) + "}"
+
+
+def format_metric_value(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def write_metrics_snapshot(snapshot):
+    # Publishes this worker's snapshot for the others' /metrics scrapes.
+    path = os.path.join(METRICS_DIR, f"metrics-{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(snapshot, fh)
+    os.replace(tmp_path, path)
+
+
+def load_metrics_snapshots(own_snapshot):
+    # This worker's snapshot plus every other worker's last flushed one.
+    snapshots = [own_snapshot]
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return snapshots
+    own = f"metrics-{os.getpid()}.json"
+    for name in os.listdir(METRICS_DIR):
+        if name == own or not name.startswith("metrics-") or not name.endswith(".json"):
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            with open(path) as fh:
+                snapshot = json.load(fh)
+            fresh = time.time() - os.path.getmtime(path) < METRICS_FLUSH_INTERVAL * 3
+        except (OSError, ValueError):
+            continue
+        # Counters from exited workers are kept so totals never go backwards;
+        # their gauges are dropped once the snapshot goes stale.
+        if not fresh:
+            snapshot["gauges"] = []
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def render_metrics(snapshots):
+    histograms, counters, gauges = {}, Counter(), Counter()
+    for snapshot in snapshots:
+        for name, labels, series in snapshot.get("histograms", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                merged[i] += value
+        for kind, totals in (("counters", counters), ("gauges", gauges)):
+            for name, labels, value in snapshot.get(kind, []):
+                totals[(name, tuple(tuple(pair) for pair in labels))] += value
+
+    lookups = {dict(labels)["result"]: value for (name, labels), value in counters.items()
+               if name == "ussquash_response_cache_lookups_total"}
+    total_lookups = sum(lookups.values())
+    if total_lookups:
+        served = lookups.get("hits", 0) + lookups.get("coalesced", 0) + lookups.get("stale", 0)
+        gauges[("ussquash_response_cache_hit_ratio", ())] = served / total_lookups
+
+    lines = []
+    for name, (kind, help_text) in METRIC_TYPES.items():
+        if kind == "histogram":
+            series = sorted((labels, values) for (metric, labels), values in histograms.items() if metric == name)
+        else:
+            source = counters if kind == "counter" else gauges
+            series = sorted((labels, value) for (metric, labels), value in source.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{name}{format_labels(labels)} {format_metric_value(value)}")
+                continue
+            for bound, count in zip(METRICS_BUCKETS, value):
+                lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {count}")
+            lines.append(f'{name}_bucket{format_labels(labels, le="+Inf")} {value[-2]}')
+            lines.append(f"{name}_sum{format_labels(labels)} {format_metric_value(value[-1])}")
+            lines.append(f"{name}_count{format_labels(labels)} {value[-2]}")
+    return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    # Samples every thread's stack at a fixed interval and counts them in
+    # collapsed form ("outer;inner;leaf count"), ready for flamegraph.pl or
+    # speedscope. Under gevent only real threads are visible, not greenlets,
+    # so profile with the sync worker.
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._samples = 0
+        self._started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks.clear()
+            self._samples = 0
+            self._started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < 64:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(names)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
+
+    def report(self, limit=None):
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+            samples, started_at = self._samples, self._started_at
+        header = [
+            f"# running={self.running} samples={samples} interval={self.interval}s",
+            f"# started={datetime.fromtimestamp(started_at).isoformat() if started_at else '-'}",
+        ]
+        return "\n".join(header + [f"{stack} {count}" for stack, count in stacks]) + "\n"
+
+
+profiler = SamplingProfiler(PROFILER_INTERVAL)
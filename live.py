@@ -0,0 +1,167 @@
+# Live score push channel: one upstream poll per interval per live resource no
+# matter how many browsers are subscribed, fanned out as Server-Sent Events.
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", 5))
+LIVE_HEARTBEAT = float(os.environ.get("LIVE_HEARTBEAT", 15))
+LIVE_MAX_FEEDS = int(os.environ.get("LIVE_MAX_FEEDS", 200))
+
+
+def format_sse(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def live_diff(previous, current):
+    # Smallest message that turns `previous` into `current`, or None if nothing
+    # changed. Point-by-point feeds only ever grow, so "append" is the norm.
+    if previous is None:
+        return {"type": "replace", "data": current}
+    if current == previous:
+        return None
+    if isinstance(previous, list) and isinstance(current, list) and current[:len(previous)] == previous:
+        return {"type": "append", "items": current[len(previous):]}
+    if isinstance(previous, dict) and isinstance(current, dict):
+        return {
+            "type": "patch",
+            "set": {k: v for k, v in current.items() if previous.get(k) != v or k not in previous},
+            "remove": [k for k in previous if k not in current],
+        }
+    return {"type": "replace", "data": current}
+
+
+class LiveFeed:
+    # Calls `poll` (which returns the resource's decoded JSON) while anyone is
+    # subscribed and pushes diffs to every subscriber's queue. All state is
+    # guarded by _live_lock.
+
+    def __init__(self, key, poll):
+        self.key = key
+        self.poll = poll
+        self.subscribers = set()
+        self.payload = None
+        self.version = 0
+        self.running = False
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=50)
+        with _live_lock:
+            self.subscribers.add(subscriber)
+            live_feeds.setdefault(self.key, self)
+            if not self.running:
+                self.running = True
+                threading.Thread(target=self.run, name=f"live-{self.key}", daemon=True).start()
+            return subscriber, self.payload, self.version
+
+    def unsubscribe(self, subscriber):
+        with _live_lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        message = format_sse(event, data, self.version)
+        with _live_lock:
+            subscribers = list(self.subscribers)
+            snapshot = self.payload
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A slow client missed diffs; resync it with a full snapshot.
+                # Its stream may drain the queue at the same time, so an empty
+                # queue just ends the drain.
+                try:
+                    while True:
+                        subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(format_sse("diff", {"type": "replace", "data": snapshot}, self.version))
+                except queue.Full:
+                    pass
+
+    def run(self):
+        try:
+            while True:
+                with _live_lock:
+                    if not self.subscribers:
+                        self._stop()
+                        logger.info(f"Live feed {self.key} stopped: no subscribers")
+                        return
+                try:
+                    data = self.poll()
+                    diff = live_diff(self.payload, data)
+                    if diff is not None:
+                        with _live_lock:
+                            self.payload = data
+                            self.version += 1
+                        self.publish("diff", diff)
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logger.error(f"Live feed {self.key} poll failed: {e}")
+                    self.publish("upstream-error", {"error": str(e)})
+                time.sleep(LIVE_POLL_INTERVAL)
+        finally:
+            # If the loop died unexpectedly, free the key so the next
+            # subscriber starts a fresh feed instead of joining one that will
+            # never publish again.
+            with _live_lock:
+                if self.running:
+                    self._stop()
+
+    def _stop(self):
+        # Caller holds _live_lock. Stopping in the same critical section as
+        # the subscriber check means a concurrent subscribe() either lands
+        # before it (and the feed keeps running) or starts a new thread.
+        self.running = False
+        if live_feeds.get(self.key) is self:
+            del live_feeds[self.key]
+
+
+live_feeds = {}
+_live_lock = threading.Lock()
+
+
+def get_live_feed(key, poll):
+    with _live_lock:
+        feed = live_feeds.get(key)
+        if feed is None:
+            if len(live_feeds) >= LIVE_MAX_FEEDS:
+                return None
+            feed = live_feeds[key] = LiveFeed(key, poll)
+        return feed
+
+
+def live_event_stream(feed):
+    subscriber, snapshot, version = feed.subscribe()
+
+    def generate():
+        try:
+            yield f"retry: {int(LIVE_POLL_INTERVAL * 1000)}\n\n"
+            if snapshot is not None:
+                yield format_sse("diff", {"type": "replace", "data": snapshot}, version)
+            while True:
+                try:
+                    yield subscriber.get(timeout=LIVE_HEARTBEAT)
+                except queue.Empty:
+                    # Heartbeats also surface disconnects: the write fails and
+                    # the server closes this generator.
+                    yield ": keep-alive\n\n"
+        finally:
+            feed.unsubscribe(subscriber)
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -15,6 +15,10 @@ const RATING_TIERS = [
   { name: 'Pro', min: 6.5, max: Infinity }
 ];
 
+// How often, and how many times, to re-request a partial analytics summary.
+const ANALYTICS_REFRESH_DELAY_MS = 5000;
+const ANALYTICS_REFRESH_ATTEMPTS = 12;
+
 const MATCH_INSIGHTS_ACCESS_CODE = "0";
 const SESSION_STORAGE_KEY_MATCH_INSIGHTS = 'matchInsightsAccessGranted';
 const CONTACT_PHONE_NUMBER = "301-347-8710";
@@ -157,257 +161,171 @@ async function fetchCurrentUserRating(currentUserId) {
 }
 
 /**
- * Fetches and renders the user's weekly rankings, showing changes from the previous week.
- * @param {string} currentUserId - The ID of the user.
+ * Renders the user's latest rankings, showing changes from the previous week.
+ * @param {Object|null} rankings - The `rankings` block of /api/user/<id>/analytics.
  */
-async function fetchWeeklyRankings(currentUserId) {
+function renderWeeklyRankings(rankings) {
     const rankingsContainer = document.getElementById("weekly-rankings-list");
     if (!rankingsContainer) return;
-    rankingsContainer.innerHTML = '<p class="text-center text-gray-500 mt-10">Loading rankings...</p>';
-
-    try {
-        const rankingsResponse = await fetch(`/proxy/user/${currentUserId}/rankings`, { signal: abortController.signal });
-        if (!rankingsResponse.ok) throw new Error(`Rankings API HTTP error! status: ${rankingsResponse.status}`);
-        
-        const rankingsData = await rankingsResponse.json();
-        if (rankingsData.length === 0) {
-            rankingsContainer.innerHTML = '<p class="text-center text-gray-500 mt-10">No ranking history available.</p>';
-            return;
-        }
-
-        const allDivisionRatings = rankingsData.filter(entry => entry.DivisionName === "All").map(entry => ({ rating: entry.Rating, date: new Date(entry.RankingPeriod) }));
-        if (allDivisionRatings.length > 0) {
-            const highestEntry = allDivisionRatings.reduce((max, entry) => (entry.rating > max.rating ? entry : max), allDivisionRatings[0]);
-            document.getElementById("highest-rating").textContent = highestEntry.rating.toFixed(2);
-            document.getElementById("highest-rating-date").textContent = `(${highestEntry.date.toLocaleDateString(undefined, { month: 'short', day: 'numeric', year: 'numeric' })})`;
-        }
-
-        const uniqueDates = [...new Set(rankingsData.map(entry => new Date(entry.RankingPeriod).toISOString().split('T')[0]))].sort((a, b) => new Date(b) - new Date(a));
-        const mostRecentDateString = uniqueDates[0];
-        const previousWeekDateString = uniqueDates[1]; 
-        const currentWeekRankings = rankingsData.filter(entry => new Date(entry.RankingPeriod).toISOString().split('T')[0] === mostRecentDateString);
 
-        let previousWeekRankingsMap = new Map();
-        if (previousWeekDateString) {
-            const previousWeekRankings = rankingsData.filter(entry => new Date(entry.RankingPeriod).toISOString().split('T')[0] === previousWeekDateString);
-            previousWeekRankingsMap = new Map(previousWeekRankings.map(r => [`${r.DivisionName}-${r.RatingGroupDescr}`, r.Ranking]));
-        }
+    if (!rankings || !rankings.divisions || rankings.divisions.length === 0) {
+        rankingsContainer.innerHTML = '<p class="text-center text-gray-500 mt-10">No ranking history available.</p>';
+        return;
+    }
 
-        let rankingsHtml = '';
-        if (currentWeekRankings.length > 0) {
-            const mostRecentDate = new Date(mostRecentDateString);
-            rankingsHtml += `<p class="text-sm text-gray-500 mb-3">As of: <span class="font-medium text-gray-800">${mostRecentDate.toLocaleDateString(undefined, { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' })}</span></p>`;
-            rankingsHtml += '<ul class="space-y-3">';
-            
-            currentWeekRankings.forEach(ranking => {
-                const previousRank = previousWeekRankingsMap.get(`${ranking.DivisionName}-${ranking.RatingGroupDescr}`);
-                let changeHtml = '<div class="text-xs text-gray-400">New</div>';
-                if (previousRank !== undefined) {
-                    const change = previousRank - ranking.Ranking;
-                    if (change > 0) {
-                        changeHtml = `<div class="flex items-center gap-1 text-green-600"><svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="m5 12 7-7 7 7"/><path d="M12 19V5"/></svg><span class="text-xs font-medium">+${change}</span></div>`;
-                    } else if (change < 0) {
-                        changeHtml = `<div class="flex items-center gap-1 text-red-600"><svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="m5 12 7 7 7-7"/><path d="M12 5v14"/></svg><span class="text-xs font-medium">${change}</span></div>`;
-                    } else {
-                        changeHtml = `<div class="text-xs text-gray-400">-</div>`;
-                    }
-                }
+    if (rankings.highestRating) {
+        const highestDate = new Date(rankings.highestRating.date);
+        document.getElementById("highest-rating").textContent = rankings.highestRating.rating.toFixed(2);
+        document.getElementById("highest-rating-date").textContent = `(${highestDate.toLocaleDateString(undefined, { month: 'short', day: 'numeric', year: 'numeric' })})`;
+    }
 
-                rankingsHtml += `<li class="flex items-center justify-between p-3 bg-white/60 backdrop-blur-sm border border-gray-200/80 rounded-xl shadow-sm transition-all hover:shadow-md hover:bg-white"><div><div class="font-semibold text-gray-800">${ranking.DivisionName}</div><div class="text-sm text-gray-500">${ranking.RatingGroupDescr}</div></div><div class="flex flex-col items-end"><span class="text-xl font-bold text-indigo-600">${ranking.Ranking}</span><div class="h-4">${changeHtml}</div></div></li>`;
-            });
-            rankingsHtml += '</ul>';
-        } else {
-            rankingsHtml = '<p class="text-center text-gray-500 mt-10">No rankings found for the current week.</p>';
+    const mostRecentDate = new Date(rankings.asOf);
+    let rankingsHtml = `<p class="text-sm text-gray-500 mb-3">As of: <span class="font-medium text-gray-800">${mostRecentDate.toLocaleDateString(undefined, { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' })}</span></p>`;
+    rankingsHtml += '<ul class="space-y-3">';
+
+    rankings.divisions.forEach(ranking => {
+        let changeHtml = '<div class="text-xs text-gray-400">New</div>';
+        if (ranking.change !== null && ranking.change !== undefined) {
+            const change = ranking.change;
+            if (change > 0) {
+                changeHtml = `<div class="flex items-center gap-1 text-green-600"><svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="m5 12 7-7 7 7"/><path d="M12 19V5"/></svg><span class="text-xs font-medium">+${change}</span></div>`;
+            } else if (change < 0) {
+                changeHtml = `<div class="flex items-center gap-1 text-red-600"><svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="m5 12 7 7 7-7"/><path d="M12 5v14"/></svg><span class="text-xs font-medium">${change}</span></div>`;
+            } else {
+                changeHtml = `<div class="text-xs text-gray-400">-</div>`;
+            }
         }
-        rankingsContainer.innerHTML = rankingsHtml;
 
-    } catch (error) {
-        console.error("Error fetching or rendering weekly rankings:", error);
-        rankingsContainer.innerHTML = '<p class="text-center text-red-500 mt-10">Error loading rankings.</p>';
-    }
+        rankingsHtml += `<li class="flex items-center justify-between p-3 bg-white/60 backdrop-blur-sm border border-gray-200/80 rounded-xl shadow-sm transition-all hover:shadow-md hover:bg-white"><div><div class="font-semibold text-gray-800">${ranking.division}</div><div class="text-sm text-gray-500">${ranking.group}</div></div><div class="flex flex-col items-end"><span class="text-xl font-bold text-indigo-600">${ranking.ranking}</span><div class="h-4">${changeHtml}</div></div></li>`;
+    });
+    rankingsHtml += '</ul>';
+    rankingsContainer.innerHTML = rankingsHtml;
 }
 
 
 /**
- * Fetches and displays the user's match statistics.
- * @param {string} currentUserId - The ID of the user.
+ * Renders the user's win/loss record, overall and by number of games.
+ * @param {Object|null} record - The `record` block of /api/user/<id>/analytics.
  */
-async function fetchMatchStatistics(currentUserId) {
-    try {
-        const response = await fetch(`/proxy/user/${currentUserId}/record`, { signal: abortController.signal });
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        
-        const recordData = await response.json();
-        let totalWins = 0;
-        let totalLosses = 0;
-
-        recordData.forEach(entry => {
-            totalWins += entry.matchesWon || 0;
-            totalLosses += entry.matchesLost || 0;
-            
-            const winsEl = document.getElementById(`wins-${entry.matchesType}-game`);
-            const lossesEl = document.getElementById(`losses-${entry.matchesType}-game`);
-
-            if (winsEl) winsEl.textContent = entry.matchesWon || 0;
-            if (lossesEl) lossesEl.textContent = entry.matchesLost || 0;
-        });
-        
-        const totalMatches = totalWins + totalLosses;
-        document.getElementById('matches-played-total').textContent = totalMatches;
-        const winPercentage = totalMatches > 0 ? `${((totalWins / totalMatches) * 100).toFixed(0)}%` : '0%';
-        document.getElementById('wins').textContent = totalWins;
-        document.getElementById('losses').textContent = totalLosses;
-        document.getElementById('win-percentage').textContent = winPercentage;
-        document.getElementById('win-rate-display').textContent = winPercentage;
+function renderMatchRecord(record) {
+    if (!record) return;
 
-    } catch (error) {
-        console.error("Error fetching or rendering match statistics:", error);
-    }
+    Object.entries(record.byGames || {}).forEach(([games, counts]) => {
+        const winsEl = document.getElementById(`wins-${games}-game`);
+        const lossesEl = document.getElementById(`losses-${games}-game`);
+
+        if (winsEl) winsEl.textContent = counts.wins || 0;
+        if (lossesEl) lossesEl.textContent = counts.losses || 0;
+    });
+
+    const totalMatches = record.wins + record.losses;
+    document.getElementById('matches-played-total').textContent = totalMatches;
+    const winPercentage = totalMatches > 0 ? `${((record.wins / totalMatches) * 100).toFixed(0)}%` : '0%';
+    document.getElementById('wins').textContent = record.wins;
+    document.getElementById('losses').textContent = record.losses;
+    document.getElementById('win-percentage').textContent = winPercentage;
+    document.getElementById('win-rate-display').textContent = winPercentage;
 }
 
 /**
- * Calculates the average opponent rating using ONLY the ratings embedded in
- * each match object (w1Rating / o1Rating). No additional API calls are made
- * (previously this fetched /ratings-top for every opponent).
- * @param {number} matchesToConsider - The number of recent matches to analyze.
- * @param {Array} allMatches - The complete list of the user's matches.
+ * Renders the average opponent rating over the user's recent matches, as
+ * computed server-side from the ratings embedded in each match.
+ * @param {Object|null} opponentRating - The `opponentRating` block of the analytics summary.
  */
-async function calculateAverageOpponentRating(matchesToConsider, allMatches) {
+function renderAverageOpponentRating(opponentRating) {
     const avgOpponentRatingEl = document.getElementById('average-opponent-rating');
     const opponentRatingStatusEl = document.getElementById('opponent-rating-status');
 
-    if (avgOpponentRatingEl) avgOpponentRatingEl.textContent = "Loading...";
-    if (opponentRatingStatusEl) opponentRatingStatusEl.textContent = "";
-
-    if (!allMatches || allMatches.length === 0) {
-        if (avgOpponentRatingEl) avgOpponentRatingEl.textContent = "N/A";
-        if (opponentRatingStatusEl) opponentRatingStatusEl.textContent = "No matches found.";
-        return;
-    }
-
-    const uid = parseInt(userId, 10);
-    const recentMatches = allMatches.slice(0, matchesToConsider);
-    const opponentRatings = [];
-
-    recentMatches.forEach(match => {
-        const rating = getOpponentRatingFromMatch(match, uid);
-        if (!isNaN(rating)) opponentRatings.push(rating);
-    });
-
-    if (opponentRatings.length > 0) {
-        const averageRating = (opponentRatings.reduce((sum, rating) => sum + rating, 0) / opponentRatings.length).toFixed(2);
-        avgOpponentRatingEl.textContent = averageRating;
-        if (opponentRatingStatusEl) opponentRatingStatusEl.textContent = `Based on last ${opponentRatings.length} matches.`;
+    if (opponentRating && opponentRating.average !== null) {
+        if (avgOpponentRatingEl) avgOpponentRatingEl.textContent = opponentRating.average.toFixed(2);
+        if (opponentRatingStatusEl) opponentRatingStatusEl.textContent = `Based on last ${opponentRating.sampleSize} matches.`;
     } else {
-        avgOpponentRatingEl.textContent = "N/A";
+        if (avgOpponentRatingEl) avgOpponentRatingEl.textContent = "N/A";
         if (opponentRatingStatusEl) opponentRatingStatusEl.textContent = "No valid opponent data found.";
     }
 }
 
 /**
- * Fetches and displays the monthly rating changes for the user with a modernized UI.
- * Each month is clickable and opens a modal listing every match played that month.
+ * Renders the monthly rating changes for the user with a modernized UI.
+ * Each month is clickable and opens a modal listing every match played that
+ * month; the match history is only downloaded when a month is clicked.
+ * @param {Object|null} rankings - The `rankings` block of /api/user/<id>/analytics.
  * @param {string} currentUserId - The ID of the user.
- * @param {Array} allMatches - The complete list of the user's matches (for the click-through modal).
  */
-async function fetchAndDisplayMonthlyRatingChanges(currentUserId, allMatches) {
+function renderMonthlyRatingChanges(rankings, currentUserId) {
     const container = document.getElementById("monthly-rating-change-list");
     if (!container) return;
-    container.innerHTML = '<p class="text-center text-gray-500 mt-10">Loading data...</p>';
 
-    try {
-        const response = await fetch(`/proxy/user/${currentUserId}/rankings`, { signal: abortController.signal });
-        if (!response.ok) throw new Error(`API error: ${response.status}`);
-        const rankingsData = await response.json();
-        const allDivisionRatings = rankingsData.filter(entry => entry.DivisionName === "All");
-
-        if (allDivisionRatings.length === 0) {
-            container.innerHTML = '<p class="text-center text-gray-500 mt-10">No rating history available.</p>';
-            return;
+    const monthlyChanges = rankings?.monthlyChanges || {};
+    if (Object.keys(monthlyChanges).length === 0) {
+        container.innerHTML = '<p class="text-center text-gray-500 mt-10">No rating history available.</p>';
+        return;
+    }
+
+    let ytdChangeHtml = '<div class="text-center text-gray-500"><span class="font-semibold">YTD Change:</span> No Data</div>';
+    const ytdChange = rankings.ytdChange;
+    if (ytdChange !== null && ytdChange !== undefined) {
+        let icon = ytdChange > 0 ? 'm5 12 7-7 7 7' : 'm5 12 7 7 7-7';
+        let color = ytdChange > 0 ? 'text-green-600' : (ytdChange < 0 ? 'text-red-600' : 'text-gray-600');
+        let sign = ytdChange > 0 ? '+' : '';
+        if (ytdChange !== 0) {
+            ytdChangeHtml = `<div class="flex items-center justify-center gap-2 ${color}"><span class="font-semibold">YTD Change:</span> <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="${icon}"/><path d="M12 ${ytdChange > 0 ? '19V5' : '5v14'}"/></svg> <span class="font-semibold">${sign}${ytdChange.toFixed(2)}</span></div>`;
+        } else {
+            ytdChangeHtml = `<div class="flex items-center justify-center gap-2 ${color}"><span class="font-semibold">YTD Change:</span><span class="font-semibold">${ytdChange.toFixed(2)}</span></div>`;
         }
+    }
 
-        const ratingsByMonth = {};
-        allDivisionRatings.forEach(entry => {
-            const date = new Date(entry.RankingPeriod);
-            const monthKey = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
-            if (!ratingsByMonth[monthKey]) ratingsByMonth[monthKey] = [];
-            ratingsByMonth[monthKey].push({ date: date, rating: entry.Rating });
+    // Show the last 12 months (default view, no toggle button).
+    const months = [];
+    const currentDate = new Date();
+    currentDate.setDate(1); // Prevent duplicate months
+
+    for (let i = 0; i < 12; i++) {
+        months.push({
+            key: `${currentDate.getFullYear()}-${String(currentDate.getMonth() + 1).padStart(2, '0')}`,
+            name: currentDate.toLocaleString('default', {
+                month: 'long',
+                year: 'numeric'
+            })
         });
 
-        const currentYear = new Date().getFullYear();
-        const yearRatings = allDivisionRatings.filter(r => new Date(r.RankingPeriod).getFullYear() === currentYear);
-        let ytdChangeHtml = '<div class="text-center text-gray-500"><span class="font-semibold">YTD Change:</span> No Data</div>';
-
-        if (yearRatings.length > 1) {
-            yearRatings.sort((a, b) => new Date(a.RankingPeriod) - new Date(b.RankingPeriod));
-            const ytdChange = yearRatings[yearRatings.length - 1].Rating - yearRatings[0].Rating;
-            let icon = ytdChange > 0 ? 'm5 12 7-7 7 7' : 'm5 12 7 7 7-7';
-            let color = ytdChange > 0 ? 'text-green-600' : (ytdChange < 0 ? 'text-red-600' : 'text-gray-600');
-            let sign = ytdChange > 0 ? '+' : '';
-            if (ytdChange !== 0) {
-                ytdChangeHtml = `<div class="flex items-center justify-center gap-2 ${color}"><span class="font-semibold">YTD Change:</span> <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="${icon}"/><path d="M12 ${ytdChange > 0 ? '19V5' : '5v14'}"/></svg> <span class="font-semibold">${sign}${ytdChange.toFixed(2)}</span></div>`;
+        currentDate.setMonth(currentDate.getMonth() - 1);
+    }
+
+    let html = `<div class="mb-4 p-2 bg-gray-100 rounded-lg">${ytdChangeHtml}</div><ul class="space-y-3">`;
+    months.forEach(month => {
+        const change = monthlyChanges[month.key];
+        let changeHtml = '<span class="text-sm font-medium text-gray-500">No Data</span>';
+        if (change !== undefined && change !== null) {
+            let color = change > 0 ? 'text-green-600' : (change < 0 ? 'text-red-600' : 'text-gray-500');
+            let sign = change > 0 ? '+' : '';
+            if (change !== 0) {
+                 let icon = change > 0 ? 'm5 12 7-7 7 7' : 'm5 12 7 7 7-7';
+                 changeHtml = `<div class="flex items-center gap-1 ${color}"><svg xmlns="http://www.w3.org/2000/svg" width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="${icon}"/><path d="M12 ${change > 0 ? '19V5' : '5v14'}"/></svg><span class="text-md font-bold">${sign}${change.toFixed(2)}</span></div>`;
             } else {
-                ytdChangeHtml = `<div class="flex items-center justify-center gap-2 ${color}"><span class="font-semibold">YTD Change:</span><span class="font-semibold">${ytdChange.toFixed(2)}</span></div>`;
+                changeHtml = `<span class="text-md font-bold ${color}">${change.toFixed(2)}</span>`;
             }
         }
-
-        // Show the last 12 months (default view, no toggle button).
-        const months = [];
-        const currentDate = new Date();
-        currentDate.setDate(1); // Prevent duplicate months
-
-        for (let i = 0; i < 12; i++) {
-            months.push({
-                key: `${currentDate.getFullYear()}-${String(currentDate.getMonth() + 1).padStart(2, '0')}`,
-                name: currentDate.toLocaleString('default', {
-                    month: 'long',
-                    year: 'numeric'
-                })
-            });
-
-            currentDate.setMonth(currentDate.getMonth() - 1);
-        }
-
-        let html = `<div class="mb-4 p-2 bg-gray-100 rounded-lg">${ytdChangeHtml}</div><ul class="space-y-3">`;
-        months.forEach(month => {
-            const monthRatings = ratingsByMonth[month.key];
-            let changeHtml = '<span class="text-sm font-medium text-gray-500">No Data</span>';
-            if (monthRatings && monthRatings.length > 0) {
-                monthRatings.sort((a, b) => a.date - b.date);
-                const change = monthRatings[monthRatings.length - 1].rating - monthRatings[0].rating;
-                let color = change > 0 ? 'text-green-600' : (change < 0 ? 'text-red-600' : 'text-gray-500');
-                let sign = change > 0 ? '+' : '';
-                if (change !== 0) {
-                     let icon = change > 0 ? 'm5 12 7-7 7 7' : 'm5 12 7 7 7-7';
-                     changeHtml = `<div class="flex items-center gap-1 ${color}"><svg xmlns="http://www.w3.org/2000/svg" width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><path d="${icon}"/><path d="M12 ${change > 0 ? '19V5' : '5v14'}"/></svg><span class="text-md font-bold">${sign}${change.toFixed(2)}</span></div>`;
-                } else {
-                    changeHtml = `<span class="text-md font-bold ${color}">${change.toFixed(2)}</span>`;
-                }
-            }
-            html += `<li class="flex items-center justify-between p-3 bg-white/60 backdrop-blur-sm border border-gray-200/80 rounded-xl shadow-sm cursor-pointer hover:bg-white hover:border-indigo-200 hover:shadow-md transition-all" data-month-key="${month.key}" data-month-name="${month.name}"><div><div class="font-semibold text-gray-800">${month.name}</div></div><div class="flex items-center gap-2"><div class="flex flex-col items-end"><div class="h-5">${changeHtml}</div></div><svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="#9ca3af" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="m9 18 6-6-6-6"/></svg></div></li>`;
-        });
-        html += '</ul>';
-        container.innerHTML = html;
-
-        // Make each month row clickable -> show every match played that month
-        container.querySelectorAll('li[data-month-key]').forEach(li => {
-            li.addEventListener('click', () => {
-                const key = li.dataset.monthKey;
-                const monthName = li.dataset.monthName;
-                const monthMatches = (allMatches || []).filter(m => {
-                    if (!m.MatchDate) return false;
-                    const d = new Date(m.MatchDate);
-                    const mk = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}`;
-                    return mk === key;
-                });
-                showMatchListModal(`Matches — ${monthName}`, monthMatches, currentUserId);
+        html += `<li class="flex items-center justify-between p-3 bg-white/60 backdrop-blur-sm border border-gray-200/80 rounded-xl shadow-sm cursor-pointer hover:bg-white hover:border-indigo-200 hover:shadow-md transition-all" data-month-key="${month.key}" data-month-name="${month.name}"><div><div class="font-semibold text-gray-800">${month.name}</div></div><div class="flex items-center gap-2"><div class="flex flex-col items-end"><div class="h-5">${changeHtml}</div></div><svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="#9ca3af" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="m9 18 6-6-6-6"/></svg></div></li>`;
+    });
+    html += '</ul>';
+    container.innerHTML = html;
+
+    // Make each month row clickable -> show every match played that month
+    container.querySelectorAll('li[data-month-key]').forEach(li => {
+        li.addEventListener('click', async () => {
+            const key = li.dataset.monthKey;
+            const monthName = li.dataset.monthName;
+            const allMatches = await loadAllMatches(currentUserId);
+            const monthMatches = allMatches.filter(m => {
+                if (!m.MatchDate) return false;
+                const d = new Date(m.MatchDate);
+                const mk = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}`;
+                return mk === key;
             });
+            showMatchListModal(`Matches — ${monthName}`, monthMatches, currentUserId);
         });
-
-    } catch (error) {
-        console.error("Error fetching or rendering monthly rating changes:", error);
-        container.innerHTML = '<p class="text-center text-red-500 mt-10">Error loading data.</p>';
-    }
+    });
 }
 
 /**
@@ -463,60 +381,37 @@ function renderTopOpponentRatingCard(match, rating, userId) {
 }
 
 /**
- * Renders "Top Losses by Opponent Rating" using ONLY the rating data already
- * embedded in each match object (w1Rating / o1Rating). No additional API calls
- * are made.
- *
- * The user's side is determined by comparing their user ID to wid1 (home)
- * and oid1 (visiting). The opponent's rating is the opposite side's rating:
- *   user home (wid1 === uid)      -> opponent rating = o1Rating
- *   user visiting (oid1 === uid)  -> opponent rating = w1Rating
- * The winner is determined from the authoritative Winner field.
+ * Renders "Top Losses by Opponent Rating" from the server summary, which
+ * picks the five losses against the highest-rated opponents using the
+ * ratings embedded in each match object (w1Rating / o1Rating).
+ * @param {Array} topLosses - [{ rating, match }] from /api/user/<id>/analytics.
+ * @param {string} currentUserId - The ID of the user.
  */
-function fetchAndDisplayTopLosses(currentUserId, allMatches) {
+function renderTopLosses(topLosses, currentUserId) {
     const lossesContainer = document.getElementById('top-losses-list');
     if (!lossesContainer) return;
 
-    if (!allMatches || allMatches.length === 0) {
-        lossesContainer.innerHTML = '<p class="text-center text-gray-500 mt-10">No match history available.</p>';
-        return;
-    }
-
-    lossesContainer.innerHTML = '<p class="text-center text-gray-500 mt-10">Analyzing losses...</p>';
-
-    const uid = parseInt(currentUserId);
-    const losses = [];
-
-    (allMatches || []).forEach(match => {
-        const rating = getOpponentRatingFromMatch(match, uid);
-        if (isNaN(rating)) return; // match object has no opponent rating -> skip (no API call)
-        const didWin = didUserWinMatch(match, uid, currentUserFullName);
-        if (!didWin) losses.push({ rating, match });
-    });
-
-    if (losses.length === 0) {
+    if (!topLosses || topLosses.length === 0) {
         lossesContainer.innerHTML = '<p class="text-center text-gray-500 mt-10">No losses with rating data.</p>';
         return;
     }
 
-    const topLosses = losses.sort((a, b) => b.rating - a.rating).slice(0, 5);
     lossesContainer.innerHTML = `<div class="space-y-3">${topLosses.map(e => renderTopOpponentRatingCard(e.match, e.rating, currentUserId)).join('')}</div>`;
 }
 
 /**
- * Fetches and displays details of the user's last match.
+ * Displays details of the user's last match.
  * @param {string} currentUserId - The ID of the user.
- * @param {Array} allMatches - The complete list of the user's matches.
+ * @param {Object|null} lastMatch - The most recent completed match.
  */
-function displayLastMatch(currentUserId, allMatches) {
+function displayLastMatch(currentUserId, lastMatch) {
     const container = document.getElementById("last-match-details");
     if (!container) return;
-    if (!allMatches || allMatches.length === 0) {
+    if (!lastMatch) {
         container.innerHTML = '<p class="text-center text-gray-500 mt-10">No match history available.</p>';
         return;
     }
 
-    const lastMatch = allMatches[0];
     const uid = parseInt(currentUserId);
     const didWin = didUserWinMatch(lastMatch, uid, currentUserFullName);
     const opponentName = getOpponentDisplayName(lastMatch, uid, currentUserFullName);
@@ -525,44 +420,45 @@ function displayLastMatch(currentUserId, allMatches) {
 }
 
 /**
- * Fetches all matches for a user in parallel batches rather than sequentially.
+ * Fetches all matches for a user from the server-side aggregated endpoint,
+ * which walks the upstream pages concurrently and de-duplicates by Matchid.
  * @returns {Promise<Array>} A promise that resolves to an array of all matches.
  */
 async function fetchAllMatches(currentUserId) {
-    let allMatches = [];
-    let page = 1;
-    const BATCH_SIZE = 5; // Fetch 5 pages concurrently at a time
-    let hasMore = true;
-
-    while (hasMore) {
-        // Create an array of page numbers to fetch in this batch
-        const pageNumbers = Array.from({ length: BATCH_SIZE }, (_, i) => page + i);
-
-        try {
-            const fetchPromises = pageNumbers.map(p => 
-                fetch(`/proxy/user/${currentUserId}/matches/page/${p}`, { signal: abortController.signal })
-                    .then(res => res.ok ? res.json() : null)
-                    .catch(() => null)
-            );
-
-            const results = await Promise.all(fetchPromises);
-
-            for (const data of results) {
-                if (data && data.matches && data.matches.length > 0) {
-                    allMatches.push(...data.matches);
-                } else {
-                    hasMore = false; // Stop if any page returns no matches
-                }
-            }
-
-            page += BATCH_SIZE;
-        } catch (error) {
-            console.error("Error fetching match batch:", error);
-            hasMore = false;
-        }
+    try {
+        const res = await fetch(`/api/user/${currentUserId}/matches`, { signal: abortController.signal });
+        if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+        const data = await res.json();
+        const allMatches = Array.isArray(data.matches) ? data.matches : [];
+        return allMatches.sort((a, b) => new Date(b.MatchDate) - new Date(a.MatchDate));
+    } catch (error) {
+        if (error.name !== 'AbortError') console.error("Error fetching match history:", error);
+        return [];
     }
+}
+
+// The full history is only needed for the click-through match lists, so it
+// is downloaded on the first click and shared after that.
+let allMatchesRequest = null;
 
-    return allMatches.sort((a, b) => new Date(b.MatchDate) - new Date(a.MatchDate));
+function loadAllMatches(currentUserId) {
+    if (!allMatchesRequest) allMatchesRequest = fetchAllMatches(currentUserId);
+    return allMatchesRequest;
+}
+
+/**
+ * Fetches the server-side analytics summary. A summary built while some
+ * match timings were still loading comes back with complete: false.
+ */
+async function fetchUserAnalytics(currentUserId) {
+    try {
+        const res = await fetch(`/api/user/${currentUserId}/analytics`, { signal: abortController.signal });
+        if (!res.ok) throw new Error(`Analytics HTTP ${res.status}`);
+        return await res.json();
+    } catch (error) {
+        if (error.name !== 'AbortError') console.warn("Unable to load analytics summary:", error);
+        return null;
+    }
 }
 
 /**
@@ -629,11 +525,6 @@ function formatDurationSec(totalSeconds) {
     return hours > 0 ? `${hours}:${pad(minutes)}:${pad(seconds)}` : `${pad(minutes)}:${pad(seconds)}`;
 }
 
-/**
- * Fetches and calculates advanced match statistics like match and point durations.
- * @param {Array} allMatches - An array of the user's matches.
- */
-
 const liveScoreDetailsCache = new Map();
 
 async function fetchLiveScoreDetailsCached(matchId) {
@@ -659,124 +550,42 @@ async function fetchLiveScoreDetailsCached(matchId) {
     return liveScoreDetailsCache.get(key);
 }
 
-async function asyncMapWithConcurrency(items, limit, worker) {
-    const results = new Array(items.length);
-    let nextIndex = 0;
-
-    async function runWorker() {
-        while (nextIndex < items.length) {
-            const index = nextIndex++;
-            results[index] = await worker(items[index], index);
-        }
-    }
-
-    const workerCount = Math.min(Math.max(1, limit), items.length || 1);
-    await Promise.all(Array.from({ length: workerCount }, () => runWorker()));
-    return results;
-}
-
-async function fetchAdvancedMatchInsights(allMatches, currentUserId) {
-    const insightIds = ['average-match-length', 'longest-match-length', 'shortest-match-length', 'average-point-length', 'longest-point-length', 'shortest-point-length'];
-    insightIds.forEach(id => {
-        const el = document.getElementById(id);
-        if (el) el.textContent = 'Loading...';
-    });
-
+/**
+ * Renders match and point durations from the server summary, which derives
+ * them from the live-score data of the user's matches.
+ * @param {Object|null} durations - The `durations` block of /api/user/<id>/analytics.
+ * @param {string} currentUserId - The ID of the user.
+ */
+function renderMatchDurations(durations, currentUserId) {
     const durationStatus = document.getElementById('match-duration-distribution-status');
-    if (durationStatus) durationStatus.textContent = 'Loading match timing data...';
+    const matchSummary = durations?.match || null;
+    const pointSummary = durations?.point || null;
 
-    if (!allMatches || allMatches.length === 0) {
-        insightIds.forEach(id => {
-            const el = document.getElementById(id);
-            if (el) el.textContent = 'N/A';
-        });
-        renderMatchDurationDistribution([]);
-        renderPerformanceByDayAndTime([], currentUserId, new Map());
-        return;
-    }
-
-    const matchesWithInsights = [];
-    const pointLengths = [];
-    const durationDistributionSeconds = [];
-    const startTimesByMatchId = new Map();
-    const MIN_POINT_DURATION_SEC = 4;
-    const MAX_POINT_DURATION_SEC = 150;
-    const MIN_MATCH_DURATION_SEC = 240;
-
-    // If the match payload exposes HasLiveScore, only those matches can have
-    // point-by-point timing data. This avoids hammering the endpoint with
-    // requests for matches that cannot return duration/start-time details.
-    const hasLiveScoreFlag = allMatches.some(match => match && match.HasLiveScore !== undefined && match.HasLiveScore !== null);
-    const timingCandidateMatches = hasLiveScoreFlag
-        ? allMatches.filter(match => {
-            const value = match && match.HasLiveScore;
-            return value === true || value === 1 || String(value).toLowerCase() === 'true';
-        })
-        : allMatches;
-
-    // Limit concurrency so the live-score endpoint is not hit by hundreds of
-    // simultaneous requests. The cached helper also prevents duplicate calls
-    // when the same match is opened in the details modal later.
-    await asyncMapWithConcurrency(timingCandidateMatches, 5, async match => {
-        if (!match || !match.Matchid) return;
-
-        const details = await fetchLiveScoreDetailsCached(match.Matchid);
-        if (!details.length) return;
-
-        const points = details
-            .filter(evt => String(evt.Decision || '').toLowerCase() === 'point' && evt.StartDate)
-            .map(evt => ({ ...evt, parsedStart: new Date(evt.StartDate) }))
-            .filter(evt => !isNaN(evt.parsedStart.getTime()))
-            .sort((a, b) => a.parsedStart - b.parsedStart);
-
-        // A single point is enough to establish an approximate match start time.
-        if (points.length > 0) {
-            startTimesByMatchId.set(String(match.Matchid), points[0].parsedStart);
-        }
-
-        if (points.length < 2) return;
-
-        const matchStart = points[0].parsedStart;
-        const matchEnd = points[points.length - 1].parsedStart;
-        const matchDurationSec = (matchEnd - matchStart) / 1000;
-
-        if (Number.isFinite(matchDurationSec) && matchDurationSec >= MIN_MATCH_DURATION_SEC) {
-            matchesWithInsights.push({ duration: matchDurationSec, match });
-            durationDistributionSeconds.push(matchDurationSec);
-        }
-
-        for (let i = 1; i < points.length; i++) {
-            const diffSec = (points[i].parsedStart - points[i - 1].parsedStart) / 1000;
-            if (diffSec >= MIN_POINT_DURATION_SEC && diffSec <= MAX_POINT_DURATION_SEC) {
-                pointLengths.push(diffSec);
-            }
-        }
-    });
-
-    renderMatchDurationDistribution(durationDistributionSeconds);
-    if (durationStatus && timingCandidateMatches.length === 0) {
+    renderMatchDurationDistribution(matchSummary?.samples || []);
+    if (durationStatus && !durations?.candidates) {
         durationStatus.textContent = 'No live-scored matches with timing data.';
+    } else if (durationStatus && durations.pending) {
+        durationStatus.textContent += ` • loading ${durations.pending} more`;
     }
-    // Re-render the time-of-day chart with actual live-score start timestamps.
-    renderPerformanceByDayAndTime(allMatches, currentUserId, startTimesByMatchId);
 
-    if (matchesWithInsights.length > 0) {
-        const avgMatchLength = matchesWithInsights.reduce((a, b) => a + b.duration, 0) / matchesWithInsights.length;
-        matchesWithInsights.sort((a, b) => a.duration - b.duration);
-        const shortestMatch = matchesWithInsights[0];
-        const longestMatch = matchesWithInsights[matchesWithInsights.length - 1];
+    const openMatch = async matchId => {
+        const allMatches = await loadAllMatches(currentUserId);
+        const match = allMatches.find(m => String(m.Matchid) === String(matchId));
+        showGraphModal(match || { Matchid: matchId });
+    };
 
+    if (matchSummary) {
         const averageEl = document.getElementById('average-match-length');
         const longestEl = document.getElementById('longest-match-length');
         const shortestEl = document.getElementById('shortest-match-length');
-        if (averageEl) averageEl.textContent = formatDurationSec(avgMatchLength);
+        if (averageEl) averageEl.textContent = formatDurationSec(matchSummary.average);
         if (longestEl) {
-            longestEl.textContent = formatDurationSec(longestMatch.duration);
-            longestEl.onclick = () => showGraphModal(longestMatch.match);
+            longestEl.textContent = formatDurationSec(matchSummary.max);
+            longestEl.onclick = () => openMatch(matchSummary.longestMatchId);
         }
         if (shortestEl) {
-            shortestEl.textContent = formatDurationSec(shortestMatch.duration);
-            shortestEl.onclick = () => showGraphModal(shortestMatch.match);
+            shortestEl.textContent = formatDurationSec(matchSummary.min);
+            shortestEl.onclick = () => openMatch(matchSummary.shortestMatchId);
         }
     } else {
         ['average-match-length', 'longest-match-length', 'shortest-match-length'].forEach(id => {
@@ -785,14 +594,13 @@ async function fetchAdvancedMatchInsights(allMatches, currentUserId) {
         });
     }
 
-    if (pointLengths.length > 0) {
-        const avgPoint = pointLengths.reduce((a, b) => a + b, 0) / pointLengths.length;
+    if (pointSummary) {
         const averagePointEl = document.getElementById('average-point-length');
         const longestPointEl = document.getElementById('longest-point-length');
         const shortestPointEl = document.getElementById('shortest-point-length');
-        if (averagePointEl) averagePointEl.textContent = formatDurationSec(avgPoint);
-        if (longestPointEl) longestPointEl.textContent = formatDurationSec(Math.max(...pointLengths));
-        if (shortestPointEl) shortestPointEl.textContent = formatDurationSec(Math.min(...pointLengths));
+        if (averagePointEl) averagePointEl.textContent = formatDurationSec(pointSummary.average);
+        if (longestPointEl) longestPointEl.textContent = formatDurationSec(pointSummary.max);
+        if (shortestPointEl) shortestPointEl.textContent = formatDurationSec(pointSummary.min);
     } else {
         ['average-point-length', 'longest-point-length', 'shortest-point-length'].forEach(id => {
             const el = document.getElementById(id);
@@ -1347,143 +1155,64 @@ function closeMatchListModal() {
 }
 
 /**
- * Computes the user's current streak plus their all-time highest win and loss streaks.
- * @param {Array} allMatches - The complete list of the user's matches.
- * @param {string|number} userId - The user's id.
+ * Renders the user's current streak plus their all-time highest win and loss
+ * streaks, as computed server-side over the completed match history.
+ * @param {HTMLElement} container - The streaks card body.
+ * @param {Object|null} streaks - The `streaks` block of /api/user/<id>/analytics.
  */
-function computeStreaks(allMatches, userId) {
-    const uid = parseInt(userId);
-    const sorted = (allMatches || [])
-        .filter(m => (m.wid1 === uid || m.oid1 === uid) && m.MatchDate)
-        .sort((a, b) => new Date(a.MatchDate) - new Date(b.MatchDate));
-
-    let highestWinStreak = 0, highestLossStreak = 0;
-    let runWin = 0, runLoss = 0;
-
-    sorted.forEach(m => {
-        if (didUserWinMatch(m, uid, currentUserFullName)) {
-            runWin++; runLoss = 0;
-            if (runWin > highestWinStreak) highestWinStreak = runWin;
-        } else {
-            runLoss++; runWin = 0;
-            if (runLoss > highestLossStreak) highestLossStreak = runLoss;
-        }
-    });
-
-    let currentStreakType = null, currentStreakCount = 0;
-    for (let i = sorted.length - 1; i >= 0; i--) {
-        const type = didUserWinMatch(sorted[i], uid, currentUserFullName) ? 'W' : 'L';
-        if (currentStreakType === null) {
-            currentStreakType = type;
-            currentStreakCount = 1;
-        } else if (type === currentStreakType) {
-            currentStreakCount++;
-        } else {
-            break;
-        }
-    }
-
-    return { currentStreakType, currentStreakCount, highestWinStreak, highestLossStreak };
-}
-
 function renderStreaks(container, streaks) {
     if (!container) return;
-    if (!streaks.currentStreakType) {
+    if (!streaks || !streaks.currentType) {
         container.innerHTML = '<p class="text-center text-gray-500 mt-10">No match history available.</p>';
         return;
     }
-    const isWinStreak = streaks.currentStreakType === 'W';
+    const isWinStreak = streaks.currentType === 'W';
     container.innerHTML = `
         <div class="flex justify-between items-center p-3 rounded-xl ${isWinStreak ? 'bg-green-100' : 'bg-red-100'}">
             <span class="font-medium text-gray-700">Current ${isWinStreak ? 'Win' : 'Loss'} Streak</span>
-            <span class="text-lg font-bold ${isWinStreak ? 'text-green-600' : 'text-red-600'}">${streaks.currentStreakCount}${isWinStreak ? 'W' : 'L'}</span>
+            <span class="text-lg font-bold ${isWinStreak ? 'text-green-600' : 'text-red-600'}">${streaks.currentCount}${isWinStreak ? 'W' : 'L'}</span>
         </div>
         <div class="flex justify-between items-center p-2">
             <span class="text-gray-600">Highest Win Streak</span>
-            <span id="streak-highest-win" class="stat-clickable px-2 py-1 rounded-full bg-green-100 text-green-700 text-xs font-semibold cursor-pointer hover:bg-green-200 transition-colors" data-stat-type="highest-win-streak">${streaks.highestWinStreak}</span>
+            <span id="streak-highest-win" class="stat-clickable px-2 py-1 rounded-full bg-green-100 text-green-700 text-xs font-semibold cursor-pointer hover:bg-green-200 transition-colors" data-stat-type="highest-win-streak">${streaks.highestWin}</span>
         </div>
         <div class="flex justify-between items-center p-2">
             <span class="text-gray-600">Highest Loss Streak</span>
-            <span id="streak-highest-loss" class="stat-clickable px-2 py-1 rounded-full bg-red-100 text-red-700 text-xs font-semibold cursor-pointer hover:bg-red-200 transition-colors" data-stat-type="highest-loss-streak">${streaks.highestLossStreak}</span>
+            <span id="streak-highest-loss" class="stat-clickable px-2 py-1 rounded-full bg-red-100 text-red-700 text-xs font-semibold cursor-pointer hover:bg-red-200 transition-colors" data-stat-type="highest-loss-streak">${streaks.highestLoss}</span>
         </div>
     `;
 }
-/**
- * Determines whether a match is a "comeback win" using the exact game
- * progression from the user's perspective (best-of-5, first to 3 games):
- *
- *   L W W W   (lost game 1, then won the next 3)
- *   L L W W W (lost the first 2 games, then won the next 3)
- *   W L L W W (won game 1, lost games 2-3, then won games 4-5)
- *   L W L W W (lost game 1, won game 2, lost game 3, then won games 4-5)
- *
- * Only completed matches (Status 'C' or 'RE', mirroring script.js's
- * isRenderableCompletedMatch) are considered. The winner is resolved with the
- * authoritative didUserWinMatch (Winner field "H"/"V" takes priority, with
- * name-based home/visiting resolution), so corrected/disputed records and
- * forfeits (e.g. Status 'DF', "0-11,0-11,0-11") are handled correctly.
- */
-function isComebackWin(match, uid, userFullName) {
-    const status = match.Status ? String(match.Status).toUpperCase() : '';
-    if (status !== 'C' && status !== 'RE') return false;
-
-    const didWin = didUserWinMatch(match, uid, userFullName);
-    if (!didWin) return false;
-
-    if (!match.Score) return false;
-
-    const games = String(match.Score).split(',').map(g => g.trim()).filter(Boolean);
-    if (games.length < 3 || games.length > 5) return false; // best-of-5
-
-    const sequence = games.map(g => {
-        const parts = g.split('-').map(n => parseInt(n, 10));
-        if (parts.length !== 2 || isNaN(parts[0]) || isNaN(parts[1])) return null;
-        // The match winner's per-game score is always listed FIRST in match.Score
-        const userScore = didWin ? parts[0] : parts[1];
-        const oppScore = didWin ? parts[1] : parts[0];
-        if (userScore === oppScore) return null;
-        return userScore > oppScore ? 'W' : 'L';
-    });
-
-    if (sequence.includes(null)) return false;
-    const seq = sequence.join('');
-
-    // Exact comeback patterns only
-    return seq === 'LWWW' || seq === 'LLWWW' || seq === 'WLLWW' || seq === 'LWLWW';
-}
-
-/**
- * Legacy alias for isComebackWin.
- */
-function isComeback(match, userId) {
-    return isComebackWin(match, parseInt(userId, 10), currentUserFullName);
-}
 
 /**
  * Renders the Comeback Tracker widget inside the specified container.
  *
- * Shows four stats:
+ * The counts come from the server summary, which considers only completed
+ * matches (Status 'C' or 'RE') and counts a comeback win for the exact game
+ * progressions LWWW, LLWWW, WLLWW and LWLWW. Shows four stats:
  *   - Comeback Wins        : wins after trailing in games (clickable -> list)
  *   - Comeback Win %       : Comeback Wins ÷ Matches Where You Trailed
  *   - Reverse Sweeps       : wins from 0-2 down (LLWWW)
  *   - Reverse Sweep %      : Reverse Sweeps ÷ Matches Trailing 0-2
  */
-function renderComebackTracker(container, stats, userId) {
+function renderComebackTracker(container, comebacks, userId) {
     if (!container) return;
 
-    const noComebacks = !stats.comebackMatches || stats.comebackMatches.length === 0;
+    const stats = comebacks || { comebackWins: 0, trailedMatches: 0, reverseSweeps: 0, trailedTwoLove: 0, matchIds: [] };
+    const noComebacks = !stats.comebackWins;
+    const comebackWinRate = stats.trailedMatches > 0 ? Math.round((stats.comebackWins / stats.trailedMatches) * 100) : 0;
+    const reverseSweepRate = stats.trailedTwoLove > 0 ? Math.round((stats.reverseSweeps / stats.trailedTwoLove) * 100) : 0;
 
     container.innerHTML = `
         ${noComebacks ? '' : `
         <div id="comeback-count-trigger" class="flex justify-between items-center p-3 rounded-xl bg-indigo-100 cursor-pointer hover:bg-indigo-200 transition-colors">
             <span class="font-medium text-gray-700">Comeback Wins</span>
-            <span class="text-lg font-bold text-indigo-600">${stats.totalComebacks}</span>
+            <span class="text-lg font-bold text-indigo-600">${stats.comebackWins}</span>
         </div>`}
         <div class="grid grid-cols-2 gap-2 ${noComebacks ? '' : 'pt-2'}">
             <div class="bg-gray-100 p-3 rounded-xl text-center border border-gray-200">
                 <p class="text-xs text-gray-500 font-medium">Comeback Win %</p>
-                <p class="text-lg font-bold text-indigo-600 mt-1">${stats.comebackWinRate}%</p>
-                <p class="text-[10px] text-gray-500">${stats.totalComebacks}/${stats.trailingMatches} won when trailing</p>
+                <p class="text-lg font-bold text-indigo-600 mt-1">${comebackWinRate}%</p>
+                <p class="text-[10px] text-gray-500">${stats.comebackWins}/${stats.trailedMatches} won when trailing</p>
             </div>
             <div class="bg-gray-100 p-3 rounded-xl text-center border border-gray-200">
                 <p class="text-xs text-gray-500 font-medium">Reverse Sweeps</p>
@@ -1492,12 +1221,12 @@ function renderComebackTracker(container, stats, userId) {
             </div>
             <div class="bg-gray-100 p-3 rounded-xl text-center border border-gray-200">
                 <p class="text-xs text-gray-500 font-medium">Reverse Sweep %</p>
-                <p class="text-lg font-bold text-indigo-600 mt-1">${stats.reverseSweepRate}%</p>
-                <p class="text-[10px] text-gray-500">${stats.reverseSweeps}/${stats.trailing0_2Matches} won from 0-2</p>
+                <p class="text-lg font-bold text-indigo-600 mt-1">${reverseSweepRate}%</p>
+                <p class="text-[10px] text-gray-500">${stats.reverseSweeps}/${stats.trailedTwoLove} won from 0-2</p>
             </div>
             <div class="bg-gray-100 p-3 rounded-xl text-center border border-gray-200">
                 <p class="text-xs text-gray-500 font-medium">Trailing Matches</p>
-                <p class="text-lg font-bold text-indigo-600 mt-1">${stats.trailingMatches}</p>
+                <p class="text-lg font-bold text-indigo-600 mt-1">${stats.trailedMatches}</p>
                 <p class="text-[10px] text-gray-500">Opportunities to come back</p>
             </div>
         </div>
@@ -1506,7 +1235,12 @@ function renderComebackTracker(container, stats, userId) {
 
     const trigger = container.querySelector('#comeback-count-trigger');
     if (trigger) {
-        trigger.addEventListener('click', () => showMatchListModal('Comeback Wins', stats.comebackMatches, userId));
+        trigger.addEventListener('click', async () => {
+            const allMatches = await loadAllMatches(userId);
+            const byId = new Map(allMatches.map(m => [String(m.Matchid), m]));
+            const comebackMatches = (stats.matchIds || []).map(id => byId.get(String(id))).filter(Boolean);
+            showMatchListModal('Comeback Wins', comebackMatches, userId);
+        });
     }
 }
 
@@ -1544,24 +1278,26 @@ function setupModalListeners() {
 
 /**
  * Wires up the clickable stat badges in the Match Statistics and Streaks cards.
- * Each badge carries a data-stat-type that maps to a filter over allMatches.
- * @param {Array} allMatches - The complete list of the user's matches.
+ * Each badge carries a data-stat-type that maps to a filter over the match
+ * history, which is downloaded on the first click.
  * @param {string|number} currentUserId - The user's id.
  */
-function setupMatchStatClickListeners(allMatches, currentUserId) {
+function setupMatchStatClickListeners(currentUserId) {
     const uid = parseInt(currentUserId, 10);
     const container = document.getElementById('app');
 
     if (!container) return;
 
     // Delegate clicks on any .stat-clickable badge
-    container.addEventListener('click', (event) => {
+    container.addEventListener('click', async (event) => {
         const badge = event.target.closest('.stat-clickable');
         if (!badge) return;
 
         const type = badge.getAttribute('data-stat-type');
         if (!type) return;
 
+        const allMatches = await loadAllMatches(currentUserId);
+
         let filteredMatches = [];
         let title = 'Matches';
 
@@ -1635,118 +1371,6 @@ function setupMatchStatClickListeners(allMatches, currentUserId) {
 
 // --- END: Match Insights Modal Functions ---
 
-/**
- * Evaluates match comeback metrics:
- *   - Comeback Wins        : wins after trailing in games
- *   - Comeback Win %       : Comeback Wins ÷ Matches Where You Trailed
- *   - Reverse Sweeps       : wins from 0-2 down (LLWWW)
- *   - Reverse Sweep %      : Reverse Sweeps ÷ Matches Trailing 0-2
- *
- * "Trailed" means the user was behind 0-1, 0-2, or 1-2 in games at some
- * point in the match. Only completed matches (Status 'C' / 'RE', mirroring
- * script.js isRenderableCompletedMatch) are considered, so forfeits and
- * default wins (e.g. Status 'DF', "0-11,0-11,0-11") are excluded.
- */
-function computeComebackStats(allMatches, userId) {
-    const uid = parseInt(userId, 10);
-    let totalComebacks = 0;
-    let trailingMatches = 0;
-    let reverseSweeps = 0;
-    let trailing0_2Matches = 0;
-
-    const comebackMatches = [];
-
-    (allMatches || []).forEach(match => {
-        if (!match.Score) return;
-
-        // Only consider completed matches (mirrors script.js isRenderableCompletedMatch).
-        const status = match.Status ? String(match.Status).toUpperCase() : '';
-        if (status !== 'C' && status !== 'RE') return;
-
-        const games = match.Score.split(',').map(g => g.trim()).filter(Boolean);
-        if (games.length === 0) return;
-
-        // The match winner's per-game score is always listed FIRST in match.Score
-        // (see formatMatchScoreForUser). didUserWinMatch prefers the authoritative
-        // Winner field over wid1 when they disagree (wid1 can be stale on
-        // corrected/disputed match records).
-        const didWin = didUserWinMatch(match, uid, currentUserFullName);
-
-        let userWins = 0;
-        let oppWins = 0;
-        let trailed = false;
-        let trailed0_2 = false;
-
-        for (const g of games) {
-            // Check deficits *before* tallying the current game result
-            const diff = oppWins - userWins;
-            if (oppWins > userWins) trailed = true;
-            if (diff === 2) trailed0_2 = true; // 0-2 down before this game
-
-            const parts = g.split('-').map(n => parseInt(n, 10));
-            if (parts.length !== 2 || isNaN(parts[0]) || isNaN(parts[1])) continue;
-
-            const [winnerSideScore, loserSideScore] = parts;
-            const userScore = didWin ? winnerSideScore : loserSideScore;
-            const oppScore = didWin ? loserSideScore : winnerSideScore;
-
-            if (userScore > oppScore) {
-                userWins++;
-            } else if (oppScore > userScore) {
-                oppWins++;
-            }
-        }
-
-        // No final "trailed" check is needed: a match where the user was
-        // behind at ANY point will have oppWins > userWins before some game,
-        // which the loop above already captured. Adding checks after the loop
-        // would falsely flag e.g. a 2-3 loss after leading 2-0, or mislabel a
-        // 1-3 loss as "trailed 0-2".
-
-        // Only completed-match data reaches here, so any trailing = a real
-        // opportunity to make a comeback.
-        if (trailed) trailingMatches++;
-        if (trailed0_2) trailing0_2Matches++;
-
-        // Count only true comebacks (exact 4 patterns) as comeback wins.
-        if (isComebackWin(match, uid, currentUserFullName)) {
-            totalComebacks++;
-            comebackMatches.push(match);
-            // LLWWW = reverse sweep (won after being down 0-2)
-            const seq = String(match.Score).split(',').map(g => g.trim()).filter(Boolean).length === 5
-                ? String(match.Score).split(',').map(g => g.trim()).map(gg => {
-                    const parts = gg.split('-').map(n => parseInt(n, 10));
-                    const userScore = didWin ? parts[0] : parts[1];
-                    const oppScore = didWin ? parts[1] : parts[0];
-                    return userScore > oppScore ? 'W' : 'L';
-                }).join('')
-                : '';
-            if (seq === 'LLWWW') {
-                reverseSweeps++;
-                // TEMP TEST LOG: log the score and player names of every reverse sweep
-                console.log('[Reverse Sweep]', {
-                    matchId: match.Matchid,
-                    date: match.MatchDate,
-                    score: match.Score,
-                    homePlayer: match.hplayer1,
-                    visitingPlayer: match.vplayer1,
-                    winner: match.Winner,
-                    userWon: didWin
-                });
-            }
-        }
-    });
-
-    return {
-        totalComebacks,
-        comebackMatches,
-        trailingMatches,
-        trailing0_2Matches,
-        reverseSweeps,
-        comebackWinRate: trailingMatches > 0 ? Math.round((totalComebacks / trailingMatches) * 100) : 0,
-        reverseSweepRate: trailing0_2Matches > 0 ? Math.round((reverseSweeps / trailing0_2Matches) * 100) : 0
-    };
-}
 /**
  * Helper to fade out the loading overlay smoothly.
  */
@@ -1760,22 +1384,6 @@ function fadeOutLoadingOverlay() {
     }
 }
 
-/**
- * Initializes the analytics dashboard view and loads metrics components.
- */
-function initializeAnalyticsPage(allMatches, currentUserId) {
-    const comebackContainer = document.getElementById('comeback-tracker-container');
-    if (comebackContainer) {
-        const comebackStats = computeComebackStats(allMatches, currentUserId);
-        renderComebackTracker(comebackContainer, comebackStats, currentUserId);
-    }
-}
-
-/**
- * Main function to initialize the page and fetch all necessary data.
- * @param {string} currentUserId - The ID of the user whose data to load.
- */
-
 // ---------------------------------------------------------------------------
 // New Analytics Widgets
 // ---------------------------------------------------------------------------
@@ -1902,22 +1510,11 @@ function renderMatchDurationDistribution(durations) {
     });
 }
 
-function getMatchOutcomeForAnalytics(match, currentUserId) {
-    return didUserWinMatch(match, parseInt(currentUserId, 10), currentUserFullName);
-}
-
-function hasMeaningfulTime(matchDate) {
-    if (!matchDate) return false;
-    if (matchDate instanceof Date) {
-        return matchDate.getHours() !== 0 || matchDate.getMinutes() !== 0 || matchDate.getSeconds() !== 0;
-    }
-    const text = String(matchDate);
-    const timeMatch = text.match(/T(\d{2}):(\d{2})(?::(\d{2}))?/);
-    if (!timeMatch) return false;
-    return Number(timeMatch[1]) !== 0 || Number(timeMatch[2]) !== 0 || Number(timeMatch[3] || 0) !== 0;
-}
-
-function renderPerformanceByDayAndTime(allMatches, currentUserId, startTimesByMatchId = null) {
+/**
+ * Renders win rate by weekday and by time of day from the server summary's
+ * byWeekday / byTimeOfDay records ({ name: { wins, losses } }).
+ */
+function renderPerformanceByDayAndTime(byWeekday, byTimeOfDay) {
     const dayCanvas = document.getElementById('performance-day-chart');
     const timeCanvas = document.getElementById('performance-time-chart');
     const status = document.getElementById('performance-time-status');
@@ -1929,7 +1526,8 @@ function renderPerformanceByDayAndTime(allMatches, currentUserId, startTimesByMa
     }
 
     const dayNames = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'];
-    const dayStats = dayNames.map(name => ({ name, wins: 0, total: 0 }));
+    const toStats = record => ({ wins: record?.wins || 0, total: (record?.wins || 0) + (record?.losses || 0) });
+    const dayStats = dayNames.map(name => ({ name, ...toStats(byWeekday?.[name]) }));
 
     // Time-of-day definitions:
     // Morning:   5:00 AM - 11:59 AM
@@ -1942,44 +1540,10 @@ function renderPerformanceByDayAndTime(allMatches, currentUserId, startTimesByMa
         { name: 'Evening', range: '5 PM–8:59 PM', chartLabel: ['Evening', '5 PM–8:59 PM'] },
         { name: 'Night', range: '9 PM–4:59 AM', chartLabel: ['Night', '9 PM–4:59 AM'] }
     ];
-    const timeStats = timeBuckets.map(bucket => ({ ...bucket, wins: 0, total: 0 }));
-
-    let dayMatchCount = 0;
-    let timedMatchCount = 0;
-
-    (allMatches || []).forEach(match => {
-        const didWin = getMatchOutcomeForAnalytics(match, currentUserId);
-
-        if (match.MatchDate) {
-            const date = new Date(match.MatchDate);
-            if (!isNaN(date.getTime())) {
-                const day = dayStats[date.getDay()];
-                day.total++;
-                dayMatchCount++;
-                if (didWin) day.wins++;
-            }
-        }
+    const timeStats = timeBuckets.map(bucket => ({ ...bucket, ...toStats(byTimeOfDay?.[bucket.name]) }));
 
-        let startDate = null;
-        if (startTimesByMatchId && match.Matchid != null) {
-            startDate = startTimesByMatchId.get(String(match.Matchid)) || null;
-        }
-        if (!startDate && hasMeaningfulTime(match.MatchDate)) {
-            startDate = new Date(match.MatchDate);
-        }
-        if (!startDate || isNaN(new Date(startDate).getTime())) return;
-
-        const hour = new Date(startDate).getHours();
-        let bucket;
-        if (hour >= 5 && hour < 12) bucket = 0;       // Morning
-        else if (hour >= 12 && hour < 17) bucket = 1; // Afternoon
-        else if (hour >= 17 && hour < 21) bucket = 2; // Evening
-        else bucket = 3;                              // Night
-
-        timeStats[bucket].total++;
-        timedMatchCount++;
-        if (didWin) timeStats[bucket].wins++;
-    });
+    const dayMatchCount = dayStats.reduce((sum, s) => sum + s.total, 0);
+    const timedMatchCount = timeStats.reduce((sum, s) => sum + s.total, 0);
 
     destroyAnalyticsWidgetChart('performanceDay');
     destroyAnalyticsWidgetChart('performanceTime');
@@ -2105,19 +1669,17 @@ function renderPerformanceByDayAndTime(allMatches, currentUserId, startTimesByMa
         if (!dayMatchCount) {
             status.textContent = 'No match date data available.';
         } else if (!timedMatchCount) {
-            status.textContent = `${dayMatchCount} matches analyzed by day • loading start times for time-of-day`;
+            status.textContent = `${dayMatchCount} matches analyzed by day • no start-time data`;
         } else {
             status.textContent = `${dayMatchCount} matches by day • ${timedMatchCount} matches with start-time data`;
         }
     }
 }
 
-function renderNewAnalyticsWidgets(allMatches, currentUserId) {
-    // Render day-of-week immediately. Time-of-day is refined after live-score
-    // timestamps are loaded by fetchAdvancedMatchInsights().
-    renderPerformanceByDayAndTime(allMatches, currentUserId);
-}
-
+/**
+ * Main function to initialize the page and fetch all necessary data.
+ * @param {string} currentUserId - The ID of the user whose data to load.
+ */
 async function initializePage(currentUserId) {
     // Reset abort controller for new page load
     abortController = new AbortController();
@@ -2146,32 +1708,58 @@ async function initializePage(currentUserId) {
     }, 1500);
 
     fetchCurrentUserRating(currentUserId);
-    fetchWeeklyRankings(currentUserId);
-    fetchMatchStatistics(currentUserId);
-
-    const allMatches = await fetchAllMatches(currentUserId);
-
-    // New analytics widgets must be explicitly initialized after match history loads.
-    renderNewAnalyticsWidgets(allMatches, currentUserId);
-
-    renderStreaks(document.getElementById('streaks-container'), computeStreaks(allMatches, currentUserId));
-    const comebackStats = computeComebackStats(allMatches, currentUserId);
-    renderComebackTracker(document.getElementById('comeback-tracker-container'), comebackStats, currentUserId);
-
-    fetchAndDisplayMonthlyRatingChanges(currentUserId, allMatches);
-    calculateAverageOpponentRating(25, allMatches);
-    displayLastMatch(currentUserId, allMatches);
-    fetchAdvancedMatchInsights(allMatches, currentUserId);
 
+    setupModalListeners();
+    setupMatchStatClickListeners(currentUserId);
 
+    // Every card below renders from the one server-side summary; the full
+    // match history is only fetched when a card is clicked through.
+    let analytics = await fetchUserAnalytics(currentUserId);
+    if (!analytics) {
+        renderAnalyticsUnavailable();
+        return;
+    }
 
-    setupModalListeners();
-    setupMatchStatClickListeners(allMatches, currentUserId);
+    renderMatchRecord(analytics.record);
+    renderWeeklyRankings(analytics.rankings);
+    renderMonthlyRatingChanges(analytics.rankings, currentUserId);
+    renderAverageOpponentRating(analytics.opponentRating);
+    renderStreaks(document.getElementById('streaks-container'), analytics.streaks);
+    renderComebackTracker(document.getElementById('comeback-tracker-container'), analytics.comebacks, currentUserId);
+    displayLastMatch(currentUserId, analytics.lastMatch);
+    renderTopLosses(analytics.topLosses, currentUserId);
+    renderPerformanceByDayAndTime(analytics.byWeekday, analytics.byTimeOfDay);
+    renderMatchDurations(analytics.durations, currentUserId);
 
     document.getElementById('last-updated-date').textContent = new Date().toLocaleDateString(undefined, { month: 'short', day: 'numeric', year: 'numeric' });
 
-    // Load Top Losses by Opponent Rating (uses ratings already embedded in match objects, no extra API calls)
-    fetchAndDisplayTopLosses(currentUserId, allMatches);
+    // Match timings are fetched server-side in batches; keep asking until the
+    // summary covers every live-scored match.
+    for (let attempt = 0; !analytics.complete && attempt < ANALYTICS_REFRESH_ATTEMPTS; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, ANALYTICS_REFRESH_DELAY_MS));
+        const refreshed = await fetchUserAnalytics(currentUserId);
+        if (!refreshed) return;
+        analytics = refreshed;
+        renderPerformanceByDayAndTime(analytics.byWeekday, analytics.byTimeOfDay);
+        renderMatchDurations(analytics.durations, currentUserId);
+    }
+}
+
+/**
+ * Replaces the loading placeholders when the analytics summary can't be loaded.
+ */
+function renderAnalyticsUnavailable() {
+    const message = '<p class="text-center text-red-500 mt-10">Error loading data.</p>';
+    ['weekly-rankings-list', 'monthly-rating-change-list', 'top-losses-list', 'last-match-details',
+        'streaks-container', 'comeback-tracker-container'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.innerHTML = message;
+    });
+    ['average-opponent-rating', 'average-match-length', 'longest-match-length', 'shortest-match-length',
+        'average-point-length', 'longest-point-length', 'shortest-point-length'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.textContent = 'N/A';
+    });
 }
 
 
@@ -28,6 +28,8 @@ const scorecardCache = new Map();
 const matchInsightsCache = new Map();
 const playerProfilePictureCache = new Map();
 let chartJsLoadPromise = null;
+let stopLiveScorecard = null;
+let stopLiveInsights = null;
 
 function toggleSidebar() {
   const app = document.getElementById("app");
@@ -185,6 +187,28 @@ async function fetchPlayerProfilePicture(playerId) {
   return resolved;
 }
 
+// Resolves pictures for many players with one /api/users request so a roster or
+// scorecard doesn't fan out into a /proxy/user call per player.
+async function prefetchPlayerProfilePictures(playerIds) {
+  const missing = [...new Set(playerIds.map(String))]
+    .filter(key => key && !playerProfilePictureCache.has(key) && !findCachedPlayerPicture(key));
+  if (!missing.length) return;
+
+  try {
+    const params = new URLSearchParams({ ids: missing.join(","), fields: "picture" });
+    const response = await fetch(`/api/users?${params.toString()}`);
+    if (!response.ok) throw new Error(`Batch profile HTTP ${response.status}`);
+
+    const data = await response.json();
+    Object.entries(data?.users || {}).forEach(([key, user]) => {
+      const picture = cleanImageUrl(user?.picture || "");
+      playerProfilePictureCache.set(key, picture || DEFAULT_PROFILE_PICTURE);
+    });
+  } catch (error) {
+    console.warn("Batch profile picture lookup failed; falling back per player:", error);
+  }
+}
+
 async function hydratePlayerProfileImages(root) {
   if (!root) return;
 
@@ -201,6 +225,8 @@ async function hydratePlayerProfileImages(root) {
     byPlayer.get(playerId).push(image);
   });
 
+  await prefetchPlayerProfilePictures(Array.from(byPlayer.keys()));
+
   await Promise.all(
     Array.from(byPlayer.entries()).map(async ([playerId, playerImages]) => {
       const picture = await fetchPlayerProfilePicture(playerId);
@@ -320,6 +346,24 @@ function logoMarkup(team, sizeClass = "w-11 h-11") {
   `;
 }
 
+async function fetchDivisionSnapshot(divisionId) {
+  // Precomputed by the server: standings plus every team's roster, so
+  // Compare Teams needs no further requests.
+  const response = await fetch(`/api/teams/divisions/${divisionId}`);
+  if (!response.ok) throw new Error(`Division HTTP ${response.status}`);
+
+  const data = await response.json();
+  const teams = Array.isArray(data?.teams) ? data.teams : [];
+
+  teams.forEach(team => {
+    if (team.id !== null && Array.isArray(team.roster)) {
+      rosterCache.set(String(team.id), team.roster);
+    }
+  });
+
+  return teams;
+}
+
 async function fetchStandings(divisionId, force = false) {
   const id = Number(divisionId);
 
@@ -327,6 +371,16 @@ async function fetchStandings(divisionId, force = false) {
     return standingsCache.get(id);
   }
 
+  try {
+    const teams = await fetchDivisionSnapshot(id);
+    if (teams.length) {
+      standingsCache.set(id, teams);
+      return teams;
+    }
+  } catch (snapshotError) {
+    console.warn("Division snapshot unavailable; using standings proxy:", snapshotError);
+  }
+
   const response = await fetch(`/proxy/divisions/standings/${id}`);
   if (!response.ok) throw new Error(`Standings HTTP ${response.status}`);
 
@@ -748,11 +802,37 @@ async function fetchRoster(teamId) {
   return players;
 }
 
+async function fetchTeamSnapshot(teamId) {
+  // Roster, schedule and completed scorecards for one team in one response.
+  const response = await fetch(`/api/teams/${encodeURIComponent(teamId)}`);
+  if (!response.ok) throw new Error(`Team HTTP ${response.status}`);
+
+  const data = await response.json();
+  const key = String(teamId);
+
+  if (Array.isArray(data?.roster)) rosterCache.set(key, data.roster);
+  Object.entries(data?.scorecards || {}).forEach(([scorecardId, rows]) => {
+    scorecardCache.set(String(scorecardId), rows);
+  });
+
+  return Array.isArray(data?.schedule) ? data.schedule : null;
+}
+
 async function fetchSchedule(teamId) {
   const key = String(teamId);
 
   if (scheduleCache.has(key)) return scheduleCache.get(key);
 
+  try {
+    const schedule = await fetchTeamSnapshot(teamId);
+    if (schedule) {
+      scheduleCache.set(key, schedule);
+      return schedule;
+    }
+  } catch (snapshotError) {
+    console.warn("Team snapshot unavailable; using schedule proxy:", snapshotError);
+  }
+
   const response = await fetch(`/proxy/teams/${encodeURIComponent(teamId)}/schedule`);
   if (!response.ok) throw new Error(`Schedule HTTP ${response.status}`);
 
@@ -1343,28 +1423,24 @@ async function fetchTeamScorecard(scorecardId) {
   const key = String(scorecardId);
   if (scorecardCache.has(key)) return scorecardCache.get(key);
 
+  // Always go through the proxy: it caches, rate-limits and serves the last
+  // good scorecard when US Squash is struggling, where a direct call would
+  // only add to the load.
   const proxyUrl = `/proxy/leagues/scorecards/live?id=${encodeURIComponent(scorecardId)}`;
-  let response;
+  const response = await fetch(proxyUrl);
+  if (!response.ok) throw new Error(`Scorecard HTTP ${response.status}`);
 
-  try {
-    response = await fetch(proxyUrl);
-    if (!response.ok) throw new Error(`Scorecard HTTP ${response.status}`);
-  } catch (proxyError) {
-    console.warn("Scorecard proxy failed; trying US Squash directly:", proxyError);
-
-    const directUrl =
-      `https://api.ussquash.com/resources/leagues/scorecards/live?id=${encodeURIComponent(scorecardId)}`;
-
-    response = await fetch(directUrl);
-    if (!response.ok) throw new Error(`Scorecard HTTP ${response.status}`);
-  }
+  const sorted = sortScorecardRows(await response.json());
+  scorecardCache.set(key, sorted);
+  return sorted;
+}
 
-  const data = await response.json();
+function sortScorecardRows(data) {
   const rows = Array.isArray(data)
     ? data
     : (data?.matches || data?.scorecard || data?.results || []);
 
-  const sorted = [...rows].sort((a, b) => {
+  return [...rows].sort((a, b) => {
     const pa = numberOrNull(firstValue(a, ["positionNumber", "PositionNumber"], null));
     const pb = numberOrNull(firstValue(b, ["positionNumber", "PositionNumber"], null));
 
@@ -1373,9 +1449,11 @@ async function fetchTeamScorecard(scorecardId) {
     if (pb !== null) return 1;
     return 0;
   });
+}
 
-  scorecardCache.set(key, sorted);
-  return sorted;
+function isMatchToday(value) {
+  const date = parseMatchDate(value);
+  return Boolean(date) && date.toDateString() === new Date().toDateString();
 }
 
 function formatDurationValue(value) {
@@ -1517,6 +1595,8 @@ async function openMatchDetail(match, team) {
   const perspective = teamMatchPerspective(match, team.name, team.id);
   const completed = isCompletedTeamMatch(match);
   const scorecardId = perspective.scorecardId;
+  // Today's unfinished matches follow the live scorecard as courts finish.
+  const live = !completed && Boolean(scorecardId) && isMatchToday(perspective.date);
 
   document.getElementById("match-detail-date").textContent =
     completed ? "Completed Team Match" : "Team Match";
@@ -1569,7 +1649,9 @@ async function openMatchDetail(match, team) {
         <div>
           <h3 class="font-semibold text-gray-900">Individual Matches</h3>
           <p class="text-xs text-gray-400 mt-0.5">
-            ${completed && scorecardId
+            ${live
+              ? "Courts update live while the match is played."
+              : completed && scorecardId
               ? "Loading the full team scorecard…"
               : completed
                 ? "This result does not include a scorecard ID."
@@ -1579,7 +1661,7 @@ async function openMatchDetail(match, team) {
       </div>
 
       <div id="team-scorecard-matches" class="grid gap-2">
-        ${completed && scorecardId
+        ${(completed || live) && scorecardId
           ? `<div class="py-8 text-center">
                <svg class="animate-spin h-6 w-6 text-indigo-500 mx-auto mb-2"
                     xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
@@ -1597,73 +1679,94 @@ async function openMatchDetail(match, team) {
 
   if (window.lucide) lucide.createIcons();
 
-  if (!completed || !scorecardId) return;
-
   const scorecardContainer = document.getElementById("team-scorecard-matches");
 
+  if (live) {
+    if (stopLiveScorecard) stopLiveScorecard();
+    stopLiveScorecard = followLiveFeed(
+      `/api/live/scorecards/${encodeURIComponent(scorecardId)}/events`,
+      `/proxy/leagues/scorecards/live?id=${encodeURIComponent(scorecardId)}`,
+      data => renderTeamScorecardRows(
+        body, perspective, scorecardContainer, sortScorecardRows(data), "No courts have started yet."
+      )
+    );
+    return;
+  }
+
+  if (!completed || !scorecardId) return;
+
   try {
     const rows = await fetchTeamScorecard(scorecardId);
+    renderTeamScorecardRows(body, perspective, scorecardContainer, rows);
+  } catch (error) {
+    console.error("Failed to load team scorecard:", error);
+    scorecardContainer.innerHTML = `
+      <div class="rounded-xl border border-red-100 bg-red-50/60 p-5 text-center">
+        <p class="text-sm font-semibold text-red-600">Failed to load scorecard</p>
+        <p class="text-xs text-red-400 mt-1">${escapeHtml(error.message || "Unknown error")}</p>
+      </div>
+    `;
+  }
+}
 
-    if (!rows.length) {
-      scorecardContainer.innerHTML = `
-        <div class="rounded-xl border border-dashed border-gray-200 bg-gray-50/60 p-5 text-center">
-          <p class="text-sm font-semibold text-gray-600">No individual matches found</p>
-          <p class="text-xs text-gray-400 mt-1">The scorecard endpoint returned no court results.</p>
-        </div>
-      `;
-      return;
-    }
+function renderTeamScorecardRows(body, perspective, scorecardContainer, rows,
+  emptyMessage = "The scorecard endpoint returned no court results.") {
+  if (!rows.length) {
+    scorecardContainer.innerHTML = `
+      <div class="rounded-xl border border-dashed border-gray-200 bg-gray-50/60 p-5 text-center">
+        <p class="text-sm font-semibold text-gray-600">No individual matches found</p>
+        <p class="text-xs text-gray-400 mt-1">${escapeHtml(emptyMessage)}</p>
+      </div>
+    `;
+    return;
+  }
 
-    // Scorecard rows repeat the authoritative team names and final score.
-    const scorecardTeamResult = firstValue(rows[0], ["matchResult", "MatchResult"], "");
-    const scorecardHomeName = firstValue(rows[0], ["teamHomeName", "TeamHomeName"], "");
-    const scorecardVisitingName = firstValue(rows[0], ["teamVisitingName", "TeamVisitingName"], "");
+  // Scorecard rows repeat the authoritative team names and final score.
+  const scorecardTeamResult = firstValue(rows[0], ["matchResult", "MatchResult"], "");
+  const scorecardHomeName = firstValue(rows[0], ["teamHomeName", "TeamHomeName"], "");
+  const scorecardVisitingName = firstValue(rows[0], ["teamVisitingName", "TeamVisitingName"], "");
 
-    if (scorecardTeamResult) {
-      const headlineScore = body.querySelector(".text-2xl.font-black.text-indigo-700");
-      if (headlineScore) headlineScore.textContent = scorecardTeamResult;
-    }
+  if (scorecardTeamResult) {
+    const headlineScore = body.querySelector(".text-2xl.font-black.text-indigo-700");
+    if (headlineScore) headlineScore.textContent = scorecardTeamResult;
+  }
 
-    if (scorecardHomeName || scorecardVisitingName) {
-      document.getElementById("match-detail-title").textContent =
-        `${scorecardHomeName || perspective.home || "Home Team"} vs ${scorecardVisitingName || perspective.away || "Visiting Team"}`;
+  if (scorecardHomeName || scorecardVisitingName) {
+    document.getElementById("match-detail-title").textContent =
+      `${scorecardHomeName || perspective.home || "Home Team"} vs ${scorecardVisitingName || perspective.away || "Visiting Team"}`;
 
-      const teamHeadings = body.querySelectorAll(".rounded-2xl.border.border-indigo-100 p.font-bold");
-      if (teamHeadings.length >= 2) {
-        if (scorecardHomeName) teamHeadings[0].textContent = scorecardHomeName;
-        if (scorecardVisitingName) teamHeadings[1].textContent = scorecardVisitingName;
-      }
+    const teamHeadings = body.querySelectorAll(".rounded-2xl.border.border-indigo-100 p.font-bold");
+    if (teamHeadings.length >= 2) {
+      if (scorecardHomeName) teamHeadings[0].textContent = scorecardHomeName;
+      if (scorecardVisitingName) teamHeadings[1].textContent = scorecardVisitingName;
     }
+  }
 
-    scorecardContainer.innerHTML = rows.map(individualCourtMarkup).join("");
-    hydratePlayerProfileImages(scorecardContainer);
+  scorecardContainer.innerHTML = rows.map(individualCourtMarkup).join("");
+  hydratePlayerProfileImages(scorecardContainer);
 
-    scorecardContainer.querySelectorAll("[data-individual-match-id]").forEach(button => {
-      button.addEventListener("click", () => {
-        const matchId = button.dataset.individualMatchId;
-        const row = rows.find(item => String(getMatchId(item)) === String(matchId));
+  scorecardContainer.querySelectorAll("[data-individual-match-id]").forEach(button => {
+    button.addEventListener("click", () => {
+      const matchId = button.dataset.individualMatchId;
+      const row = rows.find(item => String(getMatchId(item)) === String(matchId));
 
-        if (row) {
-          openIndividualMatchInsights(row);
-        }
-      });
+      if (row) {
+        openIndividualMatchInsights(row);
+      }
     });
+  });
 
-    if (window.lucide) lucide.createIcons();
-  } catch (error) {
-    console.error("Failed to load team scorecard:", error);
-    scorecardContainer.innerHTML = `
-      <div class="rounded-xl border border-red-100 bg-red-50/60 p-5 text-center">
-        <p class="text-sm font-semibold text-red-600">Failed to load scorecard</p>
-        <p class="text-xs text-red-400 mt-1">${escapeHtml(error.message || "Unknown error")}</p>
-      </div>
-    `;
-  }
+  if (window.lucide) lucide.createIcons();
 }
 
 function closeMatchDetail() {
   closeIndividualMatchInsights();
 
+  if (stopLiveScorecard) {
+    stopLiveScorecard();
+    stopLiveScorecard = null;
+  }
+
   const modal = document.getElementById("match-detail-modal");
   modal.classList.add("hidden");
   modal.classList.remove("flex");
@@ -1924,26 +2027,7 @@ async function fetchMatchInsightsData(match) {
 
       if (!response.ok) throw new Error(`Live score HTTP ${response.status}`);
 
-      const data = await response.json();
-      if (!Array.isArray(data) || data.length < 2) return null;
-
-      const allPoints = data
-        .filter(evt => evt.Decision === "point")
-        .sort((a, b) => new Date(a.StartDate) - new Date(b.StartDate));
-
-      if (allPoints.length < 2) return null;
-
-      const gameMap = {};
-      allPoints.forEach(evt => {
-        if (!gameMap[evt.Game_Number]) gameMap[evt.Game_Number] = [];
-        gameMap[evt.Game_Number].push(evt);
-      });
-
-      const uniqueGames = Object.keys(gameMap)
-        .map(game => parseInt(game, 10))
-        .sort((a, b) => a - b);
-
-      return { allPoints, gameMap, uniqueGames };
+      return buildMatchInsightsData(await response.json());
     } catch (error) {
       console.warn(`Unable to load Match Insights for match ${key}:`, error);
       return null;
@@ -1956,6 +2040,30 @@ async function fetchMatchInsightsData(match) {
   return result;
 }
 
+// Re-renders an open insights modal as points arrive for a court in play.
+function followLiveMatchInsights(match, container) {
+  const key = String(getMatchId(match));
+  if (stopLiveInsights) stopLiveInsights();
+
+  stopLiveInsights = followLiveFeed(
+    `/api/live/matches/${encodeURIComponent(key)}/events`,
+    `/proxy/liveScoreDetails?match_id=${encodeURIComponent(key)}`,
+    data => {
+      const insightsData = buildMatchInsightsData(data);
+      if (!insightsData) return;
+
+      matchInsightsCache.set(key, insightsData);
+      if (sessionStorage.getItem(SESSION_STORAGE_KEY_MATCH_INSIGHTS) !== "true") return;
+
+      container.querySelectorAll("canvas").forEach(canvas => {
+        const chart = window.Chart && Chart.getChart(canvas);
+        if (chart) chart.destroy();
+      });
+      renderMatchInsights(match, insightsData, container);
+    }
+  );
+}
+
 function renderAccessCodeGate(match, insightsData, metricsContainer, matchInsightsTitle) {
   metricsContainer.innerHTML = `
     <div id="code-input-area" class="text-center py-8 px-4">
@@ -2229,16 +2337,6 @@ async function openIndividualMatchInsights(matchRow) {
       })
     ]);
 
-    if (!insightsData) {
-      body.innerHTML = `
-        <div class="rounded-xl border border-dashed border-gray-200 bg-gray-50 p-6 text-center">
-          <p class="text-sm font-semibold text-gray-700">No Match Insights available</p>
-          <p class="text-xs text-gray-400 mt-1">This match does not currently have usable point-by-point scoring data.</p>
-        </div>
-      `;
-      return;
-    }
-
     const matchForInsights = {
       ...matchRow,
       Matchid: matchId,
@@ -2249,6 +2347,22 @@ async function openIndividualMatchInsights(matchRow) {
       playerVisiting1Name: awayName
     };
 
+    // The team match is still being played, so this court may be too.
+    if (stopLiveScorecard) {
+      matchInsightsCache.delete(String(matchId));
+      followLiveMatchInsights(matchForInsights, body);
+    }
+
+    if (!insightsData) {
+      body.innerHTML = `
+        <div class="rounded-xl border border-dashed border-gray-200 bg-gray-50 p-6 text-center">
+          <p class="text-sm font-semibold text-gray-700">No Match Insights available</p>
+          <p class="text-xs text-gray-400 mt-1">This match does not currently have usable point-by-point scoring data.</p>
+        </div>
+      `;
+      return;
+    }
+
     if (sessionStorage.getItem(SESSION_STORAGE_KEY_MATCH_INSIGHTS) === "true") {
       renderMatchInsights(matchForInsights, insightsData, body);
     } else {
@@ -2269,6 +2383,11 @@ async function openIndividualMatchInsights(matchRow) {
 
 
 function closeIndividualMatchInsights() {
+  if (stopLiveInsights) {
+    stopLiveInsights();
+    stopLiveInsights = null;
+  }
+
   const modal = document.getElementById("individual-insights-modal");
   if (!modal) return;
 
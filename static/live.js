@@ -0,0 +1,95 @@
+// Live match helpers shared by the dashboard (script.js) and the college
+// teams page (collegeteams.js). Load this before either of them.
+
+const LIVE_POLL_INTERVAL_MS = 5000;
+
+// Turns a raw liveScoreDetails payload into { allPoints, gameMap, uniqueGames },
+// or null when there aren't enough points to chart.
+function buildMatchInsightsData(data) {
+  if (!Array.isArray(data) || data.length < 2) return null;
+
+  const allPoints = data
+    .filter(evt => evt.Decision === "point")
+    .sort((a, b) => new Date(a.StartDate) - new Date(b.StartDate));
+
+  if (allPoints.length < 2) return null;
+
+  const gameMap = {};
+  allPoints.forEach(evt => {
+    if (!gameMap[evt.Game_Number]) gameMap[evt.Game_Number] = [];
+    gameMap[evt.Game_Number].push(evt);
+  });
+
+  const uniqueGames = Object.keys(gameMap)
+    .map(game => parseInt(game, 10))
+    .sort((a, b) => a - b);
+
+  return { allPoints, gameMap, uniqueGames };
+}
+
+// Applies one "diff" event from a live stream to the payload it describes.
+function applyLiveDiff(current, diff) {
+  if (diff.type === "append") return [...(Array.isArray(current) ? current : []), ...diff.items];
+  if (diff.type === "patch") {
+    const next = { ...(current || {}) };
+    Object.assign(next, diff.set);
+    (diff.remove || []).forEach(key => delete next[key]);
+    return next;
+  }
+  return diff.data;
+}
+
+// Follows a live feed and calls onData with the full payload on every change.
+// Uses the server's event stream when it's available; when the stream is off
+// (it answers 503) or closes for good, falls back to polling the cached proxy.
+// Returns a function that stops following.
+function followLiveFeed(eventsUrl, pollUrl, onData) {
+  let stopped = false;
+  let source = null;
+  let pollTimer = null;
+  let payload = null;
+
+  const poll = async () => {
+    try {
+      const response = await fetch(pollUrl, { method: "GET", credentials: "include" });
+      if (response.ok) {
+        payload = await response.json();
+        if (!stopped) onData(payload);
+      }
+    } catch (error) {
+      console.warn("Live poll failed:", error);
+    }
+    if (!stopped) pollTimer = setTimeout(poll, LIVE_POLL_INTERVAL_MS);
+  };
+
+  const startPolling = () => {
+    if (source) {
+      source.close();
+      source = null;
+    }
+    if (!stopped && pollTimer === null) {
+      pollTimer = setTimeout(poll, 0);
+    }
+  };
+
+  if (typeof EventSource === "undefined") {
+    startPolling();
+  } else {
+    source = new EventSource(eventsUrl);
+    source.addEventListener("diff", event => {
+      payload = applyLiveDiff(payload, JSON.parse(event.data));
+      if (!stopped) onData(payload);
+    });
+    // EventSource reconnects by itself after network blips; CLOSED means the
+    // server refused the stream.
+    source.onerror = () => {
+      if (source && source.readyState === EventSource.CLOSED) startPolling();
+    };
+  }
+
+  return () => {
+    stopped = true;
+    if (source) source.close();
+    if (pollTimer !== null) clearTimeout(pollTimer);
+  };
+}
@@ -92,6 +92,11 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     async function fetchVerifiedLeaderboardDetails(userId, userData, rankings, fallbackName = '') {
+        // The server keeps an indexed snapshot of the leaderboard; a direct
+        // player lookup avoids paging when the snapshot is ready.
+        const indexed = await safeFetchJson(`/api/rankings/208/player/${userId}?divisions=0`);
+        if (indexed) return indexed;
+
         const target = getUniversalRankingEntry(rankings);
         const rawRanking = num(target?.Ranking ?? target?.ranking);
         if (rawRanking === null) return null;
@@ -656,6 +661,10 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     async function findHeadToHeadMatches(playerAId, playerBId, maxPages = 20) {
+        // The server's match index covers the full history in one lookup.
+        const indexed = await safeFetchJson(`/api/h2h/${playerAId}/${playerBId}`);
+        if (indexed && Array.isArray(indexed.matches)) return indexed;
+
         const { matches, exhausted, pagesScanned } = await fetchMatchPages(playerAId, maxPages);
         const direct = [];
         let completedScanned = 0;
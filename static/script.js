@@ -788,6 +788,11 @@ function firstNamesMatch(a, b) {
  */
 async function fetchUserFromRankings(userId, expectedFirstName = '') {
     try {
+        // The server keeps an indexed snapshot of the leaderboard; a direct
+        // player lookup avoids the rank/page search below when it is ready.
+        const indexedRes = await fetch(`/api/rankings/208/player/${userId}?divisions=0`);
+        if (indexedRes.ok) return normalizeLeaderboardEntry(await indexedRes.json());
+
         // Step 1: find the current Universal Squash Rating entry.
         const rankingsRes = await fetch(`/proxy/user/${userId}/rankings-current`);
         if (!rankingsRes.ok) throw new Error(`Rankings HTTP error ${rankingsRes.status}`);
@@ -930,6 +935,19 @@ async function fetchAndCalculateAverageOpponentRating(currentUserId, currentUser
     let matchesProcessedCount = 0;
     const matchesToConsider = 15;
 
+    // The server answers from its match index in one request, including
+    // ratings-at-match-time for opponents whose rating is missing on the match.
+    try {
+        const indexedRes = await fetch(`/api/user/${currentUserId}/opponent-ratings?last=${matchesToConsider}`);
+        if (indexedRes.ok) {
+            const indexed = await indexedRes.json();
+            (indexed.matches || []).forEach(entry => opponentRatings.push(entry.opponentRating));
+            matchesProcessedCount = matchesToConsider;
+        }
+    } catch (error) {
+        console.warn("Indexed opponent ratings unavailable, scanning match pages instead:", error);
+    }
+
     for (let page = 1; matchesProcessedCount < matchesToConsider; page++) {
         try {
             const response = await fetch(`/proxy/user/${currentUserId}/matches/page/${page}`);
@@ -1394,23 +1412,34 @@ async function fetchMatchInsightsData(match) {
         return null;
     }
 
-    if (!data || data.length === 0) return null;
-
-    const allPoints = data.filter(evt => evt.Decision === "point");
-    if (allPoints.length < 2) return null;
-    allPoints.sort((a, b) => new Date(a.StartDate) - new Date(b.StartDate));
+    const result = buildMatchInsightsData(data);
+    if (result) matchInsightsDataCache.set(match_id, result);
+    return result;
+}
 
-    const gameMap = {};
-    for (const evt of allPoints) {
-        const g = evt.Game_Number;
-        if (!gameMap[g]) gameMap[g] = [];
-        gameMap[g].push(evt);
-    }
-    const uniqueGames = Object.keys(gameMap).map(g => parseInt(g)).sort((a, b) => a - b);
+let stopLiveInsights = null;
 
-    const result = { allPoints, gameMap, uniqueGames };
-    matchInsightsDataCache.set(match_id, result);
-    return result;
+/**
+ * Keeps an open Match Insights modal up to date while the match is in play.
+ */
+function followLiveMatchInsights(match, metricsContainer) {
+    const match_id = match.matchId || match.Matchid;
+    if (stopLiveInsights) stopLiveInsights();
+    stopLiveInsights = followLiveFeed(
+        `/api/live/matches/${encodeURIComponent(match_id)}/events`,
+        `/proxy/liveScoreDetails?match_id=${encodeURIComponent(match_id)}`,
+        data => {
+            const insightsData = buildMatchInsightsData(data);
+            if (!insightsData) return;
+            matchInsightsDataCache.set(match_id, insightsData);
+            if (sessionStorage.getItem(SESSION_STORAGE_KEY_MATCH_INSIGHTS) !== 'true') return;
+            metricsContainer.querySelectorAll("canvas").forEach(canvas => {
+                const chart = window.Chart && Chart.getChart(canvas);
+                if (chart) chart.destroy();
+            });
+            renderMatchInsights(match, insightsData, metricsContainer);
+        }
+    );
 }
 
 // NEW: Functions for the Graph Modal
@@ -1457,6 +1486,10 @@ async function showGraphModal(match) {
         return;
     }
 
+    if (!isRenderableCompletedMatch(match) && metricsContainer) {
+        followLiveMatchInsights(match, metricsContainer);
+    }
+
     // Check if access has already been granted in this session
     if (sessionStorage.getItem(SESSION_STORAGE_KEY_MATCH_INSIGHTS) === 'true') {
         if (matchInsightsTitle) matchInsightsTitle.textContent = 'Match Insights';
@@ -1769,6 +1802,10 @@ function renderMatchInsights(match, insightsData, metricsContainer) {
 
     
 function closeGraphModal() {
+    if (stopLiveInsights) {
+        stopLiveInsights();
+        stopLiveInsights = null;
+    }
     const graphModal = document.getElementById("graph-modal");
     if (!graphModal) return;
     graphModal.style.display = "none";
@@ -0,0 +1,318 @@
+# Local SQLite store of players, matches, ratings and rankings, synced from
+# upstream by app.sync_player. Readers get None (or nothing) for data not
+# synced within STORE_MAX_AGE so the routes fall back to upstream.
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from cache import INSTANCE_PATH, SQLitePool
+from util import as_float, as_int
+
+logger = logging.getLogger(__name__)
+
+MATCH_STORE_PATH = os.environ.get("MATCH_STORE_PATH", os.path.join(INSTANCE_PATH, "ussquash.sqlite3"))
+# Same lifetime as the "matches" response cache policy, so a page served from
+# the store is never staler than one served from the cache.
+STORE_MAX_AGE = float(os.environ.get("STORE_MAX_AGE", 300))
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    player_id INTEGER PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    match_id INTEGER PRIMARY KEY,
+    match_date TEXT,
+    home_id INTEGER,
+    visitor_id INTEGER,
+    winner TEXT,
+    status TEXT,
+    score TEXT,
+    home_rating REAL,
+    visitor_rating REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_home ON matches (home_id, match_date DESC);
+CREATE INDEX IF NOT EXISTS idx_matches_visitor ON matches (visitor_id, match_date DESC);
+CREATE INDEX IF NOT EXISTS idx_matches_pair
+    ON matches (min(home_id, visitor_id), max(home_id, visitor_id), match_date DESC);
+CREATE TABLE IF NOT EXISTS player_matches (
+    player_id INTEGER NOT NULL,
+    match_id INTEGER NOT NULL,
+    match_date TEXT,
+    PRIMARY KEY (player_id, match_id)
+);
+CREATE INDEX IF NOT EXISTS idx_player_matches_date ON player_matches (player_id, match_date DESC);
+CREATE TABLE IF NOT EXISTS rating_snapshots (
+    player_id INTEGER NOT NULL,
+    rating_type TEXT NOT NULL,
+    snapshot_date TEXT NOT NULL,
+    rating REAL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (player_id, rating_type, snapshot_date)
+);
+CREATE TABLE IF NOT EXISTS ranking_snapshots (
+    player_id INTEGER NOT NULL,
+    ranking_period TEXT NOT NULL,
+    division TEXT NOT NULL,
+    rating_group TEXT NOT NULL,
+    ranking INTEGER,
+    rating REAL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (player_id, ranking_period, division, rating_group)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    player_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (player_id, kind)
+);
+"""
+
+_store_schema_lock = threading.Lock()
+_store_schema_ready = False
+
+
+def connect_store():
+    # SQLite's WAL mode lets the readers in every worker run alongside a
+    # single writer.
+    global _store_schema_ready
+    os.makedirs(os.path.dirname(MATCH_STORE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(MATCH_STORE_PATH, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _store_schema_lock:
+        if not _store_schema_ready:
+            conn.executescript(STORE_SCHEMA)
+            _store_schema_ready = True
+    return conn
+
+
+store_pool = SQLitePool(connect_store)
+
+
+def store_mark_synced(conn, user_id, kind):
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (player_id, kind, synced_at) VALUES (?, ?, ?)",
+        (user_id, kind, time.time()),
+    )
+
+
+def store_is_fresh(user_id, kind, max_age=None):
+    try:
+        with store_pool.connection() as conn:
+            row = conn.execute(
+                "SELECT synced_at FROM sync_state WHERE player_id = ? AND kind = ?", (user_id, kind)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Store lookup failed: {e}")
+        return False
+    return row is not None and time.time() - row["synced_at"] < (max_age or STORE_MAX_AGE)
+
+
+def store_known_match_ids(user_id):
+    with store_pool.connection() as conn:
+        rows = conn.execute("SELECT match_id FROM player_matches WHERE player_id = ?", (user_id,))
+        return {row["match_id"] for row in rows}
+
+
+def store_save_matches(user_id, matches):
+    with store_pool.connection() as conn, conn:
+        for match in matches:
+            match_id = as_int(match.get("Matchid"))
+            if match_id is None:
+                continue
+            match_date = match.get("MatchDate")
+            conn.execute(
+                "INSERT OR REPLACE INTO matches (match_id, match_date, home_id, visitor_id, winner, status,"
+                " score, home_rating, visitor_rating, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    match_id,
+                    match_date,
+                    as_int(match.get("wid1")),
+                    as_int(match.get("oid1")),
+                    match.get("Winner"),
+                    match.get("Status"),
+                    match.get("Score"),
+                    as_float(match.get("w1Rating")),
+                    as_float(match.get("o1Rating")),
+                    json.dumps(match, separators=(",", ":")),
+                ),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO player_matches (player_id, match_id, match_date) VALUES (?, ?, ?)",
+                (user_id, match_id, match_date),
+            )
+        store_mark_synced(conn, user_id, "matches")
+
+
+def store_load_matches(user_id, limit=-1, offset=0):
+    with store_pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT m.payload FROM player_matches pm JOIN matches m ON m.match_id = pm.match_id"
+            " WHERE pm.player_id = ? ORDER BY pm.match_date DESC, pm.match_id DESC LIMIT ? OFFSET ?",
+            (user_id, limit, offset),
+        ).fetchall()
+    return [json.loads(row["payload"]) for row in rows]
+
+
+def store_save_player(user_id, details):
+    with store_pool.connection() as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO players (player_id, first_name, last_name, payload, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (
+                user_id,
+                details.get("firstName"),
+                details.get("lastName"),
+                json.dumps(details, separators=(",", ":")),
+                time.time(),
+            ),
+        )
+        store_mark_synced(conn, user_id, "player")
+
+
+def store_save_ratings(user_id, ratings):
+    snapshot_date = time.strftime("%Y-%m-%d")
+    with store_pool.connection() as conn, conn:
+        for entry in ratings:
+            conn.execute(
+                "INSERT OR REPLACE INTO rating_snapshots (player_id, rating_type, snapshot_date, rating, payload)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    entry.get("ratingTypeName") or "",
+                    snapshot_date,
+                    as_float(entry.get("rating")),
+                    json.dumps(entry, separators=(",", ":")),
+                ),
+            )
+        store_mark_synced(conn, user_id, "ratings")
+
+
+def store_save_rankings(user_id, rankings):
+    with store_pool.connection() as conn, conn:
+        for entry in rankings:
+            conn.execute(
+                "INSERT OR REPLACE INTO ranking_snapshots (player_id, ranking_period, division, rating_group,"
+                " ranking, rating, payload) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    entry.get("RankingPeriod") or "",
+                    entry.get("DivisionName") or "",
+                    entry.get("RatingGroupDescr") or "",
+                    as_int(entry.get("Ranking")),
+                    as_float(entry.get("Rating")),
+                    json.dumps(entry, separators=(",", ":")),
+                ),
+            )
+        store_mark_synced(conn, user_id, "rankings")
+
+
+def store_user_details(user_id):
+    if not store_is_fresh(user_id, "player"):
+        return None
+    with store_pool.connection() as conn:
+        row = conn.execute("SELECT payload FROM players WHERE player_id = ?", (user_id,)).fetchone()
+    return json.loads(row["payload"]) if row else None
+
+
+def store_user_matches_page(user_id, page, page_size):
+    # One upstream-shaped page of a player's matches, newest first.
+    if not store_is_fresh(user_id, "matches"):
+        return None
+    return {"matches": store_load_matches(user_id, page_size, (page - 1) * page_size)}
+
+
+def store_user_ratings(user_id):
+    if not store_is_fresh(user_id, "ratings"):
+        return None
+    with store_pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT payload FROM rating_snapshots WHERE player_id = ? AND snapshot_date ="
+            " (SELECT MAX(snapshot_date) FROM rating_snapshots WHERE player_id = ?)",
+            (user_id, user_id),
+        ).fetchall()
+    return [json.loads(row["payload"]) for row in rows]
+
+
+def store_user_rankings(user_id):
+    if not store_is_fresh(user_id, "rankings"):
+        return None
+    with store_pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT payload FROM ranking_snapshots WHERE player_id = ? ORDER BY ranking_period DESC", (user_id,)
+        ).fetchall()
+    return [json.loads(row["payload"]) for row in rows]
+
+
+def store_head_to_head(player_a, player_b):
+    with store_pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT payload FROM matches WHERE min(home_id, visitor_id) = ? AND max(home_id, visitor_id) = ?"
+            " ORDER BY match_date DESC, match_id DESC",
+            (min(player_a, player_b), max(player_a, player_b)),
+        ).fetchall()
+    return [json.loads(row["payload"]) for row in rows]
+
+
+def store_completed_match_count(user_id):
+    with store_pool.connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM player_matches pm JOIN matches m ON m.match_id = pm.match_id"
+            " WHERE pm.player_id = ? AND m.status IN ('C', 'RE')",
+            (user_id,),
+        ).fetchone()[0]
+
+
+def store_rating_at(player_id, match_date):
+    # The player's rating as recorded on their latest stored match on or
+    # before match_date, then their newest stored rating snapshot.
+    with store_pool.connection() as conn:
+        row = conn.execute(
+            "SELECT rating FROM ("
+            " SELECT match_date, home_rating AS rating FROM matches"
+            "  WHERE home_id = ? AND match_date <= ? AND home_rating IS NOT NULL"
+            " UNION ALL"
+            " SELECT match_date, visitor_rating AS rating FROM matches"
+            "  WHERE visitor_id = ? AND match_date <= ? AND visitor_rating IS NOT NULL"
+            ") ORDER BY match_date DESC LIMIT 1",
+            (player_id, match_date, player_id, match_date),
+        ).fetchone()
+        if row is not None:
+            return row["rating"], "history"
+        row = conn.execute(
+            "SELECT rating FROM rating_snapshots WHERE player_id = ? AND rating IS NOT NULL"
+            " ORDER BY snapshot_date DESC LIMIT 1",
+            (player_id,),
+        ).fetchone()
+    if row is not None:
+        return row["rating"], "snapshot"
+    return None, None
+
+
+def store_iter_completed_matches(user_id):
+    # Holds its connection until the caller stops iterating.
+    with store_pool.connection() as conn:
+        rows = conn.execute(
+            "SELECT m.payload FROM player_matches pm JOIN matches m ON m.match_id = pm.match_id"
+            " WHERE pm.player_id = ? AND m.status IN ('C', 'RE')"
+            " ORDER BY pm.match_date DESC, pm.match_id DESC",
+            (user_id,),
+        )
+        for row in rows:
+            yield json.loads(row["payload"])
+
+
+def store_player_payloads():
+    # (player_id, details) for every stored player.
+    with store_pool.connection() as conn:
+        rows = conn.execute("SELECT player_id, payload FROM players").fetchall()
+    return [(row["player_id"], json.loads(row["payload"])) for row in rows]
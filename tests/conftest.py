@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# app.py reads its configuration at import time; keep the store, the shared
+# cache file and the background threads away from the real instance folder.
+_instance = tempfile.mkdtemp(prefix="ussquash-tests-")
+os.environ.setdefault("MATCH_STORE_PATH", os.path.join(_instance, "store.sqlite3"))
+os.environ.setdefault("CACHE_SHARED_PATH", os.path.join(_instance, "cache.sqlite3"))
+os.environ.setdefault("WARMUP_INTERVAL", "0")
+os.environ.setdefault("LEADERBOARD_SNAPSHOTS", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
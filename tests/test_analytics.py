@@ -0,0 +1,170 @@
+import os
+import re
+from datetime import datetime
+
+import app
+
+USER_ID = 7
+YEAR = datetime.now().year
+
+
+def match(match_id, date, home, winner, score, opponent_rating, status="C"):
+    # `home`: the user was the home player (wid1); `winner`: "H" or "V".
+    return {
+        "Matchid": match_id,
+        "MatchDate": date,
+        "Status": status,
+        "Winner": winner,
+        "Score": score,
+        "wid1": USER_ID if home else 99,
+        "oid1": 99 if home else USER_ID,
+        "w1Rating": 4.0 if home else opponent_rating,
+        "o1Rating": opponent_rating if home else 4.0,
+    }
+
+
+# Newest first, like the match history.
+MATCHES = [
+    match(12, f"{YEAR}-03-08T19:00:00", True, "H", "11-9,11-7,11-4", 4.4),
+    match(11, f"{YEAR}-03-01T10:00:00", False, "V", "5-11,11-8,11-9,11-2", 3.9),
+    match(10, f"{YEAR}-02-22T10:00:00", True, "V", "11-6,11-8,11-3", 5.1),
+    match(9, f"{YEAR}-02-15T10:00:00", True, "H", "8-11,9-11,11-7,11-5,11-9", 4.6),
+    match(8, f"{YEAR}-02-08T10:00:00", False, "H", "11-9,9-11,11-8,11-6", 4.8),
+    match(7, f"{YEAR}-02-01T10:00:00", False, "V", "11-7,6-11,8-11,11-5,11-8", 4.2),
+    match(6, f"{YEAR - 1}-12-20T10:00:00", True, "H", "11-4,11-6,11-5", 3.2),
+    match(5, f"{YEAR - 1}-12-13T10:00:00", True, "H", "7-11,11-5,9-11,11-9,11-7", 4.3),
+    match(4, f"{YEAR - 1}-12-06T10:00:00", False, "H", "11-3,11-2,11-4", 5.4),
+    match(3, f"{YEAR - 1}-11-29T10:00:00", True, "V", "11-8,4-11,11-9,11-9", 4.9),
+]
+
+RANKINGS = [
+    {"RankingPeriod": f"{YEAR - 1}-12-28T00:00:00", "DivisionName": "All", "RatingGroupDescr": "Men", "Rating": 3.95, "Ranking": 120},
+    {"RankingPeriod": f"{YEAR}-01-04T00:00:00", "DivisionName": "All", "RatingGroupDescr": "Men", "Rating": 3.98, "Ranking": 118},
+    {"RankingPeriod": f"{YEAR}-02-01T00:00:00", "DivisionName": "All", "RatingGroupDescr": "Men", "Rating": 4.02, "Ranking": 110},
+    {"RankingPeriod": f"{YEAR}-03-01T00:00:00", "DivisionName": "All", "RatingGroupDescr": "Men", "Rating": 4.11, "Ranking": 101},
+]
+
+
+# Reference implementations transliterated from the pre-server analytics.js.
+
+def old_did_user_win(m):
+    is_home = m["wid1"] == USER_ID
+    return m["Winner"] == ("H" if is_home else "V")
+
+
+def old_opponent_rating(m):
+    return m["o1Rating"] if m["wid1"] == USER_ID else m["w1Rating"]
+
+
+def old_compute_streaks(matches):
+    ordered = sorted(matches, key=lambda m: m["MatchDate"])
+    best_win = best_loss = run_win = run_loss = 0
+    for m in ordered:
+        if old_did_user_win(m):
+            run_win, run_loss = run_win + 1, 0
+            best_win = max(best_win, run_win)
+        else:
+            run_win, run_loss = 0, run_loss + 1
+            best_loss = max(best_loss, run_loss)
+    current_type, current_count = None, 0
+    for m in reversed(ordered):
+        kind = "W" if old_did_user_win(m) else "L"
+        if current_type is None:
+            current_type, current_count = kind, 1
+        elif kind == current_type:
+            current_count += 1
+        else:
+            break
+    return {"currentType": current_type, "currentCount": current_count, "highestWin": best_win, "highestLoss": best_loss}
+
+
+def old_compute_comeback_stats(matches):
+    comebacks = trailed_matches = reverse_sweeps = trailed_two_love = 0
+    for m in matches:
+        won = old_did_user_win(m)
+        sequence = ""
+        user_games = opponent_games = 0
+        trailed = two_love = False
+        for game in m["Score"].split(","):
+            trailed = trailed or opponent_games > user_games
+            two_love = two_love or opponent_games - user_games == 2
+            first, second = (int(part) for part in game.split("-"))
+            user, other = (first, second) if won else (second, first)
+            user_games += user > other
+            opponent_games += other > user
+            sequence += "W" if user > other else "L"
+        trailed_matches += trailed
+        trailed_two_love += two_love
+        if won and sequence in ("LWWW", "LLWWW", "WLLWW", "LWLWW"):
+            comebacks += 1
+            reverse_sweeps += sequence == "LLWWW"
+    return {
+        "comebackWins": comebacks,
+        "trailedMatches": trailed_matches,
+        "reverseSweeps": reverse_sweeps,
+        "trailedTwoLove": trailed_two_love,
+    }
+
+
+def old_average_opponent_rating(matches, count=25):
+    newest_first = sorted(matches, key=lambda m: m["MatchDate"], reverse=True)[:count]
+    ratings = [old_opponent_rating(m) for m in newest_first]
+    return round(sum(ratings) / len(ratings), 2)
+
+
+def old_top_losses(matches):
+    losses = [(old_opponent_rating(m), m["Matchid"]) for m in matches if not old_did_user_win(m)]
+    return sorted(losses, key=lambda item: item[0], reverse=True)[:5]
+
+
+def old_ytd_change(rankings):
+    this_year = sorted(
+        (r for r in rankings if r["DivisionName"] == "All" and r["RankingPeriod"][:4] == str(YEAR)),
+        key=lambda r: r["RankingPeriod"],
+    )
+    if len(this_year) < 2:
+        return None
+    return this_year[-1]["Rating"] - this_year[0]["Rating"]
+
+
+def test_summary_matches_old_client_numbers():
+    summary = app.compute_match_analytics(USER_ID, MATCHES)
+    wins = sum(old_did_user_win(m) for m in MATCHES)
+
+    assert summary["record"]["wins"] == wins
+    assert summary["record"]["losses"] == len(MATCHES) - wins
+    assert summary["streaks"] == old_compute_streaks(MATCHES)
+    comebacks = dict(summary["comebacks"])
+    assert len(comebacks.pop("matchIds")) == comebacks["comebackWins"]
+    assert comebacks == old_compute_comeback_stats(MATCHES)
+    assert summary["opponentRating"]["average"] == old_average_opponent_rating(MATCHES)
+    assert [(loss["rating"], loss["match"]["Matchid"]) for loss in summary["topLosses"]] == old_top_losses(MATCHES)
+    assert summary["lastMatch"]["Matchid"] == MATCHES[0]["Matchid"]
+
+
+def test_ytd_change_uses_the_calendar_year():
+    rankings = app.compute_ranking_analytics(RANKINGS)
+    assert rankings["ytdChange"] == round(old_ytd_change(RANKINGS), 4)
+    assert rankings["ytdChange"] == round(4.11 - 3.98, 4)
+
+
+def test_no_ytd_change_without_ratings_this_year():
+    last_year = [dict(r, RankingPeriod=r["RankingPeriod"].replace(str(YEAR), str(YEAR - 1), 1)) for r in RANKINGS[1:]]
+    assert app.compute_ranking_analytics(last_year)["ytdChange"] is None
+
+
+def test_fingerprint_tracks_status_and_score():
+    scheduled = [dict(MATCHES[0], Status="S", Score="")] + MATCHES[1:]
+    played = [dict(MATCHES[0], Status="C")] + MATCHES[1:]
+    corrected = [dict(MATCHES[0], Score="11-9,11-7,11-5")] + MATCHES[1:]
+
+    fingerprints = {app.match_fingerprint(history) for history in (scheduled, played, corrected)}
+    assert len(fingerprints) == 3
+    assert app.match_fingerprint(list(MATCHES)) == app.match_fingerprint(MATCHES)
+
+
+def test_partial_summary_expires_before_the_page_polls_again():
+    path = os.path.join(os.path.dirname(app.__file__), "static", "analytics.js")
+    with open(path) as fh:
+        delay_ms = int(re.search(r"ANALYTICS_REFRESH_DELAY_MS = (\d+)", fh.read()).group(1))
+    assert app.CACHE_TTLS["analytics_partial"] * 1000 < delay_ms
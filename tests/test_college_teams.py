@@ -0,0 +1,116 @@
+import pytest
+import requests
+
+import app
+from cache import MemoryCacheBackend, ResponseCache
+
+DIVISION = 77
+
+
+def player(player_id, rating, position):
+    return {"playerid": player_id, "player": f"Player {player_id}", "CurrentRating": rating, "TeamPosition": f"#{position}"}
+
+
+UPSTREAM = {
+    f"/resources/divisions/standings/{DIVISION}": [
+        {"TeamId": 1, "Teamname": "Alpha", "hGroup": 2, "TotalTeamwins": 3, "TotalTeamloses": 1},
+        {"TeamId": 2, "Teamname": "Beta", "hGroup": 1, "TotalTeamwins": 4, "TotalTeamloses": 0},
+        {"TeamId": 3, "Teamname": "Gamma", "hGroup": 3},
+        {"TeamId": 4, "Teamname": ""},
+    ],
+    "/resources/teams/1/players": [
+        player(11, 3.0, 3), player(12, None, 0), player(13, 5.0, 1), player(14, 4.0, 2), player(15, 6.0, 0),
+    ],
+    "/resources/teams/2/players": [player(21, 4.0, 1), player(22, 3.0, 2), player(23, 2.0, 3)],
+    "/resources/teams/3/players": [player(31, None, 1)],
+    "/resources/teams/1/schedule": [
+        {"scorecardid": 501, "Home_Matches_Won": 5, "Visitor_Matches_Won": 4},
+        {"scorecardid": 502, "Score_Entered": "scheduled"},
+    ],
+    "/resources/teams/2/schedule": [{"scorecardid": 501, "Home_Matches_Won": 5, "Visitor_Matches_Won": 4}],
+    "/resources/teams/3/schedule": [],
+    "/resources/leagues/scorecards/live?id=501": [{"positionNumber": 2, "winner": "B"}, {"positionNumber": 1, "winner": "A"}],
+}
+
+# Every court in Alpha's lineup is one rating point above Beta's.
+COURT = 1 / (1 + 10 ** -1)
+ALPHA_BEATS_BETA = 3 * COURT ** 2 * (1 - COURT) + COURT ** 3
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def fetch_json(path, cache_policy, **kwargs):
+        calls.append(path)
+        if path not in UPSTREAM:
+            raise requests.exceptions.ConnectionError(f"no route to {path}")
+        return UPSTREAM[path]
+
+    monkeypatch.setattr(app, "fetch_json", fetch_json)
+    monkeypatch.setattr(app, "response_cache", ResponseCache(MemoryCacheBackend(1024 * 1024, 100)))
+    monkeypatch.setattr(app, "TEAM_LINEUP_SIZE", 3)
+    return calls
+
+
+def test_division_payload(upstream):
+    response = app.app.test_client().get(f"/api/teams/divisions/{DIVISION}")
+    assert response.status_code == 200
+    body = response.get_json()
+
+    assert [(team["name"], team["rank"]) for team in body["teams"]] == [("Beta", 1), ("Alpha", 2), ("Gamma", 3)]
+    alpha = body["teams"][1]
+    assert (alpha["winPct"], alpha["lineup"], alpha["averageRating"]) == (75.0, [13, 14, 11], 4.0)
+    assert body["teams"][2]["lineup"] == []
+    assert body["matchups"] == {
+        "2": {"1": round(1 - ALPHA_BEATS_BETA, 4)},
+        "1": {"2": round(ALPHA_BEATS_BETA, 4)},
+    }
+    # The scorecard both teams played is fetched once, the scheduled one never.
+    assert upstream.count("/resources/leagues/scorecards/live?id=501") == 1
+    assert "/resources/leagues/scorecards/live?id=502" not in upstream
+
+
+def test_division_build_caches_each_team(upstream):
+    client = app.app.test_client()
+    client.get(f"/api/teams/divisions/{DIVISION}")
+    upstream.clear()
+
+    response = client.get("/api/teams/1")
+    assert response.headers["X-Cache"] == "HIT"
+    assert upstream == []
+    assert client.get(f"/api/teams/divisions/{DIVISION}").headers["X-Cache"] == "HIT"
+    assert upstream == []
+
+
+def test_team_payload(upstream):
+    response = app.app.test_client().get("/api/teams/1")
+    assert response.headers["X-Cache"] == "MISS"
+    body = response.get_json()
+    assert [p["id"] for p in body["roster"]] == [11, 12, 13, 14, 15]
+    # Unassigned players (position 0) come after the numbered positions.
+    assert body["lineup"] == [13, 14, 11]
+    assert body["averageRating"] == 4.0
+    assert body["scorecards"] == {"501": [{"positionNumber": 1, "winner": "A"}, {"positionNumber": 2, "winner": "B"}]}
+
+
+def test_matchup(upstream):
+    body = app.app.test_client().get("/api/teams/matchup/1/2").get_json()
+    assert body["probabilityA"] == round(ALPHA_BEATS_BETA, 4)
+    assert body["projectedScore"] == [3, 0]
+    assert (body["averageRatingA"], body["averageRatingB"]) == (4.0, 3.0)
+    assert [(court["playerA"]["id"], court["playerB"]["id"]) for court in body["courts"]] == [(13, 21), (14, 22), (11, 23)]
+    assert {court["probabilityA"] for court in body["courts"]} == {round(COURT, 4)}
+
+
+def test_matchup_needs_rated_players(upstream):
+    response = app.app.test_client().get("/api/teams/matchup/1/3")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "One or both teams do not have rated players."}
+
+
+def test_upstream_failures_are_502(upstream):
+    client = app.app.test_client()
+    assert client.get("/api/teams/divisions/78").status_code == 502
+    assert client.get("/api/teams/9").status_code == 502
+    assert client.get("/api/teams/matchup/1/9").status_code == 502
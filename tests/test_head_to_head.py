@@ -0,0 +1,106 @@
+import pytest
+import requests
+
+import app
+
+A, B, C, D = 93001, 93002, 93003, 93004
+
+
+def match(match_id, day, home, visitor, winner, score="11-5,11-7,11-9", status="C", home_rating=None, visitor_rating=None):
+    return {
+        "Matchid": match_id,
+        "MatchDate": f"2025-03-{day:02d}T10:00:00",
+        "Status": status,
+        "Winner": winner,
+        "Score": score,
+        "wid1": home,
+        "oid1": visitor,
+        "hplayer1": f"Player {home}",
+        "vplayer1": f"Player {visitor}",
+        "w1Rating": home_rating,
+        "o1Rating": visitor_rating,
+        "Descr": "League",
+    }
+
+
+# Player A's history, newest first.
+HISTORY = [
+    match(930105, 5, A, B, "H", home_rating=4.0, visitor_rating=4.2),
+    match(930104, 4, B, A, "H", "11-9,9-11,11-8,11-6", home_rating=4.3, visitor_rating=4.0),
+    match(930103, 3, A, B, "", "", status="S"),
+    # Neither C's rating nor any other match of theirs is on record.
+    match(930102, 2, A, C, "H", home_rating=4.0),
+    # D's rating is missing here but known from their earlier match.
+    match(930101, 1, A, D, "V", "11-4,11-6,11-8", home_rating=4.0),
+    dict(match(930100, 1, D, A, "V", home_rating=4.5, visitor_rating=3.9), MatchDate="2025-02-20T10:00:00"),
+]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def fetch_json(path, cache_policy, **kwargs):
+        calls.append(path)
+        if path == f"/resources/res/user/{C}/ratings-top":
+            return [{"rating": 3.7}]
+        raise requests.exceptions.HTTPError(f"404 for {path}")
+
+    def fetch_matches_page(user_id, page):
+        calls.append((user_id, page))
+        return list(HISTORY) if user_id == A and page == 1 else []
+
+    monkeypatch.setattr(app, "fetch_json", fetch_json)
+    monkeypatch.setattr(app, "fetch_matches_page", fetch_matches_page)
+    monkeypatch.setattr(app, "MATCH_PAGE_SIZE", 10)
+    return calls
+
+
+def test_head_to_head_from_each_side(upstream):
+    client = app.app.test_client()
+    response = client.get(f"/api/h2h/{A}/{B}")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [m["match"]["Matchid"] for m in body["matches"]] == [930105, 930104]
+    assert [m["didWin"] for m in body["matches"]] == [True, False]
+    assert body["matches"][1]["score"] == "9-11, 11-9, 8-11, 6-11"
+    assert body["matches"][1]["side"] == "visiting"
+    assert (body["playerAWins"], body["playerBWins"], body["completedScanned"]) == (1, 1, 5)
+
+    # B was never synced, so the lookup reuses A's stored history.
+    upstream.clear()
+    reverse = client.get(f"/api/h2h/{B}/{A}")
+    assert reverse.headers["X-Cache"] == "STORE"
+    body = reverse.get_json()
+    assert [m["didWin"] for m in body["matches"]] == [False, True]
+    assert body["matches"][1]["score"] == "11-9, 9-11, 11-8, 11-6"
+    assert (body["playerAWins"], body["playerBWins"]) == (1, 1)
+    assert upstream == []
+
+
+def test_head_to_head_needs_two_players(upstream):
+    response = app.app.test_client().get(f"/api/h2h/{A}/{A}")
+    assert response.status_code == 400
+    assert upstream == []
+
+
+def test_opponent_ratings_fill_gaps_from_history_then_upstream(upstream):
+    body = app.app.test_client().get(f"/api/user/{A}/opponent-ratings").get_json()
+    assert [(m["matchId"], m["opponentId"], m["opponentRating"], m["ratingSource"]) for m in body["matches"]] == [
+        (930105, B, 4.2, "match"),
+        (930104, B, 4.3, "match"),
+        (930102, C, 3.7, "current"),
+        (930101, D, 4.5, "history"),
+        (930100, D, 4.5, "match"),
+    ]
+    assert body["count"] == 5
+    assert body["averageOpponentRating"] == round((4.2 + 4.3 + 3.7 + 4.5 + 4.5) / 5, 4)
+    # Only the opponent the store knows nothing about is looked up upstream.
+    assert [path for path in upstream if "ratings-top" in str(path)] == [f"/resources/res/user/{C}/ratings-top"]
+
+
+def test_opponent_ratings_window(upstream):
+    body = app.app.test_client().get(f"/api/user/{A}/opponent-ratings?last=2").get_json()
+    assert body["last"] == 2
+    assert [m["matchId"] for m in body["matches"]] == [930105, 930104]
+    assert body["averageOpponentRating"] == 4.25
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+import app
+from indexes import PlayerSearchIndex
+
+GROUP = 208
+
+
+def ranking_row(ranking):
+    return {
+        "playerId": 5000 + ranking,
+        "firstName": "Player",
+        "lastName": f"Number{ranking}",
+        "ranking": ranking,
+        "rating": round(6 - ranking / 100, 2),
+    }
+
+
+# Two full upstream pages and a short third one.
+ROWS = [ranking_row(ranking) for ranking in range(1, 121)]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    requests_seen = []
+    release = threading.Event()
+    release.set()
+
+    def fetch_ranking_page(group_id, params, page):
+        release.wait(2)
+        requests_seen.append((group_id, dict(params), page))
+        start = (page - 1) * app.LEADERBOARD_PAGE_SIZE
+        return ROWS[start:start + app.LEADERBOARD_PAGE_SIZE]
+
+    monkeypatch.setattr(app, "fetch_ranking_page", fetch_ranking_page)
+    monkeypatch.setattr(app, "leaderboards", OrderedDict())
+    monkeypatch.setattr(app, "player_search", PlayerSearchIndex())
+    return requests_seen, release
+
+
+def wait_for_board(key, timeout=2):
+    deadline = time.monotonic() + timeout
+    while key not in app.leaderboards:
+        assert time.monotonic() < deadline, "leaderboard was never built"
+        time.sleep(0.01)
+    return app.leaderboards[key]
+
+
+@pytest.fixture
+def client(upstream):
+    client = app.app.test_client()
+    client.get(f"/api/rankings/{GROUP}")
+    wait_for_board((GROUP, "0", None))
+    return client
+
+
+def test_503_until_the_first_build_finishes(upstream):
+    _, release = upstream
+    release.clear()
+    client = app.app.test_client()
+
+    response = client.get(f"/api/rankings/{GROUP}")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    assert client.get(f"/api/rankings/{GROUP}/around/10").status_code == 503
+
+    release.set()
+    wait_for_board((GROUP, "0", None))
+    assert client.get(f"/api/rankings/{GROUP}").status_code == 200
+
+
+def test_build_walks_pages_until_a_short_one(upstream):
+    requests_seen, _ = upstream
+    app.app.test_client().get(f"/api/rankings/{GROUP}?divisions=3&stateId=PA")
+    board = wait_for_board((GROUP, "3", "PA"))
+
+    assert board.rows == ROWS
+    fetched = sorted(page for _, _, page in requests_seen)
+    assert fetched[:3] == [1, 2, 3]
+    assert all(params == {"divisions": "3", "stateId": "PA"} for _, params, _ in requests_seen)
+    # Rows are folded into the player search index as they are indexed.
+    assert [hit["ObjectId"] for hit in app.player_search.search("number120", 5)] == [5120]
+
+
+def test_offset_and_limit(client):
+    body = client.get(f"/api/rankings/{GROUP}?offset=100&limit=5").get_json()
+    assert body["total"] == 120
+    assert body["offset"] == 100
+    assert [row["ranking"] for row in body["rows"]] == [101, 102, 103, 104, 105]
+
+    body = client.get(f"/api/rankings/{GROUP}?offset=-3&limit=100000").get_json()
+    assert body["offset"] == 0
+    assert len(body["rows"]) == 120
+
+
+def test_default_page_and_age_header(client):
+    response = client.get(f"/api/rankings/{GROUP}")
+    assert len(response.get_json()["rows"]) == app.LEADERBOARD_PAGE_SIZE
+    assert response.headers["X-Leaderboard-Age"] == "0"
+
+
+def test_around_a_rank(client):
+    body = client.get(f"/api/rankings/{GROUP}/around/60?radius=2").get_json()
+    assert [row["ranking"] for row in body["rows"]] == [58, 59, 60, 61, 62]
+
+    top = client.get(f"/api/rankings/{GROUP}/around/1?radius=2").get_json()
+    assert [row["ranking"] for row in top["rows"]] == [1, 2, 3]
+
+    past_the_end = client.get(f"/api/rankings/{GROUP}/around/500?radius=1").get_json()
+    assert [row["ranking"] for row in past_the_end["rows"]] == [120]
+
+
+def test_player_lookup(client):
+    assert client.get(f"/api/rankings/{GROUP}/player/5007").get_json() == ranking_row(7)
+    assert client.get(f"/api/rankings/{GROUP}/player/1").status_code == 404
+
+
+def test_name_prefix_search(client):
+    body = client.get(f"/api/rankings/{GROUP}?q=number11&limit=3").get_json()
+    assert [row["ranking"] for row in body["rows"]] == [11, 110, 111]
+
+
+def test_proxy_pages_come_from_the_snapshot(client):
+    response = client.get(f"/proxy/rankings/{GROUP}/current?divisions=0&pageNumber=3")
+    assert response.headers["X-Cache"] == "INDEX"
+    assert response.get_json() == ROWS[100:]
+
+
+def test_stale_snapshot_is_served_while_it_rebuilds(client, upstream):
+    requests_seen, _ = upstream
+    board = app.leaderboards[(GROUP, "0", None)]
+    board.built_at -= app.LEADERBOARD_REFRESH + 1
+    requests_seen.clear()
+
+    assert client.get(f"/api/rankings/{GROUP}/player/5001").status_code == 200
+    rebuilt = None
+    deadline = time.monotonic() + 2
+    while rebuilt is None or rebuilt is board:
+        assert time.monotonic() < deadline, "leaderboard was never rebuilt"
+        time.sleep(0.01)
+        rebuilt = app.leaderboards[(GROUP, "0", None)]
+    assert requests_seen
@@ -0,0 +1,116 @@
+import json
+import queue
+import threading
+import time
+
+import pytest
+
+import live
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def read_event(subscriber):
+    event, event_id, data = subscriber.get(timeout=2).strip().split("\n")
+    return event.split(": ", 1)[1], int(event_id.split(": ", 1)[1]), json.loads(data.split(": ", 1)[1])
+
+
+def test_first_payload_is_a_replace():
+    assert live.live_diff(None, [1]) == {"type": "replace", "data": [1]}
+
+
+def test_unchanged_payload_has_no_diff():
+    assert live.live_diff([1, 2], [1, 2]) is None
+    assert live.live_diff({"a": 1}, {"a": 1}) is None
+
+
+def test_grown_list_is_an_append():
+    assert live.live_diff([1, 2], [1, 2, 3, 4]) == {"type": "append", "items": [3, 4]}
+
+
+def test_rewritten_list_is_a_replace():
+    assert live.live_diff([1, 2], [1, 5, 3]) == {"type": "replace", "data": [1, 5, 3]}
+    assert live.live_diff([1, 2], {"a": 1}) == {"type": "replace", "data": {"a": 1}}
+
+
+def test_changed_dict_is_a_patch():
+    diff = live.live_diff({"a": 1, "b": 2, "c": 3}, {"a": 1, "b": 5, "d": None})
+    assert diff == {"type": "patch", "set": {"b": 5, "d": None}, "remove": ["c"]}
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(live, "LIVE_POLL_INTERVAL", 0.01)
+
+
+def test_feed_publishes_diffs_and_stops_without_subscribers():
+    payloads = iter([[1], [1], [1, 2]])
+    last = [[1, 2]]
+
+    def poll():
+        return next(payloads, last[0])
+
+    feed = live.get_live_feed("test-lifecycle", poll)
+    subscriber, snapshot, version = feed.subscribe()
+    assert (snapshot, version) == (None, 0)
+    assert read_event(subscriber) == ("diff", 1, {"type": "replace", "data": [1]})
+    assert read_event(subscriber) == ("diff", 2, {"type": "append", "items": [2]})
+    assert live.get_live_feed("test-lifecycle", poll) is feed
+
+    feed.unsubscribe(subscriber)
+    wait_for(lambda: not feed.running)
+    assert "test-lifecycle" not in live.live_feeds
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_feed_that_dies_frees_its_key():
+    release = threading.Event()
+
+    def poll():
+        release.wait(2)
+        raise RuntimeError("bug")
+
+    feed = live.get_live_feed("test-dies", poll)
+    subscriber, _, _ = feed.subscribe()
+    release.set()
+    wait_for(lambda: not feed.running)
+    assert "test-dies" not in live.live_feeds
+    # The next subscriber gets a fresh feed.
+    replacement = live.get_live_feed("test-dies", lambda: [1])
+    assert replacement is not feed
+    feed.unsubscribe(subscriber)
+
+
+def test_upstream_error_is_published():
+    def poll():
+        raise ValueError("not json")
+
+    feed = live.get_live_feed("test-error", poll)
+    subscriber, _, _ = feed.subscribe()
+    assert read_event(subscriber) == ("upstream-error", 0, {"error": "not json"})
+    feed.unsubscribe(subscriber)
+    wait_for(lambda: not feed.running)
+
+
+def test_slow_subscriber_is_resynced_with_a_snapshot():
+    feed = live.LiveFeed("test-slow", lambda: None)
+    feed.payload, feed.version = [1, 2, 3], 7
+    subscriber = queue.Queue(maxsize=2)
+    subscriber.put("old")
+    subscriber.put("old")
+    feed.subscribers.add(subscriber)
+
+    feed.publish("diff", {"type": "append", "items": [3]})
+
+    assert subscriber.qsize() == 1
+    assert read_event(subscriber) == ("diff", 7, {"type": "replace", "data": [1, 2, 3]})
+
+
+def test_feed_count_is_capped(monkeypatch):
+    monkeypatch.setattr(live, "LIVE_MAX_FEEDS", 0)
+    assert live.get_live_feed("test-capped", lambda: None) is None
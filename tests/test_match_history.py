@@ -0,0 +1,64 @@
+import pytest
+
+import app
+
+
+def match(match_id, status="Completed", score="11-5,11-7,11-9"):
+    return {"Matchid": match_id, "MatchDate": f"2025-03-{match_id:02d}T00:00:00", "Status": status, "Score": score}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # Match pages by number, and the pages actually fetched.
+    pages = {}
+    fetched = []
+
+    def fetch_matches_page(user_id, page):
+        fetched.append(page)
+        return list(pages.get(page, []))
+
+    monkeypatch.setattr(app, "fetch_matches_page", fetch_matches_page)
+    monkeypatch.setattr(app, "MATCH_PAGE_SIZE", 3)
+    return pages, fetched
+
+
+def test_refresh_picks_up_result_of_scheduled_match(upstream, monkeypatch):
+    pages, fetched = upstream
+    user_id = 90001
+    app.save_match_history(user_id, [match(3, "Scheduled", ""), match(2), match(1), match(0)])
+    pages[1] = [match(4), match(3), match(2)]
+    pages[2] = [match(1), match(0)]
+    monkeypatch.setitem(app.CACHE_TTLS, "matches", 0)
+
+    history, status = app.load_match_history(user_id)
+
+    assert status == "REFRESHED"
+    assert [m["Matchid"] for m in history] == [4, 3, 2, 1, 0]
+    assert history[1] == match(3)
+    # Page 1 already had known matches, so page 2 was never fetched.
+    assert fetched == [1]
+
+
+def test_refresh_keeps_history_when_page_one_unchanged(upstream, monkeypatch):
+    pages, fetched = upstream
+    user_id = 90002
+    history = [match(3, "In Progress", "11-5"), match(2), match(1)]
+    app.save_match_history(user_id, history)
+    pages[1] = list(history)
+    monkeypatch.setitem(app.CACHE_TTLS, "matches", 0)
+
+    assert app.load_match_history(user_id) == (history, "REFRESHED")
+    assert fetched == [1]
+
+
+def test_refresh_walks_pages_while_all_unseen(upstream):
+    pages, fetched = upstream
+    pages[1] = [match(9), match(8), match(7)]
+    pages[2] = [match(6), match(5), match(3)]
+    pages[3] = [match(2)]
+
+    history = app.refresh_match_history(90003, [match(5, "Scheduled", ""), match(3)])
+
+    assert [m["Matchid"] for m in history] == [9, 8, 7, 6, 5, 3]
+    assert history[4] == match(5)
+    assert fetched == [1, 2]
@@ -0,0 +1,87 @@
+import pytest
+from flask import jsonify
+
+import app
+from indexes import PlayerSearchIndex
+
+
+@pytest.fixture
+def index():
+    index = PlayerSearchIndex()
+    index.add(1, name="Casey Khan", location="Philadelphia, PA", rating=4.1)
+    index.add(2, name="Casimir Lee", location="Boston, MA", rating=5.2)
+    index.add(3, name="Jonathan Park", rating=3.0)
+    index.add(4, name="José Núñez", location="Miami, FL", rating=4.8)
+    index.add(5, name="Lee Casey", rating=3.5)
+    return index
+
+
+def names(results):
+    return [result["ObjectName"] for result in results]
+
+
+def test_prefix_matches_any_token(index):
+    assert names(index.search("cas", 10)) == ["Casimir Lee", "Casey Khan", "Lee Casey"]
+    assert names(index.search("cas kh", 10)) == ["Casey Khan"]
+    assert names(index.search("philadelphia", 10)) == ["Casey Khan"]
+
+
+def test_exact_name_ranks_before_rating(index):
+    assert names(index.search("casey khan", 10)) == ["Casey Khan"]
+    index.add(6, name="Lee", rating=1.0)
+    assert names(index.search("lee", 10)) == ["Lee", "Casimir Lee", "Lee Casey"]
+
+
+def test_results_are_limited_to_the_best(index):
+    assert names(index.search("cas", 2)) == ["Casimir Lee", "Casey Khan"]
+
+
+def test_trigrams_catch_typos(index):
+    assert names(index.search("jonathon", 10)) == ["Jonathan Park"]
+    assert index.search("qqqq", 10) == []
+
+
+def test_diacritics_are_folded(index):
+    assert names(index.search("jose nunez", 10)) == ["José Núñez"]
+    assert names(index.search("Núñ", 10)) == ["José Núñez"]
+
+
+def test_player_id_lookup(index):
+    assert index.search("4", 10) == [
+        {
+            "ObjectId": 4,
+            "ObjectName": "José Núñez",
+            "ObjectType": "Player",
+            "ObjectLocation": "Miami, FL",
+            "LogoImageUrl": "",
+        }
+    ]
+
+
+def test_renamed_player_ranks_by_new_name(index):
+    index.add(5, name="Casey Khan")
+    assert [result["ObjectId"] for result in index.search("casey khan", 10)] == [1, 5]
+
+
+def test_results_are_copies(index):
+    index.search("casey khan", 1)[0]["ObjectName"] = "changed"
+    assert names(index.search("casey khan", 1)) == ["Casey Khan"]
+
+
+@pytest.fixture
+def seeded_index(monkeypatch, index):
+    index.seeded = True
+    monkeypatch.setattr(app, "player_search", index)
+    monkeypatch.setattr(app, "proxy_upstream", lambda path, *args, **kwargs: jsonify({"upstream": path}))
+    return index
+
+
+def test_route_answers_from_index_on_any_hit(seeded_index):
+    response = app.app.test_client().get("/proxy/resources/res/search/jonathan")
+    assert response.headers["X-Cache"] == "INDEX"
+    assert names(response.get_json()) == ["Jonathan Park"]
+
+
+def test_route_goes_upstream_on_zero_hits(seeded_index):
+    response = app.app.test_client().get("/proxy/resources/res/search/zzz")
+    assert response.get_json() == {"upstream": "/resources/res/search/zzz"}
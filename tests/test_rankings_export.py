@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from collections import OrderedDict
+
+import pytest
+import requests
+
+import app
+from indexes import LeaderboardIndex
+
+GROUP = 208
+
+
+def ranking_row(ranking):
+    return {"ranking": ranking, "playerId": 6000 + ranking, "firstName": "Player", "lastName": f"No{ranking}", "rating": 4.5}
+
+
+ROWS = [ranking_row(ranking) for ranking in range(1, 121)]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+    failing_pages = set()
+
+    def fetch_ranking_page(group_id, params, page):
+        calls.append((group_id, dict(params), page))
+        if page in failing_pages:
+            raise requests.exceptions.ConnectionError(f"page {page} failed")
+        start = (page - 1) * app.LEADERBOARD_PAGE_SIZE
+        return ROWS[start:start + app.LEADERBOARD_PAGE_SIZE]
+
+    monkeypatch.setattr(app, "fetch_ranking_page", fetch_ranking_page)
+    monkeypatch.setattr(app, "leaderboards", OrderedDict())
+    return calls, failing_pages
+
+
+def export(query):
+    return app.app.test_client().get(f"/api/rankings/{GROUP}/export?{query}")
+
+
+def test_csv_passes_every_filter_upstream(upstream):
+    calls, _ = upstream
+    response = export("divisions=7&stateId=1&gender=M&format=csv&pageNumber=4&fields=rating")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.headers["Content-Disposition"] == (
+        'attachment; filename="rankings-208-divisions7-genderM-stateId1.csv"'
+    )
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row["ranking"]) for row in rows] == list(range(1, 121))
+    assert rows[0] == {key: str(value) for key, value in ROWS[0].items()}
+    assert {(group_id, tuple(sorted(params.items()))) for group_id, params, _ in calls} == {
+        (GROUP, (("divisions", "7"), ("gender", "M"), ("stateId", "1"))),
+    }
+    assert sorted(page for _, _, page in calls)[:3] == [1, 2, 3]
+
+
+def test_ndjson_is_the_default(upstream):
+    calls, _ = upstream
+    response = export("")
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+    assert all(params == {"divisions": "0"} for _, params, _ in calls)
+
+
+def test_unknown_format_is_rejected(upstream):
+    calls, _ = upstream
+    response = export("format=xlsx")
+    assert response.status_code == 400
+    assert calls == []
+
+
+def test_fresh_snapshot_is_used_for_division_and_state_filters(upstream):
+    calls, _ = upstream
+    app.leaderboards[app.leaderboard_key(GROUP, "7", "1")] = LeaderboardIndex(ROWS[:3])
+
+    response = export("divisions=7&stateId=1&format=csv")
+    assert response.headers["X-Cache"] == "INDEX"
+    assert len(list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))) == 3
+    assert calls == []
+
+    # Any other filter needs upstream's own filtering.
+    assert export("divisions=7&stateId=1&gender=M").headers["X-Cache"] == "MISS"
+    assert calls
+
+
+def test_first_page_failure_is_an_error_response(upstream):
+    _, failing_pages = upstream
+    failing_pages.add(1)
+    response = export("format=csv")
+    assert response.status_code == 502
+    assert response.get_json() == {"error": "Error fetching rankings data."}
+
+
+def test_later_page_failure_truncates_the_stream(upstream):
+    _, failing_pages = upstream
+    failing_pages.add(2)
+    response = export("")
+    assert response.status_code == 200
+    assert [json.loads(line)["ranking"] for line in response.get_data(as_text=True).splitlines()] == list(range(1, 51))
@@ -0,0 +1,172 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from cache import CachedResponse, MemoryCacheBackend, ResponseCache
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(MemoryCacheBackend(1024 * 1024, 100))
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_fetch(cache):
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return b"{}", "application/json"
+
+    results = []
+
+    def request():
+        entry, status = cache.get_or_fetch("k", 60, fetch)
+        results.append((entry.body, status))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.coalesced == 3)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["COALESCED", "COALESCED", "COALESCED", "MISS"]
+    assert {body for body, _ in results} == {b"{}"}
+    assert cache.get_or_fetch("k", 60, fetch)[1] == "HIT"
+
+
+def test_failed_fetch_reaches_every_waiter(cache):
+    release = threading.Event()
+
+    def fetch():
+        release.wait(2)
+        raise requests.exceptions.ConnectionError("down")
+
+    errors = []
+
+    def request():
+        try:
+            cache.get_or_fetch("k", 60, fetch)
+        except requests.exceptions.ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.coalesced == 2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(errors) == 3
+    assert cache.backend.get("k") is None
+
+
+def test_zero_ttl_coalesces_without_storing(cache):
+    entry, status = cache.get_or_fetch("k", 0, lambda: (b"live", "application/json"))
+    assert (entry.body, status) == (b"live", "MISS")
+    assert cache.backend.get("k") is None
+
+
+def test_fetch_can_shorten_ttl(cache):
+    entry, _ = cache.get_or_fetch("k", 600, lambda: (b"partial", "application/json", 5))
+    assert 4 < entry.expires_at - entry.stored_at <= 5
+
+
+def test_expired_entry_is_refetched(cache):
+    now = time.time()
+    cache.backend.set("k", CachedResponse(b"old", "application/json", now - 20, now - 10))
+    assert cache.get("k") is None
+    entry, status = cache.get_or_fetch("k", 60, lambda: (b"new", "application/json"))
+    assert (entry.body, status) == (b"new", "MISS")
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(1024, 2)
+    now = time.time()
+    for key in ("a", "b"):
+        backend.set(key, CachedResponse(b"x", "text/plain", now, now + 60))
+    backend.get("a")
+    backend.set("c", CachedResponse(b"x", "text/plain", now, now + 60))
+    assert backend.get("b") is None
+    assert backend.get("a") is not None and backend.get("c") is not None
+
+
+def test_memory_backend_bounded_by_bytes():
+    backend = MemoryCacheBackend(10, 100)
+    now = time.time()
+    backend.set("a", CachedResponse(b"123456", "text/plain", now, now + 60))
+    backend.set("b", CachedResponse(b"123456", "text/plain", now, now + 60))
+    assert backend.get("a") is None
+    assert backend.stats() == {"entries": 1, "bytes": 6}
+
+
+def store_entry(cache, key, body, age, ttl):
+    # An entry stored `age` seconds ago that lived for `ttl` seconds.
+    stored_at = time.time() - age
+    cache.backend.set(key, CachedResponse(body, "application/json", stored_at, stored_at + ttl))
+
+
+
+
+def test_expired_entry_served_stale_while_refreshing(cache):
+    store_entry(cache, "k", b"old", age=20, ttl=10)
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return b"new", "application/json"
+
+    entry, status = cache.get_or_fetch("k", 60, fetch, stale_ttl=30)
+    assert (entry.body, status) == (b"old", "STALE")
+    assert refreshed.wait(2)
+    wait_for(lambda: cache.get("k") is not None)
+    assert cache.get_or_fetch("k", 60, fetch, stale_ttl=30) == (cache.get("k"), "HIT")
+    assert cache.get("k").body == b"new"
+
+
+def test_failed_refresh_keeps_stale_entry(cache):
+    store_entry(cache, "k", b"old", age=20, ttl=10)
+
+    def fetch():
+        raise requests.exceptions.ConnectionError("down")
+
+    entry, status = cache.get_or_fetch("k", 60, fetch, stale_ttl=30)
+    assert (entry.body, status) == (b"old", "STALE")
+    wait_for(lambda: not cache._inflight)
+    assert cache.get_or_fetch("k", 60, fetch, stale_ttl=30)[0].body == b"old"
+
+
+def test_stale_entry_not_served_without_opt_in(cache):
+    store_entry(cache, "k", b"old", age=20, ttl=10)
+    entry, status = cache.get_or_fetch("k", 60, lambda: (b"new", "application/json"))
+    assert (entry.body, status) == (b"new", "MISS")
+
+
+def test_entry_past_stale_window_is_refetched(cache):
+    store_entry(cache, "k", b"old", age=100, ttl=10)
+    entry, status = cache.get_or_fetch("k", 60, lambda: (b"new", "application/json"), stale_ttl=30)
+    assert (entry.body, status) == (b"new", "MISS")
+
+
+def test_backend_drops_entries_after_stale_ttl(cache, monkeypatch):
+    monkeypatch.setattr("cache.CACHE_STALE_TTL", 5)
+    store_entry(cache, "kept", b"x", age=12, ttl=10)
+    store_entry(cache, "dropped", b"x", age=20, ttl=10)
+    assert cache.get("kept") is None
+    assert cache.backend.get("kept") is not None
+    assert cache.backend.get("dropped") is None
+    assert cache.backend.stats()["entries"] == 1
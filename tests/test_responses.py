@@ -0,0 +1,97 @@
+import gzip
+import json
+import time
+
+import pytest
+
+import app
+from cache import CachedResponse
+
+LEAGUE = {
+    "leagueName": "Winter League",
+    "season": {"name": "2025", "weeks": 12},
+    "teams": [{"teamName": f"Team {i}", "captain": f"Captain {i}", "wins": i} for i in range(60)],
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    body = json.dumps(LEAGUE).encode()
+
+    def fetch_cached(path, cache_policy, **kwargs):
+        now = time.time()
+        return CachedResponse(body, "application/json", now, now + 60), "HIT"
+
+    monkeypatch.setattr(app, "fetch_cached", fetch_cached)
+    monkeypatch.setattr(app, "_compressed_bodies", app.OrderedDict())
+    monkeypatch.setattr(app, "_compressed_bytes", 0)
+    return app.app.test_client()
+
+
+def test_fields_projects_nested_values(client):
+    response = client.get("/proxy/leagues/info/1?fields=leagueName,teamName")
+    assert response.get_json() == {
+        "leagueName": "Winter League",
+        "season": {},
+        "teams": [{"teamName": f"Team {i}"} for i in range(60)],
+    }
+
+
+def test_unprojected_body_is_sent_as_is(client):
+    response = client.get("/proxy/leagues/info/1")
+    assert response.get_data() == json.dumps(LEAGUE).encode()
+    assert response.headers["X-Cache"] == "HIT"
+
+
+def test_matching_etag_gets_304(client):
+    first = client.get("/proxy/leagues/info/1")
+    etag = first.headers["ETag"]
+    assert etag.startswith("W/")
+
+    second = client.get("/proxy/leagues/info/1", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.get_data() == b""
+
+    projected = client.get("/proxy/leagues/info/1?fields=leagueName", headers={"If-None-Match": etag})
+    assert projected.status_code == 200
+
+
+def test_gzip_when_brotli_is_not_accepted(client):
+    response = client.get("/proxy/leagues/info/1", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.get_data())) == LEAGUE
+
+
+def test_brotli_is_preferred(client):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/proxy/leagues/info/1", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.get_data())) == LEAGUE
+
+
+def test_identity_and_small_bodies_are_not_compressed(client):
+    response = client.get("/proxy/leagues/info/1")
+    assert "Content-Encoding" not in response.headers
+
+    small = client.get("/proxy/leagues/info/1?fields=leagueName", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_compressed_memo_is_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(app, "_compressed_bodies", app.OrderedDict())
+    monkeypatch.setattr(app, "_compressed_bytes", 0)
+    bodies = [bytes(range(256)) * 8 + bytes([i]) for i in range(4)]
+    size = len(app.compress_body(bodies[0], "gzip", "a"))
+    monkeypatch.setattr(app, "COMPRESS_MEMO_BYTES", size * 2 + 10)
+
+    for i, body in enumerate(bodies[1:], 1):
+        app.compress_body(body, "gzip", str(i))
+    assert len(app._compressed_bodies) == 2
+    assert app._compressed_bytes == sum(len(value) for value in app._compressed_bodies.values())
+
+    monkeypatch.setattr(app, "COMPRESS_MEMO_MAX_BODY", size - 1)
+    big = bytes(range(256)) * 16
+    assert len(app.compress_body(big, "gzip", "big")) > size - 1
+    assert ("big", "gzip") not in app._compressed_bodies
+    assert len(app._compressed_bodies) == 2
@@ -0,0 +1,233 @@
+import threading
+import time
+
+import pytest
+
+import cache
+
+
+class FakeRedis:
+    # Just enough of the redis-py client for RedisCacheBackend, over a dict.
+    # eval only knows the lease release and renew scripts and runs each in
+    # one step, as the server would.
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.calls = []
+
+    def _live(self, name):
+        expires = self.expiry.get(name)
+        if expires is not None and expires <= time.time():
+            self.data.pop(name, None)
+            self.expiry.pop(name, None)
+        return name in self.data
+
+    @staticmethod
+    def _bytes(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def hmget(self, name, *fields):
+        self.calls.append("hmget")
+        row = self.data.get(name) if self._live(name) else {}
+        return [row.get(self._bytes(field)) for field in fields]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def get(self, name):
+        self.calls.append("get")
+        return self.data.get(name) if self._live(name) else None
+
+    def set(self, name, value, nx=False, px=None):
+        self.calls.append("set")
+        if nx and self._live(name):
+            return None
+        self.data[name] = self._bytes(value)
+        if px is not None:
+            self.expiry[name] = time.time() + px / 1000
+        return True
+
+    def delete(self, name):
+        self.calls.append("delete")
+        existed = self._live(name)
+        self.data.pop(name, None)
+        self.expiry.pop(name, None)
+        return int(existed)
+
+    def eval(self, script, numkeys, *args):
+        self.calls.append("eval")
+        assert script in (cache.REDIS_RELEASE_LEASE, cache.REDIS_RENEW_LEASE) and numkeys == 1
+        name, owner = args[:2]
+        if not (self._live(name) and self.data[name] == self._bytes(owner)):
+            return 0
+        if script == cache.REDIS_RENEW_LEASE:
+            self.expiry[name] = time.time() + args[2] / 1000
+        else:
+            del self.data[name]
+        return 1
+
+    def dbsize(self):
+        return sum(1 for name in list(self.data) if self._live(name))
+
+    def info(self, section):
+        return {"used_memory": 1024}
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def hset(self, name, mapping):
+        self.commands.append(lambda: self.client.data.setdefault(name, {}).update(
+            {field.encode(): self.client._bytes(value) for field, value in mapping.items()}
+        ))
+
+    def pexpireat(self, name, when):
+        self.commands.append(lambda: self.client.expiry.__setitem__(name, when / 1000))
+
+    def execute(self):
+        for command in self.commands:
+            command()
+
+
+@pytest.fixture
+def redis_backend():
+    client = FakeRedis()
+    return cache.RedisCacheBackend(client), client
+
+
+def test_redis_backend_round_trip(redis_backend):
+    backend, client = redis_backend
+    now = time.time()
+    backend.set("k", cache.CachedResponse(b"body", "application/json", now, now + 60))
+    entry = backend.get("k")
+    assert (entry.body, entry.content_type, entry.stored_at) == (b"body", "application/json", pytest.approx(now))
+    assert client.expiry["ussquash:cache:k"] == pytest.approx(now + 60 + cache.CACHE_STALE_TTL, abs=0.01)
+    backend.delete("k")
+    assert backend.get("k") is None
+
+
+def test_redis_backend_hides_entries_past_stale_window(redis_backend, monkeypatch):
+    backend, _ = redis_backend
+    monkeypatch.setattr(cache, "CACHE_STALE_TTL", 5)
+    now = time.time()
+    backend.set("k", cache.CachedResponse(b"body", "application/json", now - 20, now - 10))
+    assert backend.get("k") is None
+
+
+def test_redis_lease_held_until_owner_releases(redis_backend):
+    backend, client = redis_backend
+    assert backend.acquire_lease("k", "a", 30)
+    assert not backend.acquire_lease("k", "b", 30)
+    backend.release_lease("k", "b")
+    assert not backend.acquire_lease("k", "b", 30)
+    backend.release_lease("k", "a")
+    assert backend.acquire_lease("k", "b", 30)
+
+
+def test_redis_release_is_one_atomic_script(redis_backend):
+    backend, client = redis_backend
+    assert backend.acquire_lease("k", "a", 0.01)
+    time.sleep(0.02)
+    assert backend.acquire_lease("k", "b", 30)
+    client.calls.clear()
+    # The lapsed owner's release must leave the new owner's lease alone, and
+    # must not check and delete in separate round trips.
+    backend.release_lease("k", "a")
+    assert client.calls == ["eval"]
+    assert not backend.acquire_lease("k", "c", 30)
+
+
+def test_redis_lease_renewed_only_by_its_owner(redis_backend):
+    backend, client = redis_backend
+    assert backend.acquire_lease("k", "a", 0.05)
+    assert not backend.renew_lease("k", "b", 30)
+    assert backend.renew_lease("k", "a", 30)
+    time.sleep(0.06)
+    assert not backend.acquire_lease("k", "b", 30)
+    assert client.expiry["ussquash:lease:k"] == pytest.approx(time.time() + 30, abs=1)
+
+
+def test_redis_errors_degrade_to_misses(redis_backend, monkeypatch):
+    backend, client = redis_backend
+
+    def fail(*args, **kwargs):
+        raise cache.RedisError("down")
+
+    monkeypatch.setattr(client, "hmget", fail)
+    monkeypatch.setattr(client, "set", fail)
+    assert backend.get("k") is None
+    # Without the lease server every worker fetches on its own.
+    assert backend.acquire_lease("k", "a", 30)
+
+
+def test_redis_backend_behind_response_cache(redis_backend):
+    backend, _ = redis_backend
+    response_cache = cache.ResponseCache(backend)
+    entry, status = response_cache.get_or_fetch("k", 60, lambda: (b"{}", "application/json"))
+    assert status == "MISS"
+    assert response_cache.get_or_fetch("k", 60, lambda: pytest.fail("refetched"))[1] == "HIT"
+    # The miss released its lease once the entry was stored.
+    assert backend.acquire_lease("k", "x", 30)
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    return cache.SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), 1024 * 1024, 100)
+
+
+def test_sqlite_lease_held_until_owner_releases(sqlite_backend):
+    assert sqlite_backend.acquire_lease("k", "a", 30)
+    assert not sqlite_backend.acquire_lease("k", "b", 30)
+    sqlite_backend.release_lease("k", "b")
+    assert not sqlite_backend.acquire_lease("k", "b", 30)
+    sqlite_backend.release_lease("k", "a")
+    assert sqlite_backend.acquire_lease("k", "b", 30)
+
+
+def test_sqlite_expired_lease_can_be_taken(sqlite_backend):
+    assert sqlite_backend.acquire_lease("k", "a", 0)
+    assert sqlite_backend.acquire_lease("k", "b", 30)
+    # The old owner releasing late must not drop the new owner's lease.
+    sqlite_backend.release_lease("k", "a")
+    assert not sqlite_backend.acquire_lease("k", "c", 30)
+
+
+def test_sqlite_backend_round_trip(sqlite_backend):
+    now = time.time()
+    sqlite_backend.set("k", cache.CachedResponse(b"body", "application/json", now, now + 60))
+    entry = sqlite_backend.get("k")
+    assert (entry.body, entry.content_type) == (b"body", "application/json")
+    sqlite_backend.delete("k")
+    assert sqlite_backend.get("k") is None
+
+
+def test_shared_backend_waits_for_other_workers_entry(sqlite_backend, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_LEASE_POLL", 0.01)
+    response_cache = cache.ResponseCache(sqlite_backend)
+    # Another worker holds the lease and stores the entry shortly after.
+    assert sqlite_backend.acquire_lease("k", "other", 30)
+
+    def other_worker():
+        time.sleep(0.1)
+        now = time.time()
+        sqlite_backend.set("k", cache.CachedResponse(b"theirs", "application/json", now, now + 60))
+
+    thread = threading.Thread(target=other_worker)
+    thread.start()
+    entry, status = response_cache.get_or_fetch("k", 60, lambda: pytest.fail("fetched despite the lease"))
+    thread.join()
+    assert (entry.body, status) == (b"theirs", "COALESCED")
+
+
+def test_sqlite_lease_renewed_only_while_held(sqlite_backend):
+    assert sqlite_backend.acquire_lease("k", "a", 0.05)
+    assert not sqlite_backend.renew_lease("k", "b", 30)
+    assert sqlite_backend.renew_lease("k", "a", 30)
+    time.sleep(0.06)
+    assert not sqlite_backend.acquire_lease("k", "b", 30)
+
+    sqlite_backend.release_lease("k", "a")
+    assert not sqlite_backend.renew_lease("k", "a", 30)
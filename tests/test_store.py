@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+import app
+import store
+
+
+def match(match_id, status="Completed", score="11-5,11-7,11-9"):
+    return {
+        "Matchid": match_id,
+        "MatchDate": f"2025-03-{match_id:02d}T00:00:00",
+        "Status": status,
+        "Score": score,
+        "wid1": 1,
+        "oid1": 2,
+    }
+
+
+def set_synced_at(user_id, kind, synced_at):
+    with store.store_pool.connection() as conn, conn:
+        conn.execute(
+            "UPDATE sync_state SET synced_at = ? WHERE player_id = ? AND kind = ?", (synced_at, user_id, kind)
+        )
+
+
+def test_schema_has_every_table():
+    with store.store_pool.connection() as conn:
+        tables = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"players", "matches", "player_matches", "rating_snapshots", "ranking_snapshots", "sync_state"} <= tables
+
+
+def test_matches_load_newest_first_and_upsert():
+    store.store_save_matches(80001, [match(1), match(3, "Scheduled", "")])
+    store.store_save_matches(80001, [match(2), match(3)])
+    assert store.store_load_matches(80001) == [match(3), match(2), match(1)]
+    assert store.store_known_match_ids(80001) == {1, 2, 3}
+    assert store.store_user_matches_page(80001, 2, 2) == {"matches": [match(1)]}
+
+
+def test_store_freshness_matches_cache_ttl():
+    assert store.STORE_MAX_AGE == app.CACHE_TTLS["matches"]
+    store.store_save_player(80002, {"firstName": "Ana", "lastName": "Lee"})
+    assert store.store_user_details(80002) == {"firstName": "Ana", "lastName": "Lee"}
+
+    set_synced_at(80002, "player", time.time() - store.STORE_MAX_AGE - 1)
+    assert not store.store_is_fresh(80002, "player")
+    assert store.store_is_fresh(80002, "player", max_age=store.STORE_MAX_AGE * 2)
+    assert store.store_user_details(80002) is None
+    assert not store.store_is_fresh(80002, "ratings")
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    pages = {}
+    responses = {}
+
+    def fetch_json(path, cache_policy, **kwargs):
+        return responses.get(path)
+
+    monkeypatch.setattr(app, "fetch_json", fetch_json)
+    monkeypatch.setattr(app, "fetch_matches_page", lambda user_id, page: list(pages.get(page, [])))
+    monkeypatch.setattr(app, "MATCH_PAGE_SIZE", 3)
+    return pages, responses
+
+
+def test_sync_player_upserts_page_one(upstream):
+    pages, responses = upstream
+    user_id = 80003
+    responses[f"/resources/res/user/{user_id}"] = {"firstName": "Sam", "lastName": "Cole"}
+    responses[f"/resources/res/user/{user_id}/record"] = [{"matchesWon": 3, "matchesLost": 1}]
+    responses[f"/resources/res/user/{user_id}/ratings"] = [{"ratingTypeName": "Singles", "rating": 4.2}]
+    pages[1] = [match(4, "Scheduled", ""), match(3), match(2)]
+    pages[2] = [match(1)]
+
+    assert app.sync_player(user_id) == 4
+    assert store.store_user_details(user_id) == {"firstName": "Sam", "lastName": "Cole"}
+    assert store.store_user_ratings(user_id) == [{"ratingTypeName": "Singles", "rating": 4.2}]
+
+    pages[1] = [match(5), match(4), match(3)]
+    pages[2] = [match(2), match(1)]
+    assert app.sync_player(user_id) == 1
+    assert [m["Matchid"] for m in store.store_load_matches(user_id)] == [5, 4, 3, 2, 1]
+    assert store.store_user_matches_page(user_id, 1, 3)["matches"][1] == match(4)
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(app, "CIRCUIT_FAILURES", 2)
+    monkeypatch.setattr(app, "CIRCUIT_COOLDOWN", 0.05)
+    return app.CircuitBreaker()
+
+
+def test_breaker_opens_after_consecutive_failures(breaker):
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(breaker):
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.allow()
+
+
+def test_half_open_allows_one_trial(breaker):
+    breaker.record(False)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.allow()
+    assert breaker.opened_at is None
+
+
+def test_failed_trial_restarts_cooldown(breaker):
+    breaker.record(False)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False)
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_released_trial_frees_the_slot(breaker):
+    breaker.record(False)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.allow()
+
+
+def test_token_bucket_allows_burst_then_refuses():
+    bucket = app.TokenBucket(rate=10, burst=2)
+    assert bucket.acquire(0)
+    assert bucket.acquire(0)
+    assert not bucket.acquire(0)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = app.TokenBucket(rate=20, burst=1)
+    assert bucket.acquire(0)
+    started = time.monotonic()
+    assert bucket.acquire(1)
+    assert 0.03 <= time.monotonic() - started < 0.5
+
+
+def test_token_bucket_gives_up_before_deadline():
+    bucket = app.TokenBucket(rate=1, burst=1)
+    assert bucket.acquire(0)
+    started = time.monotonic()
+    assert not bucket.acquire(0.1)
+    assert time.monotonic() - started < 0.1
@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+import app
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    responses = {
+        "/resources/res/user/91001": {"firstName": "Ana", "lastName": "Lee", "profilePictureUrl": " a.png "},
+        "/resources/res/user/91001/ratings-top": [{"rating": "4.25"}],
+        "/resources/res/user/91002": {"firstName": "Ben", "user": {"profilePicture": "b.png"}},
+        "/resources/res/user/91002/ratings-top": [{"rating": None}],
+    }
+    calls = []
+
+    def fetch_json(path, cache_policy, **kwargs):
+        calls.append(path)
+        if path not in responses:
+            raise requests.exceptions.HTTPError(f"404 for {path}")
+        return responses[path]
+
+    monkeypatch.setattr(app, "fetch_json", fetch_json)
+    return calls
+
+
+def get_users(query):
+    return app.app.test_client().get(f"/api/users?{query}")
+
+
+def test_fields_for_each_user(upstream):
+    response = get_users("ids=91001,91002,91001&fields=picture,name,ratingTop")
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "users": {
+            "91001": {"picture": "a.png", "name": "Ana Lee", "ratingTop": 4.25},
+            "91002": {"picture": "b.png", "name": "Ben", "ratingTop": None},
+        },
+        "errors": {},
+    }
+
+
+def test_picture_is_the_default_field(upstream):
+    assert get_users("ids=91001").get_json()["users"] == {"91001": {"picture": "a.png"}}
+
+
+def test_failed_users_are_reported_separately(upstream):
+    body = get_users("ids=91001,91003&fields=name").get_json()
+    assert body["users"] == {"91001": {"name": "Ana Lee"}}
+    assert body["errors"] == {"91003": "404 for /resources/res/user/91003"}
+
+
+@pytest.mark.parametrize(
+    "query, error",
+    [
+        ("ids=", "ids is required"),
+        ("ids=x,y", "ids is required"),
+        ("ids=1&fields=picture,shoeSize", "Unknown fields: shoeSize"),
+    ],
+)
+def test_bad_requests(upstream, query, error):
+    response = get_users(query)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+    assert upstream == []
+
+
+def test_id_count_is_capped(upstream, monkeypatch):
+    monkeypatch.setattr(app, "BATCH_MAX_IDS", 2)
+    response = get_users("ids=1,2,3")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "At most 2 ids per request"}
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app
+import cache
+
+
+class StopScheduler(Exception):
+    pass
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    backend = cache.SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), 1024 * 1024, 100)
+    monkeypatch.setattr(app, "response_cache", cache.ResponseCache(backend))
+    monkeypatch.setattr(app, "WARMUP_INTERVAL", 10)
+    monkeypatch.setattr(app, "WARMUP_MATCH_DAYS", set())
+    return backend
+
+
+def lease_expiry(backend):
+    with backend._pool.connection() as conn:
+        row = conn.execute("SELECT expires_at FROM cache_leases WHERE key = 'warmup'").fetchone()
+    return row and row[0]
+
+
+def owners(backend):
+    with backend._pool.connection() as conn:
+        return {row[0] for row in conn.execute("SELECT owner FROM cache_leases")}
+
+
+def run_cycles(monkeypatch, cycles, run_warmup):
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == cycles:
+            raise StopScheduler()
+
+    monkeypatch.setattr(app, "run_warmup", run_warmup)
+    # Only the scheduler's module sees the fake sleep.
+    monkeypatch.setattr(app, "time", SimpleNamespace(time=time.time, monotonic=time.monotonic, sleep=sleep))
+    with pytest.raises(StopScheduler):
+        app.warmup_scheduler()
+    return sleeps
+
+
+def test_lease_is_renewed_between_batches_and_kept_through_the_sleep(monkeypatch, backend):
+    expiries = []
+
+    def run_warmup(horizon, pool, between_batches):
+        # A batch that outlasts the first lease must not let another worker in.
+        with backend._pool.connection() as conn, conn:
+            conn.execute("UPDATE cache_leases SET expires_at = ?", (time.time() + 0.5,))
+        between_batches()
+        expiries.append(lease_expiry(backend))
+        assert not backend.acquire_lease("warmup", "other", 10)
+        return False
+
+    assert run_cycles(monkeypatch, 2, run_warmup) == [10, 10]
+    assert len(expiries) == 2
+    assert expiries[0] == pytest.approx(time.time() + 10, abs=1)
+    # After the cycle the holder keeps the lease for 1.25 intervals.
+    assert lease_expiry(backend) == pytest.approx(time.time() + 12.5, abs=1)
+
+
+def test_cycle_stops_when_the_lease_is_lost(monkeypatch, backend):
+    batches = []
+
+    def run_warmup(horizon, pool, between_batches):
+        backend.release_lease("warmup", next(iter(owners(backend))))
+        assert backend.acquire_lease("warmup", "other", 10)
+        batches.append(horizon)
+        between_batches()
+        batches.append("after the lost lease")
+
+    # The other worker keeps the lease, so the next check backs off.
+    assert run_cycles(monkeypatch, 2, run_warmup) == [10, 2.5]
+    assert batches == [15]
+    assert owners(backend) == {"other"}